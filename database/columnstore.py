@@ -0,0 +1,184 @@
+"""
+Almacén de columnas para análisis: las tareas de los períodos cerrados (hasta
+el mes anterior) se guardan como arreglos NumPy (.npy) junto a
+technicians.db y se leen con memory map. Los totales de esos días se
+calculan con reducciones de NumPy sobre los arreglos (ordenados por día, así
+un rango de fechas es un corte) y solo el período abierto se consulta en
+SQL.
+
+Los arreglos de cada actualización van en una carpeta nueva
+(gen-<generación>); la tabla column_store_state indica la generación
+vigente, el día hasta el que cubre (closed_day, exclusivo) y, gracias a los
+triggers de la migración 8, el día más antiguo modificado desde entonces
+(dirty_from_day). Los datos del almacén valen para los días anteriores a
+ambos; el resto se resuelve en SQL hasta la próxima actualización, que
+conserva la parte válida y solo agrega lo nuevo.
+"""
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+
+from .dates import to_day_number
+from .schema import MONEY_COLUMNS
+
+# Columnas guardadas (sin técnico se guarda -1)
+COLUMNS = ['task_day', 'technician_id', *(f'{column}_cents' for column in MONEY_COLUMNS)]
+
+# Filas por bloque al leer de la base
+CHUNK_SIZE = 100000
+
+NO_TECHNICIAN = -1
+
+
+def default_directory(db_name):
+    """Carpeta del almacén junto a la base: technicians.db -> technicians_columns"""
+    return os.path.splitext(db_name)[0] + '_columns'
+
+
+def first_open_day(today=None):
+    """Primer día del período abierto (el mes en curso)"""
+    today = today or date.today()
+    return to_day_number(today.replace(day=1))
+
+
+class ColumnStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.generation = None
+        self.closed_day = 0
+        self.arrays = {}
+
+    def _generation_dir(self, generation):
+        return os.path.join(self.directory, f'gen-{generation}')
+
+    def _state(self, db):
+        db.cursor.execute('SELECT generation, closed_day, dirty_from_day FROM column_store_state WHERE id = 1')
+        return tuple(db.cursor.fetchone())
+
+    def _load(self, generation, closed_day):
+        """Abre (memory map) los arreglos de una generación"""
+        if generation == self.generation:
+            return
+        folder = self._generation_dir(generation)
+        arrays = {}
+        if generation and os.path.isdir(folder):
+            for column in COLUMNS:
+                arrays[column] = np.load(os.path.join(folder, f'{column}.npy'), mmap_mode='r')
+        else:
+            # Sin archivos (nunca se generó o se borró la carpeta): nada es válido
+            closed_day = 0
+        self.arrays = arrays
+        self.generation = generation
+        self.closed_day = closed_day
+
+    def valid_until(self, db):
+        """
+        Día (exclusivo) hasta el que los arreglos coinciden con la base. Lee
+        una sola fila de column_store_state.
+        """
+        generation, closed_day, dirty_from_day = self._state(db)
+        self._load(generation, closed_day)
+        if dirty_from_day is not None:
+            return min(self.closed_day, dirty_from_day)
+        return self.closed_day
+
+    @property
+    def rows(self):
+        return len(self.arrays['task_day']) if self.arrays else 0
+
+    def refresh(self, db, closed_day=None):
+        """
+        Actualiza el almacén hasta closed_day (por defecto, el inicio del mes
+        en curso): conserva los días todavía válidos y agrega el resto desde
+        la base, en una generación nueva.
+
+        Returns:
+            dict: kept, added, rows y closed_day
+        """
+        closed_day = closed_day or first_open_day()
+
+        with db.transaction(label='column_store_refresh'):
+            generation, _, _ = self._state(db)
+            valid_day = min(self.valid_until(db), closed_day)
+            if valid_day == closed_day and self.closed_day == closed_day:
+                return {'kept': self.rows, 'added': 0, 'rows': self.rows, 'closed_day': closed_day}
+
+            kept = int(np.searchsorted(self.arrays['task_day'], valid_day)) if self.arrays else 0
+
+            # Días faltantes, ordenados por día (usa el índice de task_day)
+            cents = ', '.join(f'{column}_cents' for column in MONEY_COLUMNS)
+            cursor = db.conn.execute(f'''
+            SELECT task_day, COALESCE(technician_id, {NO_TECHNICIAN}), {cents}
+            FROM tasks
+            WHERE task_day >= ? AND task_day < ?
+            ORDER BY task_day
+            ''', (valid_day, closed_day))
+            blocks = []
+            while True:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                blocks.append(np.array(rows, dtype=np.int64).reshape(len(rows), len(COLUMNS)))
+            added = np.concatenate(blocks) if blocks else np.empty((0, len(COLUMNS)), dtype=np.int64)
+
+            new_generation = generation + 1
+            folder = self._generation_dir(new_generation)
+            os.makedirs(folder, exist_ok=True)
+            for index, column in enumerate(COLUMNS):
+                old = self.arrays[column][:kept] if self.arrays else np.empty(0, dtype=np.int64)
+                dtype = np.int32 if column == 'task_day' else np.int64
+                values = np.concatenate([old, added[:, index]]).astype(dtype)
+                np.save(os.path.join(folder, f'{column}.npy'), values)
+
+            db.cursor.execute('''
+            UPDATE column_store_state
+            SET generation = ?, closed_day = ?, dirty_from_day = NULL
+            WHERE id = 1
+            ''', (new_generation, closed_day))
+
+        self.arrays = {}
+        self._load(new_generation, closed_day)
+        self._remove_old_generations(new_generation)
+        return {'kept': kept, 'added': len(added), 'rows': self.rows, 'closed_day': closed_day}
+
+    def _remove_old_generations(self, current):
+        """Borra las generaciones anteriores (si otra PC las tiene abiertas, quedan)"""
+        for name in os.listdir(self.directory):
+            if name.startswith('gen-') and name != f'gen-{current}':
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def sums_by_technician(self, first_day, last_day, technician_id=None, columns=MONEY_COLUMNS):
+        """
+        Cantidad de tareas y centavos por columna, por técnico, para los días
+        first_day..last_day (inclusive; None = sin límite).
+
+        Returns:
+            dict: {technician_id: [cantidad, centavos columna 1, ...]}
+        """
+        if not self.arrays:
+            return {}
+        days = self.arrays['task_day']
+        lo = int(np.searchsorted(days, first_day, 'left')) if first_day is not None else 0
+        hi = int(np.searchsorted(days, last_day, 'right')) if last_day is not None else len(days)
+        if lo >= hi:
+            return {}
+
+        technicians = np.asarray(self.arrays['technician_id'][lo:hi])
+        values = [np.asarray(self.arrays[f'{column}_cents'][lo:hi]) for column in columns]
+
+        if technician_id is not None:
+            mask = technicians == technician_id
+            count = int(np.count_nonzero(mask))
+            if not count:
+                return {}
+            return {technician_id: [count, *(int(column[mask].sum()) for column in values)]}
+
+        ids, inverse = np.unique(technicians, return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = [np.bincount(inverse, weights=column) for column in values]
+        return {
+            (None if tech == NO_TECHNICIAN else int(tech)): [int(counts[i]), *(int(round(s[i])) for s in sums)]
+            for i, tech in enumerate(ids)
+        }
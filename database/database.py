@@ -1,9 +1,95 @@
 import sqlite3
 import os
+import re
+import time
+import random
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime
 
 import sys
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from .dates import to_iso, to_day_number, from_day_number
+from .schema import MONEY_COLUMNS, TASK_COLUMNS, TASK_SELECT, migrate, fill_calendar
+from .ledger import compute_row_hashes
+from .rules import RateRules
+
+
+def to_cents(value):
+    """Convierte un monto a centavos enteros (None o vacío cuenta como 0)"""
+    if value is None or value == '':
+        return 0
+    try:
+        return int(round(float(value) * 100))
+    except (ValueError, TypeError):
+        return 0
+
+
+def calculate_derived_columns(df, rules=None):
+    """
+    Versión vectorizada de Database._calculate_derived_fields: calcula IVA,
+    ganancia y distribución para todas las filas de un DataFrame a la vez,
+    con las tasas vigentes en la fecha de cada tarea (rules es un RateRules;
+    sin reglas se usan las tasas originales). Devuelve un DataFrame nuevo con
+    los montos numéricos ya redondeados.
+    """
+    df = df.copy()
+    if 'task_day' in df.columns:
+        days = df['task_day']
+    elif 'task_date' in df.columns:
+        days = df['task_date'].map(to_day_number)
+    else:
+        days = pd.Series(None, index=df.index, dtype=float)
+    rates = (rules or RateRules()).rate_columns(days)
+    
+    for column in ['budget_total', 'labor_cost', 'material_cost',
+                   'insurance_payment', 'cash_payment', 'material_expense']:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0.0)
+        else:
+            df[column] = 0.0
+    
+    budget_total = df['budget_total']
+    insurance_payment = df['insurance_payment']
+    
+    # Si el pago total no coincide con la suma de seguro + efectivo, ajustar el efectivo
+    mismatch = ((insurance_payment + df['cash_payment']) - budget_total).abs() > 0.01
+    df['cash_payment'] = df['cash_payment'].where(~mismatch, budget_total - insurance_payment)
+    
+    # IVA, ganancia y distribución técnico/socio según las reglas vigentes
+    iva = budget_total * rates['iva_rate']
+    profit = budget_total - df['material_expense'] - iva
+    technician_amount = profit * rates['technician_share']
+    partner_amount = profit * rates['partner_share']
+    insurance_net = (insurance_payment - iva - partner_amount).clip(lower=0)
+    
+    df['iva'] = iva
+    df['profit'] = profit
+    df['pablo_share'] = technician_amount
+    df['facu_share'] = partner_amount
+    df['insurance_payment'] = insurance_net  # Igual que en la versión por fila: valor neto
+    
+    df[MONEY_COLUMNS] = df[MONEY_COLUMNS].round(2)
+    return df
+
+
+# Espera ante una base bloqueada por otra PC (milisegundos). Se puede cambiar
+# con la variable de entorno DB_BUSY_TIMEOUT.
+DEFAULT_BUSY_TIMEOUT = 5000
+
+# Reintentos de una transacción de escritura que sigue bloqueada después del
+# busy timeout, con espera exponencial entre intentos (segundos)
+LOCK_RETRIES = 4
+LOCK_BACKOFF = 0.1
+LOCK_BACKOFF_MAX = 2.0
+
+
+def is_lock_error(error):
+    """True si el error es de base bloqueada u ocupada (reintentable)"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
 
 def get_app_dir():
     if getattr(sys, 'frozen', False):
@@ -14,22 +100,216 @@ def get_app_dir():
         return os.path.dirname(os.path.abspath(__file__))
 
 class Database:
-    def __init__(self, db_name=None):
+    def __init__(self, db_name=None, busy_timeout=None):
         if db_name is None:
             db_name = os.path.join(get_app_dir(), 'technicians.db')
+        if busy_timeout is None:
+            busy_timeout = int(os.environ.get('DB_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT))
         self.db_name = db_name
+        self.busy_timeout = busy_timeout
+        self.lock_stats = {}
         self.conn = None
         self.cursor = None
+        self._transaction_depth = 0
+        self._cache = {}
+        self._cache_stamp = None
+        self._rate_rules = None
+        self._rate_rules_version = None
+        self._writer = None
+        self._report_service = None
+        self.column_store = None
         
-    def connect(self):
-        self.conn = sqlite3.connect(self.db_name)
+    def connect(self, check_same_thread=True):
+        self.conn = sqlite3.connect(
+            self.db_name, timeout=self.busy_timeout / 1000, check_same_thread=check_same_thread
+        )
+        self.conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
         self.conn.row_factory = sqlite3.Row
         self.cursor = self.conn.cursor()
     
     def close(self):
+        self.stop_writer()
         if self.conn:
             self.conn.close()
     
+    def start_writer(self):
+        """
+        Inicia el hilo escritor (ver writer.py): desde entonces submit_write
+        encola las escrituras y las confirma en grupo fuera de este hilo.
+        """
+        if self._writer is None:
+            from .writer import DatabaseWriter
+            self._writer = DatabaseWriter(self.db_name, busy_timeout=self.busy_timeout)
+        return self._writer
+    
+    def stop_writer(self):
+        """Confirma las escrituras pendientes y detiene el hilo escritor"""
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+    
+    def submit_write(self, method, *args, **kwargs):
+        """
+        Ejecuta un método de escritura (por nombre, p. ej. 'add_task') en el
+        hilo escritor y devuelve un Future que se resuelve después del commit.
+        Sin hilo escritor se ejecuta en el momento y el Future ya está resuelto.
+        """
+        if self._writer is not None:
+            return self._writer.submit(method, *args, **kwargs)
+        
+        future = Future()
+        try:
+            future.set_result(getattr(self, method)(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def use_report_service(self, url):
+        """
+        Modo cliente liviano: los reportes y la lista de técnicos se piden al
+        servicio de consultas (service.py) en vez de calcularse con esta
+        conexión. Si el servicio no responde se sigue trabajando localmente.
+        
+        Returns:
+            bool: True si el servicio está disponible
+        """
+        from .service import ServiceClient
+        client = ServiceClient(url)
+        if not client.is_available():
+            print(f"Servicio de consultas no disponible en {url}; se usa la base local")
+            self._report_service = None
+            return False
+        self._report_service = client
+        return True
+    
+    def _from_report_service(self, method, *args, **kwargs):
+        """
+        Llama al servicio de consultas. Devuelve (True, resultado) o (False,
+        None) si no hay servicio o falló (entonces se calcula localmente).
+        """
+        if self._report_service is None:
+            return False, None
+        try:
+            return True, getattr(self._report_service, method)(*args, **kwargs)
+        except (OSError, ValueError) as e:
+            print(f"Error del servicio de consultas en {method}: {e}; se usa la base local")
+            return False, None
+    
+    def enable_column_store(self, directory=None, refresh=True):
+        """
+        Activa el almacén de columnas (columnstore.py): los totales de los
+        meses cerrados se calculan con NumPy sobre arreglos en disco y solo el
+        mes en curso se consulta en SQL. Con refresh=True se agregan al
+        almacén los días cerrados que falten.
+        
+        Returns:
+            dict: resultado de la actualización (o None si refresh=False)
+        """
+        from .columnstore import ColumnStore, default_directory
+        self.column_store = ColumnStore(directory or default_directory(self.db_name))
+        if refresh:
+            result = self.column_store.refresh(self)
+            print(f"Almacén de columnas: {result['rows']} tareas ({result['added']} agregadas)")
+            return result
+        return None
+    
+    @contextmanager
+    def transaction(self, label=None):
+        """
+        Agrupa varias escrituras en una única transacción (un solo commit al
+        final, rollback si algo falla). Las transacciones anidadas se suman a
+        la exterior. label identifica la operación en las métricas de
+        bloqueo (get_lock_stats); por convención, el nombre del método.
+        
+        La transacción empieza con BEGIN IMMEDIATE: el bloqueo de escritura se
+        toma al inicio, así dos PCs que escriben a la vez esperan su turno
+        (busy timeout) en vez de fallar a mitad de camino. Si la base sigue
+        bloqueada se reintenta con espera exponencial (ver _retry_locked).
+        """
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield self.cursor
+            finally:
+                self._transaction_depth -= 1
+            return
+        
+        # Métricas por operación (la etiqueta de la transacción exterior)
+        method = label or 'sin etiqueta'
+        stats = self.lock_stats.setdefault(
+            method, {'transactions': 0, 'contended': 0, 'retries': 0, 'failures': 0, 'wait_seconds': 0.0}
+        )
+        stats['transactions'] += 1
+        
+        self._transaction_depth = 1
+        try:
+            if not self.conn.in_transaction:
+                self._retry_locked(method, stats, lambda: self.cursor.execute('BEGIN IMMEDIATE'))
+            yield self.cursor
+            self._retry_locked(method, stats, self.conn.commit)
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._transaction_depth = 0
+    
+    def _retry_locked(self, method, stats, operation):
+        """
+        Ejecuta operation reintentando mientras la base esté bloqueada por
+        otra conexión, y registra reintentos y espera en stats.
+        """
+        started = time.perf_counter()
+        try:
+            for attempt in range(LOCK_RETRIES + 1):
+                try:
+                    return operation()
+                except sqlite3.OperationalError as e:
+                    if not is_lock_error(e):
+                        raise
+                    if attempt == 0:
+                        stats['contended'] += 1
+                    if attempt == LOCK_RETRIES:
+                        stats['failures'] += 1
+                        raise
+                    stats['retries'] += 1
+                    delay = min(LOCK_BACKOFF * 2 ** attempt, LOCK_BACKOFF_MAX)
+                    print(f"Base bloqueada en {method}; reintento {attempt + 1} en {delay:.2f}s")
+                    time.sleep(delay * (0.5 + random.random()))
+        finally:
+            stats['wait_seconds'] += time.perf_counter() - started
+    
+    def get_lock_stats(self):
+        """
+        Métricas de contención por operación (etiqueta de la transacción;
+        en el hilo escritor, las operaciones de cada grupo): transacciones, cuántas encontraron
+        la base bloqueada, reintentos, fallos y tiempo total esperando el
+        bloqueo y el commit (segundos).
+        """
+        return {method: dict(stats) for method, stats in self.lock_stats.items()}
+    
+    def _data_stamp(self):
+        """
+        Marca que cambia con cada modificación de la base: data_version cambia
+        cuando confirma otra conexión y total_changes con las escrituras de
+        esta misma conexión.
+        """
+        return (self.conn.execute('PRAGMA data_version').fetchone()[0], self.conn.total_changes)
+    
+    def _cached(self, key, compute):
+        """Devuelve un resumen memorizado mientras los datos no cambien"""
+        stamp = self._data_stamp()
+        if stamp != self._cache_stamp:
+            self._cache.clear()
+            self._cache_stamp = stamp
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    def _invalidate_caches(self):
+        """Descarta los resúmenes memorizados"""
+        self._cache.clear()
+        self._cache_stamp = None
+    
     def _table_exists(self, table_name):
         """Verifica si una tabla existe en la base de datos"""
         self.cursor.execute("""
@@ -38,98 +318,174 @@ class Database:
         """, (table_name,))
         return self.cursor.fetchone() is not None
         
-    def _column_exists(self, table_name, column_name):
-        """Verifica si una columna existe en una tabla"""
-        self.cursor.execute(f'PRAGMA table_info({table_name})')
-        columns = [column[1] for column in self.cursor.fetchall()]
-        return column_name in columns
-    
     def initialize_database(self):
+        """
+        Conecta, aplica las migraciones de esquema pendientes y completa el
+        calendario si hay tareas fuera de su rango (ver ensure_calendar)
+        """
         self.connect()
-        
-        # Crear tabla de técnicos si no existe
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS technicians (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            phone TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        migrate(self.conn)
+        self.ensure_calendar()
+    
+    def _typed_values(self, task_data):
+        """Valores de las columnas tipadas (task_day y centavos) de una tarea"""
+        return (
+            to_day_number(task_data.get('task_date')),
+            *(to_cents(task_data.get(column)) for column in MONEY_COLUMNS)
         )
-        ''')
+    
+    # Métodos para técnicos
+    def add_technician(self, name, email=None, phone=None):
+        with self.transaction(label='add_technician'):
+            self.cursor.execute('''
+            INSERT INTO technicians (name, email, phone)
+            VALUES (?, ?, ?)
+            ''', (name, email, phone))
+        return self.cursor.lastrowid
+    
+    def get_technicians(self, include_inactive=False):
+        """
+        Técnicos ordenados por nombre. Por defecto solo los activos; los
+        reportes e importaciones piden también los dados de baja para no
+        perder sus tareas. El resultado se memoriza hasta que cambie la base.
+        """
+        served, technicians = self._from_report_service('get_technicians', include_inactive)
+        if served:
+            return technicians
         
-        # Crear tabla de tareas si no existe
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            technician_id INTEGER,
-            client_name TEXT NOT NULL,
-            task_description TEXT,
-            task_date TEXT,
-            budget_total REAL,
-            labor_cost REAL,
-            material_cost REAL,
-            insurance_payment REAL,
-            cash_payment REAL,
-            material_expense REAL,
-            profit REAL,
-            pablo_share REAL,
-            facu_share REAL,
-            iva REAL,
-            payment_type TEXT,
-            order_number TEXT,
-            status TEXT DEFAULT 'PENDIENTE',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (technician_id) REFERENCES technicians (id)
-        )
-        ''')
+        def compute():
+            query = 'SELECT * FROM technicians'
+            if not include_inactive:
+                query += ' WHERE active = 1'
+            self.cursor.execute(query + ' ORDER BY name')
+            return [dict(row) for row in self.cursor.fetchall()]
         
-        # Verificar y agregar columnas faltantes
-        if self._table_exists('tasks'):
-            # Lista de columnas que deberían existir
-            required_columns = [
-                'insurance_payment', 'cash_payment', 'material_expense',
-                'profit', 'pablo_share', 'facu_share', 'iva', 'order_number'
-            ]
+        return [dict(tech) for tech in self._cached(('technicians', include_inactive), compute)]
+    
+    def update_technician(self, technician_id, name, email=None, phone=None):
+        """
+        Actualiza nombre, email y teléfono de un técnico.
+        
+        Returns:
+            bool: True si el técnico existía y se actualizó
+        """
+        with self.transaction(label='update_technician'):
+            self.cursor.execute('''
+            UPDATE technicians SET name = ?, email = ?, phone = ?
+            WHERE id = ?
+            ''', (name, email, phone, technician_id))
+            updated = self.cursor.rowcount > 0
+        self._invalidate_caches()
+        return updated
+    
+    def count_technician_tasks(self, technician_id):
+        """Cantidad de tareas de un técnico (usa el índice technician_id, task_day)"""
+        self.cursor.execute('SELECT COUNT(*) FROM tasks WHERE technician_id = ?', (technician_id,))
+        return self.cursor.fetchone()[0]
+    
+    def delete_technician(self, technician_id, reassign_to=None, soft=False):
+        """
+        Elimina un técnico en una sola transacción.
+        
+        Args:
+            technician_id: técnico a eliminar
+            reassign_to: si se indica, sus tareas pasan a este técnico con un
+                único UPDATE antes de eliminarlo
+            soft: si es True el técnico solo se marca como inactivo y conserva
+                sus tareas
+        
+        Returns:
+            int: cantidad de tareas reasignadas
+        
+        Raises:
+            ValueError: si el técnico todavía tiene tareas y no se pidió
+                reasignarlas ni una baja lógica (quedarían sin técnico)
+        """
+        if reassign_to is not None and int(reassign_to) == int(technician_id):
+            raise ValueError("No se pueden reasignar las tareas al mismo técnico")
+        
+        with self.transaction(label='delete_technician'):
+            reassigned = 0
+            if reassign_to is not None:
+                if not self.get_technician(reassign_to):
+                    raise ValueError(f"No existe el técnico {reassign_to} para reasignar las tareas")
+                self.cursor.execute(
+                    'UPDATE tasks SET technician_id = ? WHERE technician_id = ?',
+                    (reassign_to, technician_id)
+                )
+                reassigned = self.cursor.rowcount
             
-            for column in required_columns:
-                if not self._column_exists('tasks', column):
-                    try:
-                        self.cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} REAL')
-                    except sqlite3.OperationalError:
-                        # Si la columna es de tipo texto
-                        if column in ['payment_type', 'order_number', 'status']:
-                            self.cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} TEXT')
+            if soft:
+                self.cursor.execute('UPDATE technicians SET active = 0 WHERE id = ?', (technician_id,))
+            else:
+                remaining = self.count_technician_tasks(technician_id)
+                if remaining:
+                    raise ValueError(
+                        f"El técnico tiene {remaining} tareas. Reasígnelas a otro técnico "
+                        "o desactívelo en lugar de eliminarlo."
+                    )
+                self.cursor.execute('DELETE FROM technicians WHERE id = ?', (technician_id,))
         
-        self.conn.commit()
+        self._invalidate_caches()
+        return reassigned
     
-    # Métodos para técnicos
-    def add_technician(self, name, email=None, phone=None):
-        self.cursor.execute('''
-        INSERT INTO technicians (name, email, phone)
-        VALUES (?, ?, ?)
-        ''', (name, email, phone))
-        self.conn.commit()
-        return self.cursor.lastrowid
+    # Métodos para reglas de tasas
+    def get_rate_rules(self):
+        """
+        Devuelve las reglas de tasas compiladas (RateRules). Se leen de la base
+        una sola vez y se vuelven a compilar solo si cambian.
+        """
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if self._rate_rules is None or self._rate_rules_version != version:
+            rows = self.conn.execute('''
+            SELECT effective_day, iva_rate, technician_share, partner_share FROM rate_rules
+            ''').fetchall()
+            self._rate_rules = RateRules(tuple(row) for row in rows)
+            self._rate_rules_version = version
+        return self._rate_rules
     
-    def get_technicians(self):
-        self.cursor.execute('SELECT * FROM technicians ORDER BY name')
-        return [dict(row) for row in self.cursor.fetchall()]
+    def set_rate_rule(self, effective_date, iva_rate, technician_share, partner_share=None):
+        """
+        Crea (o reemplaza) la regla que rige desde effective_date hasta la
+        siguiente. Las tareas ya guardadas no cambian hasta ejecutar
+        recalculate_derived_fields.
+        """
+        if partner_share is None:
+            partner_share = round(1 - technician_share, 6)
+        with self.transaction(label='set_rate_rule'):
+            self.cursor.execute('''
+            INSERT INTO rate_rules (effective_day, iva_rate, technician_share, partner_share)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(effective_day) DO UPDATE SET
+                iva_rate = excluded.iva_rate,
+                technician_share = excluded.technician_share,
+                partner_share = excluded.partner_share
+            ''', (to_day_number(effective_date), iva_rate, technician_share, partner_share))
+        self._rate_rules = None
+    
+    def delete_rate_rule(self, effective_date):
+        """Elimina la regla que empieza en effective_date"""
+        with self.transaction(label='delete_rate_rule'):
+            self.cursor.execute('DELETE FROM rate_rules WHERE effective_day = ?', (to_day_number(effective_date),))
+        self._rate_rules = None
     
     # Métodos para tareas
     def add_task(self, task_data):
         """Agrega una nueva tarea a la base de datos"""
-        query = '''
+        cents_columns = ', '.join(f'{column}_cents' for column in MONEY_COLUMNS)
+        query = f'''
         INSERT INTO tasks (
             technician_id, client_name, task_description, task_date,
             budget_total, labor_cost, material_cost, insurance_payment,
             cash_payment, material_expense, profit, pablo_share,
-            facu_share, iva, payment_type, order_number, status
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            facu_share, iva, payment_type, order_number, status,
+            task_day, {cents_columns}
+        ) VALUES ({', '.join(['?'] * (18 + len(MONEY_COLUMNS)))})
         '''
         
         # Calcular campos derivados
         task_data = self._calculate_derived_fields(task_data)
+        task_data['task_date'] = to_iso(task_data.get('task_date'))
         
         values = (
             task_data.get('technician_id'),
@@ -148,12 +504,141 @@ class Database:
             task_data.get('iva', 0),
             task_data.get('payment_type', 'EFECTIVO'),
             task_data.get('order_number', ''),
-            task_data.get('status', 'PENDIENTE')
+            task_data.get('status', 'PENDIENTE'),
+            *self._typed_values(task_data)
         )
         
-        self.cursor.execute(query, values)
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self.transaction(label='add_task'):
+            self.cursor.execute(query, values)
+            task_id = self.cursor.lastrowid
+            self._extend_calendar([to_day_number(task_data['task_date'])])
+        return task_id
+    
+    def _insert_task_frame(self, df):
+        """
+        Inserta un DataFrame de tareas: los campos derivados se calculan de
+        forma vectorizada y las filas se insertan con una única sentencia
+        preparada (executemany) en una sola transacción. Devuelve los ids.
+        """
+        df = calculate_derived_columns(df, self.get_rate_rules())
+        
+        # Fechas a ISO y número de día (memorizado por texto)
+        if 'task_date' in df.columns:
+            df['task_date'] = df['task_date'].map(to_iso)
+        else:
+            df['task_date'] = None
+        df['task_day'] = df['task_date'].map(to_day_number)
+        for column in MONEY_COLUMNS:
+            df[f'{column}_cents'] = (df[column] * 100).round().astype('int64')
+        
+        defaults = {
+            'technician_id': None, 'client_name': '', 'task_description': '',
+            'payment_type': 'EFECTIVO', 'order_number': '', 'status': 'PENDIENTE'
+        }
+        for column, default in defaults.items():
+            if column not in df.columns:
+                df[column] = default
+        
+        columns = [
+            'technician_id', 'client_name', 'task_description', 'task_date',
+            *MONEY_COLUMNS, 'payment_type', 'order_number', 'status',
+            'task_day', *(f'{column}_cents' for column in MONEY_COLUMNS)
+        ]
+        query = f'''
+        INSERT INTO tasks ({', '.join(columns)})
+        VALUES ({', '.join(['?'] * len(columns))})
+        '''
+        
+        # astype(object) convierte a tipos nativos de Python (sqlite3 no acepta
+        # tipos de numpy) y los NaN pasan a None (NULL)
+        values = df[columns].astype(object)
+        rows = list(values.where(values.notna(), None).itertuples(index=False, name=None))
+        
+        with self.transaction(label='_insert_task_frame'):
+            self.cursor.executemany(query, rows)
+            # Con AUTOINCREMENT y la escritura bloqueada durante la transacción
+            # los ids asignados son consecutivos y terminan en el último insertado
+            last_id = self.cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+            self._extend_calendar(df['task_day'])
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    def add_tasks(self, tasks):
+        """
+        Inserta muchas tareas de una vez (lista de diccionarios o DataFrame).
+        Los campos derivados se calculan de forma vectorizada y las filas se
+        insertan con una única sentencia preparada (executemany) dentro de una
+        sola transacción. Devuelve la cantidad de tareas insertadas.
+        """
+        df = tasks if isinstance(tasks, pd.DataFrame) else pd.DataFrame(list(tasks))
+        if df.empty:
+            return 0
+        return len(self._insert_task_frame(df))
+    
+    def import_tasks(self, tasks, file_hash=None, occurrences=None):
+        """
+        Inserta tareas importadas salteando las que ya figuran en el registro
+        de importaciones (import_ledger), de modo que reimportar una planilla
+        no duplica datos. Si el archivo se importa por bloques, occurrences
+        (un collections.Counter) se pasa a todos los bloques para numerar las
+        filas idénticas a lo largo de todo el archivo (ver ledger.py).
+        Devuelve (insertadas, omitidas).
+        """
+        df = tasks if isinstance(tasks, pd.DataFrame) else pd.DataFrame(list(tasks))
+        if df.empty:
+            return 0, 0
+        
+        df = df.reset_index(drop=True)
+        hashes = compute_row_hashes(df, occurrences)
+        known = self._known_row_hashes(hashes.unique())
+        is_new = ~hashes.isin(known)
+        if not is_new.any():
+            return 0, len(df)
+        
+        with self.transaction(label='import_tasks'):
+            task_ids = self._insert_task_frame(df[is_new])
+            self.cursor.executemany(
+                'INSERT INTO import_ledger (row_hash, task_id, file_hash) VALUES (?, ?, ?)',
+                zip(hashes[is_new].tolist(), task_ids, [file_hash] * len(task_ids))
+            )
+        return len(task_ids), len(df) - len(task_ids)
+    
+    def _known_row_hashes(self, hashes, chunk_size=500):
+        """Devuelve el conjunto de hashes que ya figuran en el registro"""
+        known = set()
+        hashes = list(hashes)
+        for start in range(0, len(hashes), chunk_size):
+            chunk = hashes[start:start + chunk_size]
+            self.cursor.execute(
+                f"SELECT row_hash FROM import_ledger WHERE row_hash IN ({', '.join(['?'] * len(chunk))})",
+                chunk
+            )
+            known.update(row[0] for row in self.cursor.fetchall())
+        return known
+    
+    def is_file_imported(self, file_hash):
+        """Indica si un archivo con ese hash ya fue importado"""
+        self.cursor.execute('SELECT 1 FROM import_files WHERE file_hash = ?', (file_hash,))
+        return self.cursor.fetchone() is not None
+    
+    def record_imported_file(self, file_hash, file_name, row_count, imported_count, skipped_count=0):
+        """
+        Registra un archivo importado para saltearlo si se vuelve a importar.
+        Solo se registra si todas las filas quedaron cargadas (importadas ahora
+        u omitidas por estar ya importadas): si alguna falló, p. ej. por un
+        técnico que todavía no existe, el archivo se vuelve a leer la próxima
+        vez y el registro de filas evita duplicar las que ya entraron.
+        
+        Returns:
+            bool: True si el archivo quedó registrado
+        """
+        if imported_count + skipped_count < row_count:
+            return False
+        with self.transaction(label='record_imported_file'):
+            self.cursor.execute('''
+            INSERT OR REPLACE INTO import_files (file_hash, file_name, row_count, imported_count)
+            VALUES (?, ?, ?, ?)
+            ''', (file_hash, file_name, row_count, imported_count))
+        return True
         
     def _calculate_derived_fields(self, task_data):
         """Calcula los campos derivados de la tarea"""
@@ -188,17 +673,21 @@ class Database:
                 cash_payment = budget_total - insurance_payment
                 print(f"Nuevo cash_payment: {cash_payment}")
             
-            # Calcular IVA (10.5% sobre el presupuesto total)
-            iva = budget_total * 0.105
+            # Tasas vigentes en la fecha de la tarea
+            iva_rate, technician_rate, partner_rate = self.get_rate_rules().rates_for(task_data.get('task_date'))
+            print(f"Tasas: IVA={iva_rate}, Técnico={technician_rate}, Socio={partner_rate}")
+            
+            # Calcular IVA sobre el presupuesto total
+            iva = budget_total * iva_rate
             
             # Calcular ganancia total (presupuesto - gasto material - IVA)
             profit = budget_total - material_expense - iva
             
             print(f"Cálculo de ganancia: {budget_total} (presupuesto) - {material_expense} (material) - {iva} (IVA) = {profit} (ganancia)")
             
-            # Calcular distribución (70% Técnico, 30% Socio) sobre la ganancia
-            technician_share = profit * 0.7
-            partner_share = profit * 0.3
+            # Calcular distribución técnico/socio sobre la ganancia
+            technician_share = profit * technician_rate
+            partner_share = profit * partner_rate
             
             # Calcular el seguro neto (pago del seguro - IVA - porcentaje del socio)
             insurance_net = max(0, insurance_payment - iva - partner_share)
@@ -253,23 +742,29 @@ class Database:
         print(f"\n--- Buscando tareas para técnico ID: {technician_id} ---")
         print(f"Fecha inicio: {start_date}, Fecha fin: {end_date}")
         
-        query = 'SELECT * FROM tasks WHERE technician_id = ?'
+        query = f'SELECT {TASK_SELECT} FROM tasks WHERE technician_id = ?'
         params = [technician_id]
         
+        # Filtrar por número de día (usa el índice technician_id, task_day)
         if start_date:
-            query += ' AND task_date >= ?'
-            params.append(start_date)
+            query += ' AND task_day >= ?'
+            params.append(to_day_number(start_date))
         if end_date:
-            query += ' AND task_date <= ?'
-            params.append(end_date)
+            query += ' AND task_day <= ?'
+            params.append(to_day_number(end_date))
             
-        query += ' ORDER BY task_date DESC'
+        query += ' ORDER BY task_day DESC'
         
         print(f"Ejecutando consulta: {query}")
         print(f"Parámetros: {params}")
         
-        self.cursor.execute(query, tuple(params))
-        tasks = [dict(row) for row in self.cursor.fetchall()]
+        def compute():
+            self.cursor.execute(query, tuple(params))
+            return [dict(row) for row in self.cursor.fetchall()]
+        
+        # Se devuelven copias: quien llama puede agregar claves a cada tarea
+        key = ('technician_tasks', technician_id, to_day_number(start_date), to_day_number(end_date))
+        tasks = [dict(task) for task in self._cached(key, compute)]
         
         print(f"Tareas encontradas: {len(tasks)}")
         if tasks:
@@ -277,12 +772,96 @@ class Database:
         
         return tasks
         
+    def get_tasks_by_technician(self, start_date=None, end_date=None):
+        """
+        Tareas de un período agrupadas por técnico, con una sola consulta
+        (para generar los estados de cuenta de todos los técnicos a la vez).
+        Las tareas sin técnico no se incluyen.
+        
+        Returns:
+            dict: {technician_id: [tareas ordenadas por fecha]}
+        """
+        conditions = ['technician_id IS NOT NULL']
+        params = []
+        if start_date:
+            conditions.append('task_day >= ?')
+            params.append(to_day_number(start_date))
+        if end_date:
+            conditions.append('task_day <= ?')
+            params.append(to_day_number(end_date))
+        
+        self.cursor.execute(f'''
+        SELECT {TASK_SELECT} FROM tasks
+        WHERE {' AND '.join(conditions)}
+        ORDER BY technician_id, task_day, id
+        ''', params)
+        
+        tasks_by_technician = {}
+        for row in self.cursor.fetchall():
+            tasks_by_technician.setdefault(row['technician_id'], []).append(dict(row))
+        return tasks_by_technician
+    
     def get_task(self, task_id):
         """Obtiene una tarea por su ID"""
-        self.cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+        self.cursor.execute(f'SELECT {TASK_SELECT} FROM tasks WHERE id = ?', (task_id,))
         result = self.cursor.fetchone()
         return dict(result) if result else None
+    
+    def search_tasks(self, text, technician_id=None, start_date=None, end_date=None, limit=500):
+        """
+        Busca tareas por cliente, descripción o número de pedido. Cada palabra
+        se busca como prefijo ("gar" encuentra "García") y deben aparecer
+        todas; los resultados se ordenan por relevancia (bm25). Si la base no
+        tiene índice FTS5 se usa una búsqueda con LIKE.
+        """
+        terms = re.findall(r'\w+', text or '')
+        if not terms:
+            return []
         
+        conditions = []
+        params = []
+        if technician_id is not None:
+            conditions.append('t.technician_id = ?')
+            params.append(technician_id)
+        if start_date:
+            conditions.append('t.task_day >= ?')
+            params.append(to_day_number(start_date))
+        if end_date:
+            conditions.append('t.task_day <= ?')
+            params.append(to_day_number(end_date))
+        
+        columns = ', '.join(f't.{column}' for column in TASK_COLUMNS)
+        if self._table_exists('tasks_fts'):
+            match = ' '.join(f'"{term}"*' for term in terms)
+            query = f'''
+            SELECT {columns}, tech.name AS technician_name
+            FROM tasks_fts
+            JOIN tasks t ON t.id = tasks_fts.rowid
+            LEFT JOIN technicians tech ON tech.id = t.technician_id
+            WHERE tasks_fts MATCH ? {''.join(f' AND {c}' for c in conditions)}
+            ORDER BY bm25(tasks_fts), t.task_day DESC
+            LIMIT ?
+            '''
+            params = [match, *params, limit]
+        else:
+            for term in terms:
+                conditions.append(
+                    "(t.client_name LIKE ? OR t.task_description LIKE ? OR t.order_number LIKE ?)"
+                )
+                params.extend([f'%{term}%'] * 3)
+            query = f'''
+            SELECT {columns}, tech.name AS technician_name
+            FROM tasks t
+            LEFT JOIN technicians tech ON tech.id = t.technician_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY t.task_day DESC
+            LIMIT ?
+            '''
+            params.append(limit)
+        
+        self.cursor.execute(query, params)
+        return [dict(row) for row in self.cursor.fetchall()]
+    
     def update_task(self, task_id, task_data):
         """Actualiza una tarea existente"""
         print(f"\n--- Actualizando tarea ID: {task_id} ---")
@@ -290,8 +869,10 @@ class Database:
         
         # Calcular campos derivados
         task_data = self._calculate_derived_fields(task_data)
+        task_data['task_date'] = to_iso(task_data.get('task_date'))
         
-        query = """
+        cents_assignments = ''.join(f',\n            {column}_cents = ?' for column in MONEY_COLUMNS)
+        query = f"""
         UPDATE tasks SET
             technician_id = ?,
             client_name = ?,
@@ -309,7 +890,8 @@ class Database:
             iva = ?,
             payment_type = ?,
             order_number = ?,
-            status = ?
+            status = ?,
+            task_day = ?{cents_assignments}
         WHERE id = ?
         """
         
@@ -331,12 +913,14 @@ class Database:
             task_data.get('payment_type', 'EFECTIVO'),
             task_data.get('order_number', ''),
             task_data.get('status', 'PENDIENTE'),
+            *self._typed_values(task_data),
             task_id
         )
         
         try:
-            self.cursor.execute(query, values)
-            self.conn.commit()
+            with self.transaction(label='update_task'):
+                self.cursor.execute(query, values)
+                self._extend_calendar([to_day_number(task_data['task_date'])])
             print("Tarea actualizada exitosamente")
             return True
         except Exception as e:
@@ -346,49 +930,116 @@ class Database:
     def delete_task(self, task_id):
         """Elimina una tarea por su ID"""
         try:
-            self.cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-            self.conn.commit()
+            with self.transaction(label='delete_task'):
+                self.cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
             return True
         except Exception as e:
             print(f"Error al eliminar la tarea: {e}")
             return False
     
+    # Máximo de ids por sentencia (límite de parámetros de SQLite)
+    _ID_CHUNK = 500
+    
+    def _execute_for_ids(self, label, statement, task_ids, params=()):
+        """
+        Ejecuta statement (con un marcador {ids}) para todos los ids en bloques,
+        dentro de una sola transacción (label es el método que la pide, para
+        las métricas de bloqueo). Los ids se pasan después de params, así que
+        los marcadores de params tienen que ir antes de {ids} en la sentencia.
+        Devuelve la cantidad de filas afectadas.
+        """
+        ids = sorted({int(task_id) for task_id in task_ids})
+        affected = 0
+        with self.transaction(label=label):
+            for i in range(0, len(ids), self._ID_CHUNK):
+                chunk = ids[i:i + self._ID_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                self.cursor.execute(statement.format(ids=placeholders), (*params, *chunk))
+                affected += self.cursor.rowcount
+        return affected
+    
+    def delete_tasks(self, task_ids):
+        """
+        Elimina varias tareas en una sola transacción (DELETE ... WHERE id IN).
+        Los triggers limpian el índice de búsqueda y el registro de importación.
+        
+        Returns:
+            int: cantidad de tareas eliminadas (0 si hubo un error)
+        """
+        try:
+            return self._execute_for_ids('delete_tasks', 'DELETE FROM tasks WHERE id IN ({ids})', task_ids)
+        except Exception as e:
+            print(f"Error al eliminar las tareas: {e}")
+            return 0
+    
+    def update_tasks_status(self, task_ids, status):
+        """
+        Cambia el estado de varias tareas en una sola transacción.
+        
+        Returns:
+            int: cantidad de tareas actualizadas (0 si hubo un error)
+        """
+        try:
+            return self._execute_for_ids(
+                'update_tasks_status',
+                'UPDATE tasks SET status = ? WHERE status IS NOT ? AND id IN ({ids})',
+                task_ids, (status, status)
+            )
+        except Exception as e:
+            print(f"Error al actualizar el estado de las tareas: {e}")
+            return 0
+    
+    def get_task_statuses(self, task_ids):
+        """Estado guardado de cada tarea ({id: estado}); las que no existen no figuran"""
+        ids = sorted({int(task_id) for task_id in task_ids})
+        statuses = {}
+        for i in range(0, len(ids), self._ID_CHUNK):
+            chunk = ids[i:i + self._ID_CHUNK]
+            self.cursor.execute(
+                f"SELECT id, status FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            statuses.update((row[0], row[1]) for row in self.cursor.fetchall())
+        return statuses
+    
     def generate_report(self, technician_id, start_date=None, end_date=None):
+        """
+        Reporte de un técnico: tareas y totales (también por semana y mes).
+        Con technician_id None es el de todos los técnicos (ver
+        _all_technicians_report). Devuelve None si no hay tareas.
+        """
+        served, report = self._from_report_service('generate_report', technician_id, start_date, end_date)
+        if served:
+            return report
+        
+        if technician_id is None:
+            return self._all_technicians_report(start_date, end_date)
+        
         tasks = self.get_technician_tasks(technician_id, start_date, end_date)
         
         if not tasks:
             return None
             
-        # Calcular totales
-        total_tasks = len(tasks)
-        total_income = sum(task['budget_total'] or 0 for task in tasks)
-        total_labor = sum(task['labor_cost'] or 0 for task in tasks)
-        total_material = sum(task['material_cost'] or 0 for task in tasks)
-        total_insurance = sum(task['insurance_payment'] or 0 for task in tasks)
-        total_cash = sum(task['cash_payment'] or 0 for task in tasks)
-        total_material_expense = sum(task['material_expense'] or 0 for task in tasks)
-        total_profit = sum(task['profit'] or 0 for task in tasks)
-        total_iva = sum(task['iva'] or 0 for task in tasks)
-        total_pablo = sum(task['pablo_share'] or 0 for task in tasks)
-        total_facu = sum(task['facu_share'] or 0 for task in tasks)
-        
-        # Calcular totales por semana y mes
-        weekly_totals = self._calculate_weekly_totals(tasks)
-        monthly_totals = self._calculate_monthly_totals(tasks)
+        # Calcular totales en SQL sobre los centavos (sumas exactas)
+        totals = self._sum_task_totals(technician_id, start_date, end_date)
+        
+        # Calcular totales por semana y mes (en SQL)
+        weekly_totals = self._period_totals(technician_id, start_date, end_date, 'week')
+        monthly_totals = self._period_totals(technician_id, start_date, end_date, 'month')
         
         # Crear resumen con todos los totales
         summary = {
-            'total_tasks': total_tasks,
-            'total_income': total_income,
-            'total_labor': total_labor,
-            'total_material': total_material,
-            'total_insurance_payment': total_insurance,
-            'total_cash_payment': total_cash,
-            'total_material_expense': total_material_expense,
-            'total_profit': total_profit,
-            'total_iva': total_iva,
-            'pablo_share': total_pablo,
-            'facu_share': total_facu,
+            'total_tasks': totals['task_count'],
+            'total_income': totals['budget_total'],
+            'total_labor': totals['labor_cost'],
+            'total_material': totals['material_cost'],
+            'total_insurance_payment': totals['insurance_payment'],
+            'total_cash_payment': totals['cash_payment'],
+            'total_material_expense': totals['material_expense'],
+            'total_profit': totals['profit'],
+            'total_iva': totals['iva'],
+            'pablo_share': totals['pablo_share'],
+            'technician_share': totals['pablo_share'],
+            'facu_share': totals['facu_share'],
             'weekly_totals': weekly_totals,
             'monthly_totals': monthly_totals
         }
@@ -404,62 +1055,450 @@ class Database:
         }
         
         return report
+    
+    def _all_technicians_report(self, start_date=None, end_date=None):
+        """
+        Reporte de todos los técnicos (también los dados de baja) con una
+        consulta para las tareas y una suma agrupada para los totales, en vez
+        de un reporte por técnico. Las tareas sin técnico no se incluyen.
+        """
+        technician_ids = {tech['id'] for tech in self.get_technicians(include_inactive=True)}
         
-    def _calculate_weekly_totals(self, tasks):
-        """Agrupa las tareas por semana y calcula totales"""
-        weekly_data = {}
-        for task in tasks:
-            if not task['task_date']:
-                continue
-                
-            # Obtener año y número de semana
-            task_date = datetime.strptime(task['task_date'], '%Y-%m-%d')
-            year_week = f"{task_date.year}-W{task_date.strftime('%U')}"
+        conditions = ['technician_id IN (SELECT id FROM technicians)']
+        params = []
+        if start_date:
+            conditions.append('task_day >= ?')
+            params.append(to_day_number(start_date))
+        if end_date:
+            conditions.append('task_day <= ?')
+            params.append(to_day_number(end_date))
+        
+        def compute():
+            self.cursor.execute(f'''
+            SELECT {TASK_SELECT} FROM tasks
+            WHERE {' AND '.join(conditions)}
+            ORDER BY task_day DESC, id DESC
+            ''', params)
+            return [dict(row) for row in self.cursor.fetchall()]
+        
+        key = ('all_technicians_tasks', to_day_number(start_date), to_day_number(end_date))
+        tasks = [dict(task) for task in self._cached(key, compute)]
+        if not tasks:
+            return None
+        
+        # Totales en centavos, sumando los de cada técnico
+        cents = [0] * (len(MONEY_COLUMNS) + 1)
+        for tech_id, row in self._task_sums_by_technician(None, start_date, end_date).items():
+            if tech_id in technician_ids:
+                cents = [total + value for total, value in zip(cents, row)]
+        totals = dict(zip(MONEY_COLUMNS, (value / 100 for value in cents[1:])))
+        
+        return {
+            'tasks': tasks,
+            'summary': {
+                'total_tasks': cents[0],
+                'total_income': totals['budget_total'],
+                'total_labor': totals['labor_cost'],
+                'total_material': totals['material_cost'],
+                'total_insurance_payment': totals['insurance_payment'],
+                'total_cash_payment': totals['cash_payment'],
+                'total_material_expense': totals['material_expense'],
+                'total_profit': totals['profit'],
+                'total_iva': totals['iva'],
+                'pablo_share': totals['pablo_share'],
+                'technician_share': totals['pablo_share'],
+                'facu_share': totals['facu_share']
+            },
+            'period': {
+                'start': start_date,
+                'end': end_date or datetime.now().strftime('%Y-%m-%d')
+            }
+        }
+    
+    def _task_sums_by_technician(self, technician_id=None, start_date=None, end_date=None,
+                                 columns=MONEY_COLUMNS):
+        """
+        Cantidad de tareas y centavos de cada columna, agrupados por técnico
+        (o solo de technician_id), para un rango de fechas inclusive. Si el
+        almacén de columnas está activo, los días cerrados se suman con NumPy
+        y solo el resto (período abierto o días modificados) se consulta en SQL.
+        
+        Returns:
+            dict: {technician_id: [cantidad, centavos columna 1, ...]}
+        """
+        first_day = to_day_number(start_date) if start_date else None
+        last_day = to_day_number(end_date) if end_date else None
+        
+        totals = {}
+        conditions = []
+        params = []
+        if self.column_store is not None:
+            valid_day = self.column_store.valid_until(self)
+            if valid_day and (first_day is None or first_day < valid_day):
+                store_last = valid_day - 1 if last_day is None else min(last_day, valid_day - 1)
+                totals = self.column_store.sums_by_technician(first_day, store_last, technician_id, columns)
+                if last_day is not None and last_day < valid_day:
+                    return totals
+                # El resto por SQL (las tareas sin fecha solo cuentan sin filtros)
+                if first_day is None and last_day is None:
+                    conditions.append('(task_day >= ? OR task_day IS NULL)')
+                else:
+                    conditions.append('task_day >= ?')
+                params.append(valid_day)
+                first_day = None
+        
+        if technician_id is not None:
+            conditions.append('technician_id = ?')
+            params.append(technician_id)
+        if first_day is not None:
+            conditions.append('task_day >= ?')
+            params.append(first_day)
+        if last_day is not None:
+            conditions.append('task_day <= ?')
+            params.append(last_day)
+        
+        sums = ', '.join(f'COALESCE(SUM({column}_cents), 0)' for column in columns)
+        self.cursor.execute(f'''
+        SELECT technician_id, COUNT(*), {sums}
+        FROM tasks
+        WHERE {' AND '.join(conditions) or '1'}
+        GROUP BY technician_id
+        ''', params)
+        for row in self.cursor.fetchall():
+            current = totals.setdefault(row[0], [0] * (len(columns) + 1))
+            for i, value in enumerate(row[1:]):
+                current[i] += value
+        return totals
+    
+    def _sum_task_totals(self, technician_id, start_date=None, end_date=None):
+        """
+        Suma los montos de las tareas de un técnico en un rango de fechas.
+        Las sumas se hacen en centavos enteros y se devuelven en pesos.
+        """
+        def compute():
+            sums = self._task_sums_by_technician(technician_id, start_date, end_date)
+            row = sums.get(technician_id, [0] * (len(MONEY_COLUMNS) + 1))
             
-            if year_week not in weekly_data:
-                weekly_data[year_week] = {
-                    'week_start': task_date - timedelta(days=task_date.weekday()),
-                    'income': 0,
-                    'profit': 0,
-                    'tasks': 0
+            totals = {'task_count': row[0]}
+            for column, cents in zip(MONEY_COLUMNS, row[1:]):
+                totals[column] = cents / 100
+            return totals
+        
+        key = ('task_totals', technician_id, to_day_number(start_date), to_day_number(end_date))
+        return dict(self._cached(key, compute))
+    
+    def get_general_report(self, start_date=None, end_date=None):
+        """
+        Reporte general: ganancias de cada técnico y del socio en un rango de
+        fechas (inclusive). Una sola consulta agregada sobre los centavos,
+        filtrada por task_day (usa el índice) y agrupada por technician_id;
+        los nombres se agregan después.
+        
+        Returns:
+            dict: period, rows (una por técnico, de mayor a menor ganancia) y
+            totals, listo para mostrar con reports.format_general_report
+        """
+        served, report = self._from_report_service('get_general_report', start_date, end_date)
+        if served:
+            return report
+        
+        def compute():
+            columns = ['budget_total', 'profit', 'pablo_share', 'facu_share']
+            sums = self._task_sums_by_technician(None, start_date, end_date, columns)
+            groups = [(technician_id, *values) for technician_id, values in sums.items()]
+            
+            names = {tech['id']: tech['name'] for tech in self.get_technicians(include_inactive=True)}
+            rows = [
+                {
+                    'technician_id': group[0],
+                    'technician_name': names.get(group[0], 'Sin técnico'),
+                    'task_count': group[1],
+                    'total_income': group[2] / 100,
+                    'total_profit': group[3] / 100,
+                    'technician_share': group[4] / 100,
+                    'facu_share': group[5] / 100
                 }
-                
-            weekly_data[year_week]['income'] += task['budget_total'] or 0
-            weekly_data[year_week]['profit'] += task['profit'] or 0
-            weekly_data[year_week]['tasks'] += 1
+                for group in groups
+            ]
+            rows.sort(key=lambda row: row['technician_share'], reverse=True)
             
-        return weekly_data
-        
-    def _calculate_monthly_totals(self, tasks):
-        """Agrupa las tareas por mes y calcula totales"""
-        monthly_data = {}
-        for task in tasks:
-            if not task['task_date']:
-                continue
-                
-            # Obtener año y mes
-            task_date = datetime.strptime(task['task_date'], '%Y-%m-%d')
-            year_month = task_date.strftime('%Y-%m')
+            # Totales sumados en centavos (sin error de punto flotante)
+            totals = {
+                'task_count': sum(group[1] for group in groups),
+                'total_income': sum(group[2] for group in groups) / 100,
+                'total_profit': sum(group[3] for group in groups) / 100,
+                'technician_share': sum(group[4] for group in groups) / 100,
+                'facu_share': sum(group[5] for group in groups) / 100
+            }
             
-            if year_month not in monthly_data:
-                monthly_data[year_month] = {
-                    'month': task_date.replace(day=1),
-                    'income': 0,
-                    'profit': 0,
-                    'tasks': 0
-                }
+            return {
+                'period': {'start': to_iso(start_date), 'end': to_iso(end_date)},
+                'rows': rows,
+                'totals': totals
+            }
+        
+        key = ('general_report', to_day_number(start_date), to_day_number(end_date))
+        report = self._cached(key, compute)
+        return {'period': dict(report['period']), 'rows': [dict(row) for row in report['rows']],
+                'totals': dict(report['totals'])}
+    
+    def recalculate_derived_fields(self, start_date=None, end_date=None,
+                                   progress_callback=None, chunk_size=5000):
+        """
+        Recalcula IVA, ganancia y distribución de las tareas guardadas con las
+        reglas de tasas vigentes en la fecha de cada una (por ejemplo, después
+        de agregar o corregir una regla). Las tareas se procesan por
+        bloques de ids: cada bloque se calcula de forma vectorizada y se
+        guarda con un executemany, todo en una transacción.
+        
+        El seguro y el efectivo no se tocan: lo guardado ya es el valor neto
+        y el pago original del seguro no se conserva.
+        
+        Args:
+            start_date, end_date: rango de fechas opcional (inclusive)
+            progress_callback: función opcional (tareas_procesadas, total)
+        
+        Returns:
+            int: cantidad de tareas recalculadas
+        """
+        values = {
+            'start_day': to_day_number(start_date), 'end_day': to_day_number(end_date)
+        }
+        conditions = []
+        if start_date:
+            conditions.append('task_day >= :start_day')
+        if end_date:
+            conditions.append('task_day <= :end_day')
+        where = ' AND '.join(conditions) or '1'
+        
+        self.cursor.execute(f'SELECT MIN(id), MAX(id), COUNT(*) FROM tasks WHERE {where}', values)
+        first_id, last_id, total = self.cursor.fetchone()
+        if not total:
+            return 0
+        
+        rules = self.get_rate_rules()
+        recalculated = ['iva', 'profit', 'pablo_share', 'facu_share']
+        assignments = ', '.join(
+            [f'{column} = ?' for column in recalculated] +
+            [f'{column}_cents = ?' for column in recalculated]
+        )
+        update = f'UPDATE tasks SET {assignments} WHERE id = ?'
+        
+        done = 0
+        with self.transaction(label='recalculate_derived_fields'):
+            for chunk_start in range(first_id, last_id + 1, chunk_size):
+                values['first'] = chunk_start
+                values['last'] = chunk_start + chunk_size - 1
+                self.cursor.execute(f'''
+                SELECT id, task_day, budget_total, material_expense FROM tasks
+                WHERE id BETWEEN :first AND :last AND {where}
+                ''', values)
+                chunk = pd.DataFrame(
+                    [tuple(row) for row in self.cursor.fetchall()],
+                    columns=['id', 'task_day', 'budget_total', 'material_expense']
+                )
+                if chunk.empty:
+                    continue
                 
-            monthly_data[year_month]['income'] += task['budget_total'] or 0
-            monthly_data[year_month]['profit'] += task['profit'] or 0
-            monthly_data[year_month]['tasks'] += 1
-            
-        return monthly_data
+                # Mismo cálculo vectorizado que al insertar
+                chunk = calculate_derived_columns(chunk, rules)
+                for column in recalculated:
+                    chunk[f'{column}_cents'] = (chunk[column] * 100).round().astype('int64')
+                
+                rows = chunk[[*recalculated, *(f'{column}_cents' for column in recalculated), 'id']]
+                self.cursor.executemany(update, rows.astype(object).itertuples(index=False, name=None))
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+        
+        self._invalidate_caches()
+        print(f"Recalculadas {done} tareas")
+        return done
+        
+    # Analítica por período (tabla calendar + funciones de ventana de SQLite)
+    _PERIODS = {
+        # bucket: columna de calendar con el número correlativo del período;
+        # step: distancia entre dos períodos seguidos
+        'week': {'bucket': 'c.week_start', 'step': 7},
+        'month': {'bucket': 'c.month_index', 'step': 1},
+        'quarter': {'bucket': 'c.quarter_index', 'step': 1}
+    }
+    
+    def _calendar_gap(self, days):
+        """
+        Rango (primer día, último día) que hay que completar en calendar para
+        que cubra los números de día dados, o None si ya los cubre. El rango
+        incluye el calendario actual, para que siga sin huecos.
+        """
+        days = [int(day) for day in days if day is not None and not pd.isna(day)]
+        if not days:
+            return None
+        first_day, last_day = min(days), max(days)
+        self.cursor.execute('SELECT MIN(day), MAX(day) FROM calendar')
+        calendar_first, calendar_last = self.cursor.fetchone()
+        if calendar_first is None:
+            return first_day, last_day
+        if first_day >= calendar_first and last_day <= calendar_last:
+            return None
+        return min(first_day, calendar_first), max(last_day, calendar_last)
+    
+    def _extend_calendar(self, days):
+        """
+        Completa calendar con los días de las tareas que se están escribiendo.
+        Se llama dentro de la transacción de la escritura: así las consultas
+        por período solo leen y nunca tienen que tomar el bloqueo de escritura.
+        """
+        gap = self._calendar_gap(days)
+        if gap:
+            fill_calendar(self.cursor, *gap)
+    
+    def ensure_calendar(self):
+        """
+        Extiende la tabla calendar para que cubra todas las fechas de tareas
+        guardadas (al iniciar, por bases con tareas anteriores a este control
+        o escritas por otra versión). Solo escribe si falta algún día.
+        """
+        self.cursor.execute('SELECT MIN(task_day), MAX(task_day) FROM tasks')
+        gap = self._calendar_gap(self.cursor.fetchone())
+        if gap:
+            with self.transaction(label='ensure_calendar'):
+                fill_calendar(self.cursor, *gap)
+    
+    def get_period_series(self, period='week', technician_id=None, start_date=None, end_date=None):
+        """
+        Serie semanal ('week', semanas ISO), mensual ('month') o trimestral
+        ('quarter') por técnico, calculada en una sola consulta (de solo
+        lectura: el calendario se completa al escribir las tareas): totales de
+        cada período, promedio móvil de los ingresos de los últimos 4
+        períodos (los períodos sin tareas cuentan como cero) y variación
+        respecto del período anterior. Los períodos salen de la tabla
+        calendar con un JOIN por número de día.
+        
+        Returns:
+            list: un dict por técnico y período, ordenado por técnico y fecha
+        """
+        settings = self._PERIODS[period]
+        bucket, step = settings['bucket'], settings['step']
+        
+        conditions = []
+        params = []
+        if technician_id is not None:
+            conditions.append('t.technician_id = ?')
+            params.append(technician_id)
+        if start_date:
+            conditions.append('t.task_day >= ?')
+            params.append(to_day_number(start_date))
+        if end_date:
+            conditions.append('t.task_day <= ?')
+            params.append(to_day_number(end_date))
         
+        window = 'PARTITION BY technician_id ORDER BY bucket'
+        query = f'''
+        WITH buckets AS (
+            SELECT t.technician_id,
+                   {bucket} AS bucket,
+                   MIN(c.day) AS first_day,
+                   MIN(c.iso_year) AS iso_year,
+                   MIN(c.iso_week) AS iso_week,
+                   MIN(c.year) AS year,
+                   MIN(c.month) AS month,
+                   MIN(c.quarter) AS quarter,
+                   COUNT(*) AS tasks,
+                   SUM(t.budget_total_cents) AS income,
+                   SUM(t.profit_cents) AS profit,
+                   SUM(t.pablo_share_cents) AS technician_share,
+                   SUM(t.facu_share_cents) AS facu_share,
+                   SUM(t.material_expense_cents) AS material_expense
+            FROM tasks t
+            JOIN calendar c ON c.day = t.task_day
+            WHERE {' AND '.join(conditions) or '1'}
+            GROUP BY t.technician_id, bucket
+        )
+        SELECT technician_id, bucket, iso_year, iso_week, year, month, quarter,
+               tasks, income, profit, technician_share, facu_share, material_expense,
+               SUM(income) OVER ({window} RANGE BETWEEN {3 * step} PRECEDING AND CURRENT ROW) / 4.0
+                   AS rolling_income,
+               SUM(income) OVER ({window} RANGE BETWEEN {step} PRECEDING AND {step} PRECEDING)
+                   AS previous_income
+        FROM buckets
+        ORDER BY technician_id, bucket
+        '''
+    
+        def compute():
+            self.cursor.execute(query, params)
+            return [tuple(row) for row in self.cursor.fetchall()]
+        
+        key = ('period_series', period, technician_id, to_day_number(start_date), to_day_number(end_date))
+        rows = self._cached(key, compute)
+        
+        names = {tech['id']: tech['name'] for tech in self.get_technicians(include_inactive=True)}
+        series = []
+        for (tech_id, bucket_value, iso_year, iso_week, year, month, quarter, tasks, income, profit,
+             technician_share, facu_share, material_expense, rolling_income, previous_income) in rows:
+            if period == 'week':
+                period_start = from_day_number(bucket_value)
+                label = f"{iso_year}-W{iso_week:02d}"
+            elif period == 'month':
+                period_start = date(year, month, 1)
+                label = period_start.strftime('%Y-%m')
+            else:
+                period_start = date(year, (quarter - 1) * 3 + 1, 1)
+                label = f"{year}-T{quarter}"
+            
+            previous = (previous_income or 0) / 100
+            series.append({
+                'technician_id': tech_id,
+                'technician_name': names.get(tech_id, 'Sin técnico'),
+                'period': label,
+                'period_start': period_start,
+                'tasks': tasks,
+                'income': income / 100,
+                'profit': profit / 100,
+                'technician_share': technician_share / 100,
+                'facu_share': facu_share / 100,
+                'material_expense': material_expense / 100,
+                'rolling_income': round(rolling_income / 100, 2),
+                'previous_income': previous,
+                'income_delta': round(income / 100 - previous, 2),
+                'income_change': round((income / 100 - previous) / previous, 4) if previous else None
+            })
+        return series
+    
+    def _period_totals(self, technician_id, start_date, end_date, period):
+        """
+        Totales por período de un técnico en el formato de summary
+        (weekly_totals / monthly_totals), a partir de get_period_series.
+        """
+        start_key = 'week_start' if period == 'week' else 'month'
+        totals = {}
+        for row in self.get_period_series(period, technician_id, start_date, end_date):
+            totals[row['period']] = {
+                start_key: row['period_start'],
+                'income': row['income'],
+                'profit': row['profit'],
+                'tasks': row['tasks'],
+                'technician_share': row['technician_share'],
+                'facu_share': row['facu_share'],
+                'material_expense': row['material_expense'],
+                'rolling_income': row['rolling_income'],
+                'income_delta': row['income_delta']
+            }
+        return totals
+    
     def get_technician(self, technician_id):
         self.cursor.execute('SELECT * FROM technicians WHERE id = ?', (technician_id,))
         result = self.cursor.fetchone()
         return dict(result) if result else None
         
+    def export_snapshot(self, path, file_format='parquet', full=False, progress_callback=None):
+        """
+        Snapshot columnar (Parquet o Feather) de técnicos y tareas en la
+        carpeta path; si ya existe solo se agregan las tareas nuevas. Ver
+        snapshot.py (requiere pyarrow).
+        """
+        from .snapshot import export_snapshot
+        return export_snapshot(self, path, file_format, full=full, progress_callback=progress_callback)
+    
     def export_to_excel(self, file_path):
         """
         Exporta todos los datos a un archivo Excel con dos hojas:
@@ -511,61 +1550,165 @@ class Database:
         except Exception as e:
             return False, f"Error al exportar a Excel: {str(e)}"
     
-    def import_from_excel(self, file_path):
+    def import_from_excel(self, file_path, update_existing=False):
         """
-        Importa datos desde un archivo Excel con dos hojas:
+        Importa datos desde un archivo Excel con dos hojas (el formato de
+        export_to_excel):
         - Una con los técnicos
         - Otra con las tareas
+        
+        Los registros se combinan por id: los nuevos se insertan y los que ya
+        existen se omiten, o se actualizan si update_existing es True.
         """
         try:
             # Leer el archivo Excel
             xls = pd.ExcelFile(file_path)
             
-            # Importar técnicos si existe la hoja
-            if 'Tecnicos' in xls.sheet_names:
-                df_tech = pd.read_excel(xls, sheet_name='Tecnicos')
-                for _, row in df_tech.iterrows():
-                    # Verificar si el técnico ya existe
-                    self.cursor.execute('SELECT id FROM technicians WHERE id = ?', (row['id'],))
-                    if not self.cursor.fetchone():
-                        self.cursor.execute(
-                            'INSERT INTO technicians (id, name, email, phone) VALUES (?, ?, ?, ?)',
-                            (row['id'], row['name'], row.get('email', ''), row.get('phone', ''))
-                        )
-            
-            # Importar tareas si existe la hoja
-            if 'Tareas' in xls.sheet_names:
-                df_tasks = pd.read_excel(xls, sheet_name='Tareas')
-                for _, row in df_tasks.iterrows():
-                    # Verificar si la tarea ya existe
-                    self.cursor.execute('SELECT id FROM tasks WHERE id = ?', (row['id'],))
-                    if not self.cursor.fetchone():
-                        # Crear diccionario con los datos de la tarea
-                        task_data = {
-                            'technician_id': row['technician_id'],
-                            'client_name': row['client_name'],
-                            'task_description': row['task_description'],
-                            'task_date': row['task_date'].strftime('%Y-%m-%d') if not pd.isna(row['task_date']) else None,
-                            'budget_total': float(row['budget_total']) if pd.notna(row['budget_total']) else 0,
-                            'labor_cost': float(row['labor_cost']) if pd.notna(row['labor_cost']) else 0,
-                            'material_cost': float(row['material_cost']) if pd.notna(row['material_cost']) else 0,
-                            'insurance_payment': float(row['insurance_payment']) if pd.notna(row['insurance_payment']) else 0,
-                            'cash_payment': float(row['cash_payment']) if pd.notna(row['cash_payment']) else 0,
-                            'material_expense': float(row['material_expense']) if pd.notna(row['material_expense']) else 0,
-                            'payment_type': row.get('payment_type', 'EFECTIVO'),
-                            'order_number': str(row.get('order_number', '')),
-                            'status': row.get('status', 'PENDIENTE')
-                        }
-                        
-                        # Calcular campos derivados
-                        task_data = self._calculate_derived_fields(task_data)
-                        
-                        # Insertar la tarea
-                        self.add_task(task_data)
-            
-            self.conn.commit()
-            return True, "Importación exitosa"
+            with self.transaction(label='import_from_excel'):
+                technicians = {'inserted': 0, 'updated': 0, 'skipped': 0}
+                if 'Tecnicos' in xls.sheet_names:
+                    df_tech = pd.read_excel(xls, sheet_name='Tecnicos')
+                    technicians = self.merge_technicians(df_tech, update_existing)
+                
+                tasks = {'inserted': 0, 'updated': 0, 'skipped': 0}
+                if 'Tareas' in xls.sheet_names:
+                    df_tasks = pd.read_excel(xls, sheet_name='Tareas', dtype={'order_number': str})
+                    tasks = self.merge_tasks(df_tasks, update_existing)
             
+            return True, (
+                "Importación exitosa\n"
+                f"Técnicos: {technicians['inserted']} nuevos, {technicians['updated']} actualizados, "
+                f"{technicians['skipped']} sin cambios\n"
+                f"Tareas: {tasks['inserted']} nuevas, {tasks['updated']} actualizadas, "
+                f"{tasks['skipped']} sin cambios"
+            )
+        
         except Exception as e:
-            self.conn.rollback()
             return False, f"Error al importar desde Excel: {str(e)}"
+    
+    def _stage_rows(self, table_name, columns, df):
+        """
+        Carga las filas de un DataFrame en una tabla temporal con una sola
+        sentencia executemany. La tabla se recrea en cada llamada.
+        """
+        self.cursor.execute(f'DROP TABLE IF EXISTS temp.{table_name}')
+        self.cursor.execute(f"CREATE TEMP TABLE {table_name} ({', '.join(columns)})")
+        values = df[columns].astype(object)
+        rows = values.where(values.notna(), None).itertuples(index=False, name=None)
+        self.cursor.executemany(
+            f"INSERT INTO temp.{table_name} VALUES ({', '.join(['?'] * len(columns))})",
+            rows
+        )
+    
+    def _merge_staged(self, table_name, staging_name, columns, update_existing):
+        """
+        Aplica una tabla temporal sobre la tabla real en una sola sentencia
+        INSERT ... ON CONFLICT(id). Con update_existing solo se reescriben
+        las filas que cambiaron. Devuelve los conteos de insertadas,
+        actualizadas y omitidas.
+        """
+        self.cursor.execute(f'SELECT COUNT(*) FROM temp.{staging_name}')
+        total = self.cursor.fetchone()[0]
+        
+        # Un id repetido se aplica una sola vez (las copias cuentan como
+        # omitidas): queda la última fila si se actualiza, que es la que
+        # ganaría aplicándolas en orden, y la primera si no
+        keep = 'MAX' if update_existing else 'MIN'
+        self.cursor.execute(f'''
+        DELETE FROM temp.{staging_name}
+        WHERE id IS NOT NULL AND rowid NOT IN (
+            SELECT {keep}(rowid) FROM temp.{staging_name} WHERE id IS NOT NULL GROUP BY id
+        )
+        ''')
+        
+        self.cursor.execute(f'''
+        SELECT COUNT(*) FROM temp.{staging_name} s
+        WHERE s.id IS NULL OR NOT EXISTS (SELECT 1 FROM {table_name} t WHERE t.id = s.id)
+        ''')
+        inserted = self.cursor.fetchone()[0]
+        
+        column_list = ', '.join(columns)
+        if update_existing:
+            data_columns = [column for column in columns if column != 'id']
+            assignments = ', '.join(f'{column} = excluded.{column}' for column in data_columns)
+            changed = ' OR '.join(f'{column} IS NOT excluded.{column}' for column in data_columns)
+            conflict = f'DO UPDATE SET {assignments} WHERE {changed}'
+        else:
+            conflict = 'DO NOTHING'
+        
+        # "WHERE true" evita la ambigüedad de ON CONFLICT después de un SELECT
+        self.cursor.execute(f'''
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list} FROM temp.{staging_name} WHERE true
+        ON CONFLICT(id) {conflict}
+        ''')
+        updated = self.cursor.rowcount - inserted
+        self.cursor.execute(f'DROP TABLE temp.{staging_name}')
+        
+        return {'inserted': inserted, 'updated': updated, 'skipped': total - inserted - updated}
+    
+    def merge_technicians(self, df, update_existing=False):
+        """Combina técnicos por id (ver _merge_staged). Devuelve los conteos."""
+        columns = ['id', 'name', 'email', 'phone']
+        df = df.copy()
+        for column in columns:
+            if column not in df.columns:
+                df[column] = None
+        df['id'] = pd.to_numeric(df['id'], errors='coerce').astype('Int64')
+        df = df[df['name'].notna()]
+        
+        with self.transaction(label='merge_technicians'):
+            self._stage_rows('staging_technicians', columns, df)
+            return self._merge_staged('technicians', 'staging_technicians', columns, update_existing)
+    
+    def merge_tasks(self, df, update_existing=False):
+        """
+        Combina tareas por id en unas pocas sentencias: las filas se cargan en
+        una tabla temporal y se aplican con INSERT ... ON CONFLICT. Devuelve
+        los conteos de insertadas, actualizadas y omitidas.
+        """
+        if df.empty:
+            return {'inserted': 0, 'updated': 0, 'skipped': 0}
+        
+        # El seguro y el efectivo exportados ya son los valores guardados: se
+        # conservan y solo se recalculan IVA, ganancia y distribución
+        stored = {
+            column: pd.to_numeric(df[column], errors='coerce').fillna(0.0).round(2)
+            for column in ['insurance_payment', 'cash_payment'] if column in df.columns
+        }
+        df = calculate_derived_columns(df, self.get_rate_rules())
+        for column, values in stored.items():
+            df[column] = values
+        
+        for column in ['id', 'technician_id']:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+            else:
+                df[column] = None
+        df['task_date'] = df['task_date'].map(to_iso) if 'task_date' in df.columns else None
+        df['task_day'] = df['task_date'].map(to_day_number)
+        for column in MONEY_COLUMNS:
+            df[f'{column}_cents'] = (df[column] * 100).round().astype('int64')
+        
+        defaults = {
+            'client_name': '', 'payment_type': 'EFECTIVO',
+            'order_number': '', 'status': 'PENDIENTE'
+        }
+        for column, default in defaults.items():
+            if column in df.columns:
+                df[column] = df[column].astype(object).where(df[column].notna(), default).astype(str)
+            else:
+                df[column] = default
+        if 'task_description' not in df.columns:
+            df['task_description'] = None
+        
+        columns = [
+            'id', 'technician_id', 'client_name', 'task_description', 'task_date',
+            *MONEY_COLUMNS, 'payment_type', 'order_number', 'status',
+            'task_day', *(f'{column}_cents' for column in MONEY_COLUMNS)
+        ]
+        
+        with self.transaction(label='merge_tasks'):
+            self._stage_rows('staging_tasks', columns, df)
+            self._extend_calendar(df['task_day'])
+            return self._merge_staged('tasks', 'staging_tasks', columns, update_existing)
@@ -0,0 +1,180 @@
+"""
+Normalización de fechas compartida por importaciones, reportes y tablas.
+
+Las fechas llegan en varios formatos (celdas de Excel, plantillas, texto
+libre). Este módulo detecta el formato una sola vez por columna, memoriza
+cada texto ya interpretado y convierte columnas completas con pandas, de
+modo que el manejo de fechas deja de ser un costo por fila.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+ISO_FORMAT = '%Y-%m-%d'
+DISPLAY_FORMAT = '%d/%m/%Y'
+
+# Formatos aceptados en orden de prioridad. El de Excel (mm/dd/yyyy) va antes
+# que dd/mm/yyyy como en la importación original; al detectar el formato por
+# columna, cualquier día mayor a 12 descarta el formato de Excel.
+DATE_FORMATS = [
+    '%Y-%m-%d',           # ISO yyyy-mm-dd (formato de la base de datos)
+    '%Y-%m-%d %H:%M:%S',  # Fechas de Excel leídas como texto por pandas
+    '%m/%d/%Y',           # Excel mm/dd/yyyy
+    '%d/%m/%Y',           # dd/mm/yyyy
+    '%d-%m-%Y',           # dd-mm-yyyy
+    '%d.%m.%Y',           # dd.mm.yyyy
+    '%d/%m/%y',           # dd/mm/yy (año de 2 dígitos)
+    '%d-%m-%y',           # dd-mm-yy (año de 2 dígitos)
+]
+
+_EMPTY_VALUES = {'', 'nan', 'nat', 'none'}
+
+
+def _is_empty_text(text):
+    return text.lower() in _EMPTY_VALUES
+
+
+@lru_cache(maxsize=8192)
+def _parse_text(text):
+    """Interpreta un texto de fecha probando los formatos conocidos (memorizado)"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+
+    # Último recurso: interpretación flexible de dateutil (día primero)
+    try:
+        from dateutil import parser
+        return parser.parse(text, dayfirst=True).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_date(value):
+    """
+    Convierte un valor de fecha (texto, date, datetime o Timestamp) en un
+    objeto date. Devuelve None si el valor está vacío o no se reconoce.
+    """
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if _is_empty_text(text):
+        return None
+    return _parse_text(text)
+
+
+def to_iso(value):
+    """Devuelve la fecha en formato de base de datos (yyyy-mm-dd) o None"""
+    parsed = parse_date(value)
+    return parsed.strftime(ISO_FORMAT) if parsed else None
+
+
+@lru_cache(maxsize=8192)
+def _display_text(text):
+    parsed = _parse_text(text)
+    return parsed.strftime(DISPLAY_FORMAT) if parsed else text
+
+
+def to_display(value):
+    """
+    Devuelve la fecha en formato de pantalla (dd/mm/yyyy). Si el valor no se
+    puede interpretar se devuelve como texto sin modificar.
+    """
+    if value is None or value is pd.NaT:
+        return ''
+    if isinstance(value, date):
+        parsed = parse_date(value)
+        return parsed.strftime(DISPLAY_FORMAT) if parsed else ''
+
+    text = str(value).strip()
+    if _is_empty_text(text):
+        return ''
+    return _display_text(text)
+
+
+def detect_format(values, sample_size=200):
+    """
+    Detecta el formato de DATE_FORMATS que interpreta más fechas de una
+    muestra de la columna (ante empate gana el de mayor prioridad), de modo
+    que algunas celdas mal cargadas no impiden reconocer el formato del
+    resto. Devuelve None si ninguno sirve.
+    """
+    sample = [str(v).strip() for v in values if v is not None]
+    sample = [text for text in sample if not _is_empty_text(text)][:sample_size]
+    if not sample:
+        return None
+
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = 0
+        for text in sample:
+            try:
+                datetime.strptime(text, date_format)
+                count += 1
+            except ValueError:
+                continue
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def normalize_column(series, date_format=None):
+    """
+    Convierte una columna completa de fechas a texto ISO (yyyy-mm-dd).
+
+    El formato se detecta una vez para toda la columna (o se recibe ya
+    detectado, p. ej. al procesar un archivo por bloques) y la conversión se
+    hace de forma vectorizada; los valores que no encajan en ese formato se
+    resuelven por valor único con el parser memorizado. Las celdas vacías o
+    irreconocibles quedan como None.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        iso = series.dt.strftime(ISO_FORMAT)
+        return iso.astype(object).where(series.notna(), None)
+
+    texts = series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    non_empty = ~texts.str.lower().isin(_EMPTY_VALUES)
+
+    if date_format is None:
+        date_format = detect_format(texts[non_empty].unique())
+    if date_format:
+        parsed = pd.to_datetime(texts.where(non_empty), format=date_format, errors='coerce')
+    else:
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+    result = parsed.dt.strftime(ISO_FORMAT).astype(object).where(parsed.notna(), None)
+
+    # Valores que no encajan en el formato de la columna: uno por valor único
+    pending = non_empty & parsed.isna()
+    if pending.any():
+        mapping = {text: to_iso(text) for text in texts[pending].unique()}
+        result[pending] = texts[pending].map(mapping)
+        result = result.where(result.notna(), None)
+
+    return result
+
+
+# Número de día que guarda la base de datos (task_day): el ordinal de
+# Python, donde 0001-01-01 es el día 1. En SQL se obtiene con
+# julianday(fecha) - JULIAN_DAY_OFFSET.
+JULIAN_DAY_OFFSET = 1721424.5
+
+
+def to_day_number(value):
+    """Devuelve el número de día (ordinal) de una fecha o None"""
+    parsed = parse_date(value)
+    return parsed.toordinal() if parsed else None
+
+
+def from_day_number(day_number):
+    """Convierte un número de día (ordinal) en un objeto date"""
+    return date.fromordinal(int(day_number)) if day_number else None
@@ -0,0 +1,95 @@
+"""
+Registro de importaciones (ledger) para que reimportar una planilla no
+duplique tareas.
+
+Cada fila importada se identifica por un hash de su contenido (técnico,
+cliente, fecha, número de pedido y montos). Las filas idénticas dentro de
+un mismo archivo se distinguen por su número de aparición, de modo que dos
+trabajos iguales en la planilla siguen siendo dos tareas. Cuando un archivo
+se procesa por bloques, el contador de apariciones (un Counter) se comparte
+entre todos los bloques para que la numeración siga de uno al otro. Si la
+fecha de una fila no se reconoce, el hash usa el texto original de la celda
+(columna source_date) y no la fecha con que la importación la completa, que
+cambia de un día a otro. Además, cada
+archivo se identifica por el hash de sus bytes para poder saltearlo entero
+sin leerlo.
+"""
+import hashlib
+
+import pandas as pd
+
+from .dates import to_iso
+
+# Campos que identifican una fila importada. Son los que no cambian al
+# calcular los campos derivados (el seguro y el efectivo sí se ajustan).
+HASH_FIELDS = [
+    'technician_id', 'client_name', 'task_date', 'order_number',
+    'budget_total', 'labor_cost', 'material_cost', 'material_expense'
+]
+
+_AMOUNT_FIELDS = ['budget_total', 'labor_cost', 'material_cost', 'material_expense']
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].astype(object).where(df[column].notna(), '').astype(str).str.strip()
+
+
+def compute_row_hashes(df, occurrences=None):
+    """
+    Calcula el hash de contenido de cada fila de un DataFrame de tareas
+    (montos en pesos). Devuelve una Series de textos hexadecimales.
+
+    Si el DataFrame tiene la columna source_date, sus textos no vacíos
+    reemplazan a task_date en el hash (fechas no reconocidas).
+
+    occurrences es un collections.Counter opcional con las apariciones de
+    cada fila en los bloques anteriores del mismo archivo: la numeración
+    continúa desde ahí y el Counter se actualiza con este bloque.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    if 'technician_id' in df.columns:
+        technician = pd.to_numeric(df['technician_id'], errors='coerce').astype('Int64').astype(str)
+    else:
+        technician = pd.Series('', index=df.index)
+
+    if 'task_date' in df.columns:
+        task_date = df['task_date'].map(to_iso).fillna('')
+    else:
+        task_date = pd.Series('', index=df.index)
+    if 'source_date' in df.columns:
+        # El prefijo evita que un texto coincida con una fecha ISO válida
+        source_date = _text(df, 'source_date')
+        task_date = task_date.where(source_date == '', '?' + source_date)
+
+    parts = [technician, _text(df, 'client_name').str.lower(), task_date, _text(df, 'order_number')]
+    for column in _AMOUNT_FIELDS:
+        if column in df.columns:
+            amounts = pd.to_numeric(df[column], errors='coerce').fillna(0.0)
+        else:
+            amounts = pd.Series(0.0, index=df.index)
+        parts.append((amounts * 100).round().astype('int64').astype(str))
+
+    key = parts[0]
+    for part in parts[1:]:
+        key = key + '|' + part
+
+    # Número de aparición de cada fila idéntica (continuando los bloques anteriores)
+    occurrence = key.groupby(key).cumcount()
+    if occurrences is not None:
+        occurrence = occurrence + key.map(lambda text: occurrences[text])
+        occurrences.update(key.tolist())
+    occurrence = occurrence.astype(str)
+    return (key + '#' + occurrence).map(lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest())
+
+
+def file_fingerprint(file_path, block_size=1 << 20):
+    """Hash SHA-256 del contenido de un archivo (leído por bloques)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,45 @@
+"""
+Formato de texto de los reportes. Lo usan el diálogo de la aplicación, la
+exportación a TXT y el reporte por línea de comandos (report_cli.py), de
+modo que los tres muestran exactamente lo mismo.
+"""
+from .dates import to_display
+
+
+def format_general_report(report):
+    """
+    Convierte el resultado de Database.get_general_report en texto de ancho
+    fijo (una línea por técnico y una de totales).
+    """
+    start = to_display(report['period']['start']) or 'el inicio'
+    end = to_display(report['period']['end']) or 'hoy'
+
+    lines = [
+        f"Reporte General del {start} al {end}\n",
+        "=" * 72,
+        "{:<24} {:>8} {:>18} {:>18}".format("TÉCNICO", "TAREAS", "GANANCIA TÉCNICO", "GANANCIA FACU"),
+        "-" * 72
+    ]
+
+    for row in report['rows']:
+        lines.append(
+            "{:<24} {:>8} {:>18} {:>18}".format(
+                row['technician_name'][:24],
+                row['task_count'],
+                f"${row['technician_share']:,.2f}",
+                f"${row['facu_share']:,.2f}"
+            )
+        )
+
+    totals = report['totals']
+    lines.extend([
+        "-" * 72,
+        "{:<24} {:>8} {:>18} {:>18}".format(
+            "TOTALES:",
+            totals['task_count'],
+            f"${totals['technician_share']:,.2f}",
+            f"${totals['facu_share']:,.2f}"
+        )
+    ])
+
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+"""
+Reglas de tasas con fecha de vigencia: IVA sobre el presupuesto y reparto
+de la ganancia entre técnico y socio.
+
+Las reglas se guardan en la tabla rate_rules (cada una rige desde su fecha
+hasta la siguiente) y se compilan una sola vez en un RateRules. La base de
+datos, el diálogo de tareas y los recálculos usan ese mismo objeto, de modo
+que las tasas están definidas en un único lugar.
+"""
+from bisect import bisect_right
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from .dates import to_day_number
+
+# Tasas originales; rigen si no hay ninguna regla para la fecha
+IVA_RATE = 0.105          # IVA sobre el presupuesto total
+TECHNICIAN_SHARE = 0.7    # Parte del técnico sobre la ganancia
+PARTNER_SHARE = 0.3       # Parte del socio sobre la ganancia
+
+# Número de día de 0001-01-01: la regla inicial rige para cualquier fecha
+FIRST_DAY = 1
+
+
+class RateRules:
+    """Reglas compiladas: búsqueda binaria por número de día"""
+
+    def __init__(self, rules=()):
+        """
+        Args:
+            rules: tuplas (effective_day, iva_rate, technician_share, partner_share)
+        """
+        rules = sorted(rules)
+        if not rules or rules[0][0] > FIRST_DAY:
+            rules.insert(0, (FIRST_DAY, IVA_RATE, TECHNICIAN_SHARE, PARTNER_SHARE))
+
+        self.days = [rule[0] for rule in rules]
+        self._days = np.array(self.days, dtype='int64')
+        self._rates = np.array([rule[1:] for rule in rules], dtype='float64')
+
+    def __len__(self):
+        return len(self.days)
+
+    def _index(self, day):
+        return bisect_right(self.days, day) - 1
+
+    def rates_for(self, value=None):
+        """
+        Devuelve (iva_rate, technician_share, partner_share) vigentes en una
+        fecha (texto, date o número de día). Sin fecha se usa la de hoy.
+        """
+        day = int(value) if isinstance(value, (int, np.integer)) else to_day_number(value)
+        if not day:
+            day = date.today().toordinal()
+        return tuple(float(rate) for rate in self._rates[self._index(day)])
+
+    def rate_columns(self, days):
+        """
+        Versión vectorizada de rates_for: recibe una Series de números de día
+        (vacío = hoy) y devuelve un DataFrame con iva_rate, technician_share y
+        partner_share alineado con ella.
+        """
+        values = pd.to_numeric(days, errors='coerce').fillna(date.today().toordinal()).to_numpy()
+        positions = np.searchsorted(self._days, values, side='right') - 1
+        return pd.DataFrame(
+            self._rates[positions],
+            index=days.index,
+            columns=['iva_rate', 'technician_share', 'partner_share']
+        )
+
+    def rules(self):
+        """Lista de reglas como diccionarios (para mostrar o exportar)"""
+        return [
+            {
+                'effective_day': day,
+                'effective_date': date.fromordinal(day).isoformat(),
+                'iva_rate': float(rates[0]),
+                'technician_share': float(rates[1]),
+                'partner_share': float(rates[2])
+            }
+            for day, rates in zip(self.days, self._rates)
+        ]
@@ -0,0 +1,460 @@
+"""
+Esquema de la base de datos y migraciones numeradas.
+
+La versión del esquema se guarda en PRAGMA user_version. Al iniciar solo se
+lee ese valor; las migraciones pendientes se aplican una única vez, cada una
+en su propia transacción. Tanto la aplicación como el importador de Excel
+usan esta misma definición.
+"""
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+from .dates import to_iso, JULIAN_DAY_OFFSET
+from .ledger import HASH_FIELDS, compute_row_hashes
+from .rules import FIRST_DAY, IVA_RATE, TECHNICIAN_SHARE, PARTNER_SHARE
+
+# Columnas monetarias de tasks. Además del valor REAL que usa la interfaz, cada
+# una se guarda en centavos enteros (<columna>_cents) para sumar en SQL de forma
+# exacta.
+MONEY_COLUMNS = [
+    'budget_total', 'labor_cost', 'material_cost', 'insurance_payment',
+    'cash_payment', 'material_expense', 'profit', 'pablo_share',
+    'facu_share', 'iva'
+]
+
+# Columnas públicas de tasks (task_day y *_cents son de uso interno)
+TASK_COLUMNS = [
+    'id', 'technician_id', 'client_name', 'task_description', 'task_date',
+    *MONEY_COLUMNS, 'payment_type', 'order_number', 'status', 'created_at'
+]
+
+TASK_SELECT = ', '.join(TASK_COLUMNS)
+
+
+def _table_columns(cursor, table_name):
+    cursor.execute(f'PRAGMA table_info({table_name})')
+    return {column[1] for column in cursor.fetchall()}
+
+
+def _migration_1_base_tables(cursor):
+    """Tablas de técnicos y tareas (incluye columnas agregadas con el tiempo)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS technicians (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        technician_id INTEGER,
+        client_name TEXT NOT NULL,
+        task_description TEXT,
+        task_date TEXT,
+        budget_total REAL,
+        labor_cost REAL,
+        material_cost REAL,
+        insurance_payment REAL,
+        cash_payment REAL,
+        material_expense REAL,
+        profit REAL,
+        pablo_share REAL,
+        facu_share REAL,
+        iva REAL,
+        payment_type TEXT,
+        order_number TEXT,
+        status TEXT DEFAULT 'PENDIENTE',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (technician_id) REFERENCES technicians (id)
+    )
+    ''')
+
+    # Bases de datos antiguas: agregar las columnas que falten
+    existing = _table_columns(cursor, 'tasks')
+    added_columns = [
+        ('insurance_payment', 'REAL'), ('cash_payment', 'REAL'),
+        ('material_expense', 'REAL'), ('profit', 'REAL'),
+        ('pablo_share', 'REAL'), ('facu_share', 'REAL'), ('iva', 'REAL'),
+        ('payment_type', 'TEXT'), ('order_number', 'TEXT'),
+        ('status', "TEXT DEFAULT 'PENDIENTE'")
+    ]
+    for column, column_type in added_columns:
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} {column_type}')
+
+
+def _migration_2_typed_columns(cursor):
+    """
+    Fecha como número de día entero (task_day) y montos en centavos enteros,
+    con índices para búsquedas por técnico y rango de fechas.
+    """
+    existing = _table_columns(cursor, 'tasks')
+    if 'task_day' not in existing:
+        cursor.execute('ALTER TABLE tasks ADD COLUMN task_day INTEGER')
+    for column in MONEY_COLUMNS:
+        if f'{column}_cents' not in existing:
+            cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column}_cents INTEGER')
+
+    # Normalizar a ISO las fechas guardadas en otros formatos
+    cursor.execute("""
+        SELECT id, task_date FROM tasks
+        WHERE task_date IS NOT NULL
+          AND task_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+    """)
+    fixes = []
+    for task_id, task_date in cursor.fetchall():
+        iso = to_iso(task_date)
+        if iso:
+            fixes.append((iso, task_id))
+        else:
+            # Se conserva el texto original; la tarea queda sin task_day
+            print(f"Tarea {task_id}: fecha '{task_date}' no reconocida, se deja como está")
+    cursor.executemany('UPDATE tasks SET task_date = ? WHERE id = ?', fixes)
+
+    # Completar número de día y centavos en una sola pasada
+    cents = ', '.join(
+        f'{column}_cents = CAST(ROUND(COALESCE({column}, 0) * 100) AS INTEGER)'
+        for column in MONEY_COLUMNS
+    )
+    cursor.execute(f"""
+        UPDATE tasks SET
+            task_day = CAST(julianday(task_date) - {JULIAN_DAY_OFFSET} AS INTEGER),
+            {cents}
+    """)
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_technician_day ON tasks (technician_id, task_day)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_day ON tasks (task_day)')
+
+
+def _migration_3_import_ledger(cursor):
+    """
+    Registro de importaciones: hash de contenido por fila y hash por archivo,
+    para que reimportar una planilla no duplique tareas. Las tareas que ya
+    existen se registran para que no se vuelvan a importar.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS import_ledger (
+        row_hash TEXT PRIMARY KEY,
+        task_id INTEGER,
+        file_hash TEXT,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_import_ledger_task ON import_ledger (task_id)')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS import_files (
+        file_hash TEXT PRIMARY KEY,
+        file_name TEXT,
+        row_count INTEGER,
+        imported_count INTEGER,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Al borrar una tarea se libera su hash (se puede volver a importar)
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_import_ledger_delete AFTER DELETE ON tasks
+    BEGIN
+        DELETE FROM import_ledger WHERE task_id = OLD.id;
+    END
+    ''')
+
+    cursor.execute(f"SELECT id, {', '.join(HASH_FIELDS)} FROM tasks ORDER BY id")
+    existing = pd.DataFrame([tuple(row) for row in cursor.fetchall()], columns=['id', *HASH_FIELDS])
+    if not existing.empty:
+        hashes = compute_row_hashes(existing)
+        cursor.executemany(
+            'INSERT OR IGNORE INTO import_ledger (row_hash, task_id) VALUES (?, ?)',
+            zip(hashes.tolist(), existing['id'].tolist())
+        )
+
+
+def _migration_4_rate_rules(cursor):
+    """
+    Tasas de IVA y reparto con fecha de vigencia. La regla inicial tiene las
+    tasas originales y rige desde siempre.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS rate_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        effective_day INTEGER NOT NULL UNIQUE,
+        iva_rate REAL NOT NULL,
+        technician_share REAL NOT NULL,
+        partner_share REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    INSERT OR IGNORE INTO rate_rules (effective_day, iva_rate, technician_share, partner_share)
+    VALUES (?, ?, ?, ?)
+    ''', (FIRST_DAY, IVA_RATE, TECHNICIAN_SHARE, PARTNER_SHARE))
+
+
+# Rango de años que cubre la tabla calendar al crearla; si aparecen tareas
+# fuera de este rango, Database la extiende al escribirlas (y al iniciar).
+CALENDAR_START = date(2000, 1, 1)
+CALENDAR_END = date(2040, 12, 31)
+
+
+def fill_calendar(cursor, first_day, last_day):
+    """
+    Agrega a calendar los días entre first_day y last_day (números de día,
+    inclusive) que falten, con su semana ISO, mes y trimestre precalculados.
+    """
+    rows = []
+    for day in range(first_day, last_day + 1):
+        current = date.fromordinal(day)
+        iso_year, iso_week, iso_weekday = current.isocalendar()
+        quarter = (current.month - 1) // 3 + 1
+        rows.append((
+            day,
+            current.isoformat(),
+            iso_year,
+            iso_week,
+            day - iso_weekday + 1,                   # Lunes de la semana ISO
+            current.year,
+            current.month,
+            current.year * 12 + current.month - 1,   # Número de mes correlativo
+            quarter,
+            current.year * 4 + quarter - 1           # Número de trimestre correlativo
+        ))
+    cursor.executemany('''
+    INSERT OR IGNORE INTO calendar (
+        day, date, iso_year, iso_week, week_start, year, month,
+        month_index, quarter, quarter_index
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def _migration_5_calendar(cursor):
+    """
+    Tabla calendario: una fila por día (clave = número de día de tasks) con
+    la semana ISO, el mes y el trimestre, para agrupar por período con un
+    JOIN en lugar de calcular fechas fila por fila.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS calendar (
+        day INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        iso_year INTEGER NOT NULL,
+        iso_week INTEGER NOT NULL,
+        week_start INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        month_index INTEGER NOT NULL,
+        quarter INTEGER NOT NULL,
+        quarter_index INTEGER NOT NULL
+    )
+    ''')
+
+    cursor.execute('SELECT MIN(task_day), MAX(task_day) FROM tasks')
+    first_task, last_task = cursor.fetchone()
+    first_day = min(CALENDAR_START.toordinal(), first_task or CALENDAR_START.toordinal())
+    last_day = max(CALENDAR_END.toordinal(), last_task or CALENDAR_END.toordinal())
+    fill_calendar(cursor, first_day, last_day)
+
+
+def _migration_6_full_text_search(cursor):
+    """
+    Índice de texto completo (FTS5) sobre cliente, descripción y número de
+    pedido, sincronizado con tasks mediante triggers. Si la versión de SQLite
+    no incluye FTS5 la migración no crea nada y la búsqueda usa LIKE.
+    """
+    try:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            client_name, task_description, order_number,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"Búsqueda de texto completo no disponible (FTS5): {e}")
+        return
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks
+    BEGIN
+        INSERT INTO tasks_fts (rowid, client_name, task_description, order_number)
+        VALUES (NEW.id, NEW.client_name, NEW.task_description, NEW.order_number);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks
+    BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, client_name, task_description, order_number)
+        VALUES ('delete', OLD.id, OLD.client_name, OLD.task_description, OLD.order_number);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update
+    AFTER UPDATE OF client_name, task_description, order_number ON tasks
+    BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, client_name, task_description, order_number)
+        VALUES ('delete', OLD.id, OLD.client_name, OLD.task_description, OLD.order_number);
+        INSERT INTO tasks_fts (rowid, client_name, task_description, order_number)
+        VALUES (NEW.id, NEW.client_name, NEW.task_description, NEW.order_number);
+    END
+    ''')
+
+    # Indexar las tareas existentes
+    cursor.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+def _migration_7_technician_status(cursor):
+    """
+    Baja lógica de técnicos (active = 0): dejan de aparecer para cargar
+    tareas nuevas pero se conservan sus tareas y reportes. Las búsquedas de
+    tareas por técnico ya usan el índice (technician_id, task_day).
+    """
+    if 'active' not in _table_columns(cursor, 'technicians'):
+        cursor.execute('ALTER TABLE technicians ADD COLUMN active INTEGER NOT NULL DEFAULT 1')
+
+
+def _migration_8_column_store_state(cursor):
+    """
+    Estado del almacén de columnas para análisis (columnstore.py): qué
+    generación de archivos .npy es la vigente, hasta qué día cubre y desde
+    qué día quedó desactualizado. Los triggers registran el día más antiguo
+    que se insertó, modificó o eliminó desde la última actualización.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS column_store_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generation INTEGER NOT NULL DEFAULT 0,
+        closed_day INTEGER NOT NULL DEFAULT 0,
+        dirty_from_day INTEGER
+    )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO column_store_state (id) VALUES (1)')
+
+    # Solo interesan los días ya cubiertos por el almacén (antes de closed_day)
+    closed_day = '(SELECT closed_day FROM column_store_state WHERE id = 1)'
+    mark_dirty = '''
+        UPDATE column_store_state
+        SET dirty_from_day = MIN(COALESCE(dirty_from_day, {day}), {day})
+        WHERE id = 1;
+    '''
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_column_store_insert AFTER INSERT ON tasks
+    WHEN NEW.task_day < {closed_day}
+    BEGIN
+        {mark_dirty.format(day='NEW.task_day')}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_column_store_delete AFTER DELETE ON tasks
+    WHEN OLD.task_day < {closed_day}
+    BEGIN
+        {mark_dirty.format(day='OLD.task_day')}
+    END
+    ''')
+    # Los cambios de estado, descripción, etc. no afectan los arreglos
+    cents_columns = ', '.join(f'{column}_cents' for column in MONEY_COLUMNS)
+    changed_day = 'COALESCE(MIN(OLD.task_day, NEW.task_day), OLD.task_day, NEW.task_day)'
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_column_store_update
+    AFTER UPDATE OF technician_id, task_day, {cents_columns} ON tasks
+    WHEN {changed_day} < {closed_day}
+    BEGIN
+        {mark_dirty.format(day=changed_day)}
+    END
+    ''')
+
+
+def _migration_9_task_revision(cursor):
+    """
+    Contador de modificaciones de tareas ya guardadas, para el snapshot de
+    análisis (snapshot.py). Los triggers lo incrementan al modificar o
+    eliminar una tarea, o al insertar una con un id menor al último (p. ej.
+    al combinar un respaldo); las tareas nuevas no lo cambian. Mientras el
+    contador no cambie, una actualización del snapshot solo agrega tareas.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS task_revision (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        revision INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO task_revision (id) VALUES (1)')
+
+    increment = 'UPDATE task_revision SET revision = revision + 1 WHERE id = 1;'
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_revision_update AFTER UPDATE ON tasks
+    BEGIN
+        {increment}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_revision_delete AFTER DELETE ON tasks
+    BEGIN
+        {increment}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_revision_insert AFTER INSERT ON tasks
+    WHEN NEW.id < (SELECT MAX(id) FROM tasks)
+    BEGIN
+        {increment}
+    END
+    ''')
+
+
+# Migraciones en orden: (versión, descripción, función). Nunca modificar una
+# migración ya publicada; los cambios nuevos van en una migración nueva.
+MIGRATIONS = [
+    (1, 'Tablas base de técnicos y tareas', _migration_1_base_tables),
+    (2, 'Fechas como número de día y montos en centavos', _migration_2_typed_columns),
+    (3, 'Registro de importaciones para evitar duplicados', _migration_3_import_ledger),
+    (4, 'Reglas de tasas con fecha de vigencia', _migration_4_rate_rules),
+    (5, 'Tabla calendario para agrupar por semana, mes y trimestre', _migration_5_calendar),
+    (6, 'Búsqueda de texto completo en tareas', _migration_6_full_text_search),
+    (7, 'Baja lógica de técnicos', _migration_7_technician_status),
+    (8, 'Estado del almacén de columnas para análisis', _migration_8_column_store_state),
+    (9, 'Contador de modificaciones de tareas para el snapshot', _migration_9_task_revision),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Aplica las migraciones pendientes. Si el esquema está al día solo cuesta
+    una lectura de PRAGMA user_version. Devuelve la versión final.
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    if conn.in_transaction:
+        conn.commit()
+
+    cursor = conn.cursor()
+    for number, description, migration in MIGRATIONS:
+        if number <= version:
+            continue
+
+        print(f"Aplicando migración {number}: {description}")
+        try:
+            cursor.execute('BEGIN')
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = number
+
+    return version
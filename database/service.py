@@ -0,0 +1,365 @@
+"""
+Servicio HTTP local de solo lectura para oficinas con varias PCs. Una sola
+máquina atiende los reportes pesados con un grupo de conexiones propio y un
+caché de resultados compartido entre todas las consultas, y las demás
+aplicaciones le piden los datos en lugar de leer technicians.db por su
+cuenta (ver ServiceClient y Database.use_report_service).
+
+Rutas (GET):
+    /health                                    estado del servicio
+    /technicians[?include_inactive=1]          lista de técnicos
+    /report?technician_id=&start=&end=         Database.generate_report (sin técnico: todos)
+    /general-report?start=&end=                Database.get_general_report
+    /tasks.csv?technician_id=&start=&end=      tareas en CSV (se envían por partes)
+
+Uso: python report_service.py [puerto] (ver ese script).
+"""
+import csv
+import io
+import json
+import queue
+import struct
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .dates import to_day_number
+from .schema import TASK_COLUMNS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Filas por bloque al enviar CSV
+CSV_CHUNK = 2000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"No se puede convertir a JSON: {type(value).__name__}")
+
+
+class ConnectionPool:
+    """
+    Conexiones reutilizables entre los hilos del servidor; cada una la usa
+    un solo hilo a la vez.
+    """
+
+    def __init__(self, db_name, size=4):
+        # Import diferido: database.py no depende de este módulo
+        from .database import Database
+
+        self._connections = queue.Queue()
+        for _ in range(size):
+            db = Database(db_name)
+            db.connect(check_same_thread=False)
+            self._connections.put(db)
+
+    @contextmanager
+    def connection(self):
+        db = self._connections.get()
+        try:
+            yield db
+        finally:
+            self._connections.put(db)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class ResultCache:
+    """
+    Caché de respuestas compartido por todas las conexiones. Se vacía cuando
+    cambia el contador de cambios del encabezado del archivo SQLite (lo
+    incrementa cada commit de cualquier PC).
+    """
+
+    def __init__(self, db_name, max_entries=256):
+        self.db_name = db_name
+        self.max_entries = max_entries
+        self._entries = {}
+        self._pending = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _file_stamp(self):
+        with open(self.db_name, 'rb') as f:
+            header = f.read(28)
+        return struct.unpack('>I', header[24:28])[0] if len(header) == 28 else None
+
+    def get(self, key, compute):
+        """
+        Devuelve el valor memorizado o lo calcula. Si varias consultas iguales
+        llegan a la vez, solo la primera calcula y las demás esperan su
+        resultado.
+        """
+        while True:
+            stamp = self._file_stamp()
+            with self._lock:
+                if stamp != self._stamp:
+                    self._entries.clear()
+                    self._stamp = stamp
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+                pending = self._pending.get(key)
+                if pending is None:
+                    self.misses += 1
+                    done = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                if self._stamp == stamp:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = value
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            done.set()
+
+
+class QueryService:
+    """Servidor HTTP con un grupo de conexiones y un caché compartido"""
+
+    def __init__(self, db_name, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=4):
+        self.db_name = db_name
+        self.pool = ConnectionPool(db_name, pool_size)
+        self.cache = ResultCache(db_name)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def start(self):
+        """Atiende en un hilo aparte (para usarlo desde otra aplicación)"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='QueryService', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        if self._thread:
+            self._thread.join()
+        self.close()
+
+    def close(self):
+        self.server.server_close()
+        self.pool.close()
+
+    # Consultas (devuelven objetos serializables a JSON)
+    def technicians(self, params):
+        include_inactive = params.get('include_inactive') == '1'
+        return self._cached(('technicians', include_inactive),
+                            lambda db: db.get_technicians(include_inactive=include_inactive))
+
+    def report(self, params):
+        technician_id = int(params['technician_id']) if params.get('technician_id') else None
+        start, end = params.get('start'), params.get('end')
+        return self._cached(('report', technician_id, start, end),
+                            lambda db: db.generate_report(technician_id, start, end))
+
+    def general_report(self, params):
+        start, end = params.get('start'), params.get('end')
+        return self._cached(('general_report', start, end),
+                            lambda db: db.get_general_report(start, end))
+
+    def _cached(self, key, compute):
+        """Respuesta JSON (bytes) memorizada en el caché compartido"""
+        def run():
+            with self.pool.connection() as db:
+                # Se serializa una sola vez; las respuestas repetidas reusan el texto
+                return json.dumps(compute(db), default=_json_default, ensure_ascii=False).encode('utf-8')
+        return self.cache.get(key, run)
+
+    def task_rows(self, params):
+        """Genera las filas de tareas (encabezado primero) para el CSV"""
+        conditions = []
+        values = []
+        if params.get('technician_id'):
+            conditions.append('t.technician_id = ?')
+            values.append(int(params['technician_id']))
+        if params.get('start'):
+            conditions.append('t.task_day >= ?')
+            values.append(to_day_number(params['start']))
+        if params.get('end'):
+            conditions.append('t.task_day <= ?')
+            values.append(to_day_number(params['end']))
+
+        columns = ', '.join(f't.{column}' for column in TASK_COLUMNS)
+        query = f'''
+        SELECT {columns}, tech.name AS technician_name
+        FROM tasks t
+        LEFT JOIN technicians tech ON tech.id = t.technician_id
+        WHERE {' AND '.join(conditions) or '1'}
+        ORDER BY t.task_day, t.id
+        '''
+
+        with self.pool.connection() as db:
+            cursor = db.conn.execute(query, values)
+            yield [*TASK_COLUMNS, 'technician_name']
+            while True:
+                rows = cursor.fetchmany(CSV_CHUNK)
+                if not rows:
+                    break
+                yield from (tuple(row) for row in rows)
+
+    def _handler_class(self):
+        service = self
+        routes = {
+            '/technicians': service.technicians,
+            '/report': service.report,
+            '/general-report': service.general_report,
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                params = dict(urllib.parse.parse_qsl(url.query))
+                try:
+                    if url.path == '/health':
+                        body = json.dumps({
+                            'status': 'ok',
+                            'cache_hits': service.cache.hits,
+                            'cache_misses': service.cache.misses
+                        }).encode('utf-8')
+                        self._send(200, body)
+                    elif url.path in routes:
+                        self._send(200, routes[url.path](params))
+                    elif url.path == '/tasks.csv':
+                        self._send_csv(service.task_rows(params))
+                    else:
+                        self._send(404, json.dumps({'error': 'Ruta desconocida'}).encode('utf-8'))
+                except (KeyError, ValueError) as e:
+                    self._send(400, json.dumps({'error': f'Parámetro inválido: {e}'}).encode('utf-8'))
+                except Exception as e:
+                    print(f"Error en el servicio de consultas ({url.path}): {e}")
+                    self._send(500, json.dumps({'error': str(e)}).encode('utf-8'))
+
+            def _send(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_csv(self, rows):
+                # El encabezado se pide antes de responder: la consulta ya
+                # corrió y sus errores todavía se contestan con un estado de error
+                rows = iter(rows)
+                try:
+                    header = next(rows)
+                except Exception:
+                    rows.close()
+                    raise
+
+                # El CSV se envía por partes (chunked) a medida que se lee. Si
+                # algo falla después de los encabezados ya no se puede enviar
+                # un error: se corta la conexión sin la parte final y el
+                # cliente ve la respuesta incompleta en vez de un CSV truncado
+                self.protocol_version = 'HTTP/1.1'
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                try:
+                    writer.writerow(header)
+                    for i, row in enumerate(rows, start=1):
+                        writer.writerow(row)
+                        if i % CSV_CHUNK == 0:
+                            self._write_chunk(buffer)
+                    self._write_chunk(buffer)
+                    self.wfile.write(b'0\r\n\r\n')
+                except Exception as e:
+                    print(f"Error al enviar el CSV de tareas; se corta la respuesta: {e}")
+                finally:
+                    rows.close()
+
+            def _write_chunk(self, buffer):
+                data = buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                if data:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class ServiceClient:
+    """
+    Cliente del servicio de consultas. Devuelve los mismos datos que los
+    métodos de Database (las fechas de los totales por período vuelven a
+    ser objetos date).
+    """
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _get(self, path, **params):
+        params = {key: value for key, value in params.items() if value is not None}
+        url = f'{self.base_url}{path}?{urllib.parse.urlencode(params)}'
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def get_technicians(self, include_inactive=False):
+        return self._get('/technicians', include_inactive=int(include_inactive))
+
+    def generate_report(self, technician_id, start_date=None, end_date=None):
+        report = self._get('/report', technician_id=technician_id, start=start_date, end=end_date)
+        if report:
+            summary = report['summary']
+            for key, start_key in (('weekly_totals', 'week_start'), ('monthly_totals', 'month')):
+                for totals in summary.get(key, {}).values():
+                    totals[start_key] = date.fromisoformat(totals[start_key])
+        return report
+
+    def get_general_report(self, start_date=None, end_date=None):
+        return self._get('/general-report', start=start_date, end=end_date)
+
+    def iter_task_csv(self, technician_id=None, start_date=None, end_date=None):
+        """
+        Líneas del CSV de tareas, a medida que llegan. Si el servicio corta
+        la respuesta a mitad de camino se levanta http.client.IncompleteRead.
+        """
+        params = {key: value for key, value in
+                  (('technician_id', technician_id), ('start', start_date), ('end', end_date)) if value}
+        url = f'{self.base_url}/tasks.csv?{urllib.parse.urlencode(params)}'
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            # Se lee con read1 (TextIOWrapper): la lectura por líneas de
+            # HTTPResponse toma una respuesta cortada como fin del archivo
+            yield from io.TextIOWrapper(response, encoding='utf-8', newline='')
+
+    def is_available(self):
+        try:
+            return self._get('/health').get('status') == 'ok'
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
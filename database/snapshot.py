@@ -0,0 +1,224 @@
+"""
+Snapshot columnar (Parquet o Feather) de técnicos y tareas para análisis.
+En lugar de leer un .xlsx enorme, los analistas cargan el snapshot con
+load_snapshot (o pandas.read_parquet / read_feather) en milisegundos.
+
+El snapshot es una carpeta:
+    snapshot.json             formato, marca de agua (último id) y control
+    technicians.<ext>         se reescribe completo en cada exportación
+    tasks/part-00000.<ext>    tareas; cada actualización agrega una parte
+
+Las tareas se leen del cursor por bloques y se escriben con tipos
+explícitos: fechas como date, montos como pesos (desde los centavos),
+estado y tipo de pago como categorías. Una actualización incremental solo
+agrega las tareas con id mayor a la marca de agua; si cambió cualquier
+columna de una tarea ya exportada, o se eliminó o insertó una por debajo de
+la marca, se rehace completo. Los cambios se detectan con el contador
+task_revision (migración 9), que los triggers incrementan en cada
+modificación, más el conteo de tareas.
+
+Necesita pyarrow (dependencia opcional: pip install pyarrow).
+"""
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from .schema import MONEY_COLUMNS
+
+FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+MANIFEST = 'snapshot.json'
+
+# Filas por bloque leído del cursor (un row group / record batch por bloque)
+CHUNK_SIZE = 50000
+
+# Día 1 (0001-01-01) en días desde 1970-01-01, para convertir task_day
+EPOCH_DAY = 719163
+
+TEXT_COLUMNS = ['client_name', 'task_description', 'order_number']
+CATEGORY_COLUMNS = ['payment_type', 'status']
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError(
+            "Para exportar snapshots se necesita pyarrow. Instálelo con: pip install pyarrow"
+        )
+    return pyarrow
+
+
+def _task_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('technician_id', pa.int64()),
+        *((column, pa.string()) for column in TEXT_COLUMNS),
+        ('task_date', pa.date32()),
+        *((column, pa.float64()) for column in MONEY_COLUMNS),
+        *((column, pa.dictionary(pa.int32(), pa.string())) for column in CATEGORY_COLUMNS),
+        ('created_at', pa.timestamp('s'))
+    ])
+
+
+def _task_query():
+    cents = ', '.join(f'{column}_cents' for column in MONEY_COLUMNS)
+    return f'''
+    SELECT id, technician_id, {', '.join(TEXT_COLUMNS)}, task_day, {cents},
+           {', '.join(CATEGORY_COLUMNS)}, created_at
+    FROM tasks
+    WHERE id > ?
+    ORDER BY id
+    '''
+
+
+def _chunk_frame(rows):
+    """Convierte un bloque de filas del cursor en un DataFrame tipado"""
+    columns = ['id', 'technician_id', *TEXT_COLUMNS, 'task_day',
+               *(f'{column}_cents' for column in MONEY_COLUMNS), *CATEGORY_COLUMNS, 'created_at']
+    df = pd.DataFrame.from_records(rows, columns=columns)
+
+    # Las tareas con fecha no reconocida (task_day NULL) quedan sin fecha
+    task_day = pd.to_numeric(df.pop('task_day'), errors='coerce').astype('float64')
+    df['task_date'] = pd.to_datetime(task_day - EPOCH_DAY, unit='D').dt.date
+    for column in MONEY_COLUMNS:
+        df[column] = df.pop(f'{column}_cents').astype('float64') / 100
+    df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
+    return df
+
+
+def _checksum(db, watermark):
+    """
+    Control de cambios de las tareas hasta la marca de agua: su conteo y el
+    contador de modificaciones (cambia con cualquier UPDATE o DELETE)
+    """
+    db.cursor.execute('''
+    SELECT (SELECT COUNT(*) FROM tasks WHERE id <= ?),
+           (SELECT revision FROM task_revision WHERE id = 1)
+    ''', (watermark,))
+    return list(db.cursor.fetchone())
+
+
+def _write_table(pa, table, path, file_format):
+    if file_format == 'parquet':
+        pa.parquet.write_table(table, path)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_table(pa, path, file_format):
+    if file_format == 'parquet':
+        return pa.parquet.read_table(path)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def export_snapshot(db, path, file_format='parquet', full=False, chunk_size=CHUNK_SIZE,
+                    progress_callback=None):
+    """
+    Exporta (o actualiza) el snapshot en la carpeta path.
+
+    Args:
+        db: instancia de Database (conectada)
+        path: carpeta del snapshot
+        file_format: 'parquet' o 'feather'
+        full: rehacer el snapshot completo aunque se pueda actualizar
+        chunk_size: filas por bloque leído del cursor
+        progress_callback: función opcional (filas_exportadas)
+
+    Returns:
+        dict: full, added, rows y watermark
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Formato de snapshot desconocido: {file_format}")
+    pa = _pyarrow()
+    extension = FORMATS[file_format]
+    tasks_dir = os.path.join(path, 'tasks')
+    manifest_path = os.path.join(path, MANIFEST)
+    os.makedirs(tasks_dir, exist_ok=True)
+
+    manifest = None
+    if not full and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != file_format or \
+                _checksum(db, manifest['watermark']) != manifest['checksum']:
+            print("Snapshot desactualizado (cambiaron tareas ya exportadas); se rehace completo")
+            manifest = None
+
+    if manifest is None:
+        for name in os.listdir(tasks_dir):
+            if name.startswith('part-'):
+                os.remove(os.path.join(tasks_dir, name))
+        manifest = {'format': file_format, 'watermark': 0, 'rows': 0, 'parts': []}
+        rebuilt = True
+    else:
+        rebuilt = False
+
+    # Técnicos: tabla chica, siempre completa
+    technicians = pd.DataFrame(db.get_technicians(include_inactive=True))
+    _write_table(pa, pa.Table.from_pandas(technicians, preserve_index=False),
+                 os.path.join(path, f'technicians{extension}'), file_format)
+
+    # Tareas nuevas, por bloques del cursor, en una parte nueva
+    schema = _task_schema(pa)
+    part_name = f"part-{len(manifest['parts']):05d}{extension}"
+    part_path = os.path.join(tasks_dir, part_name)
+    cursor = db.conn.execute(_task_query(), (manifest['watermark'],))
+    writer = None
+    added = 0
+    watermark = manifest['watermark']
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            table = pa.Table.from_pandas(_chunk_frame(rows), schema=schema, preserve_index=False)
+            if writer is None:
+                writer = (pa.parquet.ParquetWriter(part_path, schema) if file_format == 'parquet'
+                          else pa.ipc.new_file(part_path, schema))
+            writer.write_table(table)
+            added += len(rows)
+            watermark = rows[-1][0]
+            if progress_callback:
+                progress_callback(manifest['rows'] + added)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if added:
+        manifest['parts'].append(part_name)
+    manifest.update({
+        'watermark': watermark,
+        'rows': manifest['rows'] + added,
+        'checksum': _checksum(db, watermark),
+        'updated_at': datetime.now().isoformat(timespec='seconds')
+    })
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return {'full': rebuilt, 'added': added, 'rows': manifest['rows'], 'watermark': watermark}
+
+
+def load_snapshot(path):
+    """
+    Carga un snapshot exportado.
+
+    Returns:
+        tuple: (tareas, técnicos) como DataFrames
+    """
+    pa = _pyarrow()
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    file_format = manifest['format']
+    extension = FORMATS[file_format]
+
+    parts = [_read_table(pa, os.path.join(path, 'tasks', name), file_format) for name in manifest['parts']]
+    tasks = (pa.concat_tables(parts) if parts
+             else _task_schema(pa).empty_table())
+    technicians = _read_table(pa, os.path.join(path, f'technicians{extension}'), file_format)
+    return tasks.to_pandas(), technicians.to_pandas()
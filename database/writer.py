@@ -0,0 +1,154 @@
+"""
+Hilo escritor con commit agrupado. Las escrituras interactivas (agregar,
+editar o eliminar tareas) se encolan y un único hilo las aplica con su
+propia conexión: las que llegan dentro de una ventana corta se confirman
+juntas en una sola transacción, de modo que el costo del commit (fsync, muy
+lento en la carpeta compartida de red) se paga una vez por grupo y no una
+vez por operación, y la interfaz no se bloquea esperándolo.
+
+Cada operación devuelve un concurrent.futures.Future que se resuelve recién
+después del commit, con el valor que devuelve el método de Database (o con
+la excepción, si falló). Cada operación corre dentro de un SAVEPOINT: si una
+falla se deshace solo esa y el resto del grupo se confirma igual.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Tiempo máximo que se espera por más operaciones antes de confirmar un grupo
+GROUP_WINDOW = 0.05
+
+# Máximo de operaciones por transacción
+MAX_GROUP_SIZE = 200
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """
+    Hilo escritor de una base de datos. Uso:
+
+        writer = DatabaseWriter(db.db_name)
+        future = writer.submit('add_task', task_data)
+        future.add_done_callback(...)
+        writer.stop()
+    """
+
+    def __init__(self, db_name, window=GROUP_WINDOW, max_group_size=MAX_GROUP_SIZE, busy_timeout=None):
+        self.db_name = db_name
+        self.busy_timeout = busy_timeout
+        self.window = window
+        self.max_group_size = max_group_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='DatabaseWriter', daemon=True)
+        self._started = threading.Event()
+        self._startup_error = None
+        self.groups_committed = 0
+        self.operations_committed = 0
+        self._thread.start()
+        self._started.wait()
+        if self._startup_error:
+            raise self._startup_error
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Encola una llamada a un método de escritura de Database (por nombre).
+
+        Returns:
+            Future: se resuelve después del commit con el resultado del método
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("El hilo escritor está detenido")
+        future = Future()
+        self._queue.put((method, args, kwargs, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Espera a que se confirmen todas las operaciones encoladas hasta ahora"""
+        return self.submit('_writer_noop').result(timeout)
+
+    def stop(self, timeout=None):
+        """Confirma lo pendiente y detiene el hilo"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        # Import diferido: database.py no depende de este módulo
+        from .database import Database
+
+        db = Database(self.db_name, busy_timeout=self.busy_timeout)
+        self.db = db
+        try:
+            db.connect()
+        except Exception as e:
+            self._startup_error = e
+            self._started.set()
+            return
+        self._started.set()
+
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+
+                # Juntar lo que llegue dentro de la ventana
+                group = [first]
+                deadline = time.monotonic() + self.window
+                while len(group) < self.max_group_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    group.append(item)
+
+                self._commit_group(db, group)
+        finally:
+            db.close()
+
+    def _commit_group(self, db, group):
+        """Aplica un grupo de operaciones en una transacción y resuelve sus futures"""
+        results = []
+        # Las métricas de bloqueo del grupo quedan a nombre de sus operaciones
+        label = 'writer: ' + ', '.join(sorted({method for method, _, _, _ in group}))
+        try:
+            with db.transaction(label=label):
+                for method, args, kwargs, future in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    db.cursor.execute('SAVEPOINT writer_operation')
+                    try:
+                        if method == '_writer_noop':
+                            result = None
+                        else:
+                            result = getattr(db, method)(*args, **kwargs)
+                    except Exception as e:
+                        db.cursor.execute('ROLLBACK TO writer_operation')
+                        db.cursor.execute('RELEASE writer_operation')
+                        future.set_exception(e)
+                        continue
+                    db.cursor.execute('RELEASE writer_operation')
+                    results.append((future, result))
+        except Exception as e:
+            # Falló el BEGIN o el commit (p. ej. la base siguió bloqueada después
+            # de los reintentos): ninguna operación del grupo quedó guardada y
+            # todas las que no terminaron reciben el error
+            print(f"Error al confirmar un grupo de escrituras: {e}")
+            for _, _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.groups_committed += 1
+        self.operations_committed += len(results)
+        for future, result in results:
+            future.set_result(result)
@@ -1,133 +1,591 @@
+import csv
+import gzip
+import multiprocessing
 import os
-import sqlite3
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+import pandas as pd
 from openpyxl import load_workbook
+from database import Database
+from database.database import get_app_dir
+from database.dates import detect_format, normalize_column, to_day_number
+from database.ledger import file_fingerprint
+from database.schema import MONEY_COLUMNS
+
+# Mapeo de columnas del Excel a los campos de la base de datos
+COLUMN_MAPPING = {
+    'FECHA': 'task_date',
+    'CLIENTE': 'client_name',
+    'PEDIDO': 'order_number',
+    'TAREA': 'task_description',
+    'PRESUPUESTO': 'budget_total',
+    'MANO DE OBRA': 'labor_cost',
+    'MATERIAL': 'material_cost',
+    'SEGURO': 'insurance_payment',
+    'EFECTIVO': 'cash_payment',
+    'GASTO MATERIAL': 'material_expense'
+}
+
+# Columna opcional con el nombre del técnico
+TECHNICIAN_HEADERS = ['TÉCNICO', 'TECNICO']
+
+AMOUNT_FIELDS = [
+    'budget_total', 'labor_cost', 'material_cost',
+    'insurance_payment', 'cash_payment', 'material_expense'
+]
+
+
+def parse_amounts(series):
+    """
+    Convierte una columna de montos a float de forma vectorizada. Admite
+    coma decimal con punto de miles (1.234,56). Las celdas vacías quedan NaN.
+    """
+    text = series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    comma = text.str.contains(',', regex=False)
+    text = text.where(
+        ~comma,
+        text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    )
+    return pd.to_numeric(text.where(text != '', None), errors='coerce')
+
 
 class ExcelImporter:
-    def __init__(self, db_path):
+    def __init__(self, db_path=None, chunk_size=1000):
+        # Por defecto, la misma base de datos que usa la aplicación
+        if db_path is None:
+            db_path = os.path.join(get_app_dir(), 'technicians.db')
         self.db_path = db_path
+        self.chunk_size = chunk_size
         
     def import_excel(self, file_path):
         """
-        Importa datos de un archivo Excel a la base de datos SQLite
+        Importa datos de un archivo Excel a la base de datos SQLite.
+        
+        La hoja se lee en modo streaming y se procesa por bloques: fechas y
+        montos se convierten por columna, los campos derivados se calculan de
+        forma vectorizada y las filas válidas se insertan con executemany,
+        todo dentro de una única transacción. Las filas que ya se importaron
+        antes se omiten, y un archivo sin cambios desde la última importación
+        se saltea sin leerlo.
         
         Args:
             file_path (str): Ruta al archivo Excel a importar
             
         Returns:
-            tuple: (total_registros, exitosos, errores)
+            tuple: (total_registros, exitosos, errores, segundos)
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"El archivo {file_path} no existe")
-            
-        # Cargar el archivo Excel
-        wb = load_workbook(filename=file_path, data_only=True)
-        sheet = wb.active
-        
-        # Obtener los encabezados
-        headers = [cell.value for cell in sheet[1]]
-        
-        # Mapeo de columnas del Excel a los campos de la base de datos
-        column_mapping = {
-            'FECHA': 'task_date',
-            'CLIENTE': 'client_name',
-            'PEDIDO': 'order_number',
-            'TAREA': 'task_description',
-            'PRESUPUESTO': 'budget_total',
-            'MANO DE OBRA': 'labor_cost',
-            'MATERIAL': 'material_cost',
-            'SEGURO': 'insurance_payment',
-            'EFECTIVO': 'cash_payment',
-            'GASTO MATERIAL': 'material_expense',
-            'IVA': 'iva',
-            'GANANCIA': 'profit',
-            'PABLO (70%)': 'pablo_share',
-            'FACU (30%)': 'facu_share'
-        }
-        
-        # Verificar que todas las columnas necesarias estén presentes
-        missing_columns = [col for col in column_mapping.keys() if col not in headers]
-        if missing_columns:
-            raise ValueError(f"Faltan columnas requeridas en el Excel: {', '.join(missing_columns)}")
-        
-        # Conectar a la base de datos
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
-        total = 0
-        success = 0
-        errors = []
+        started = time.perf_counter()
+        self.skipped = 0
         
-        # Procesar cada fila (empezando desde la fila 2 para omitir encabezados)
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), 2):
+        db = Database(self.db_path)
+        db.initialize_database()
+        try:
+            # Archivo sin cambios desde la última importación: no se lee
+            file_hash = file_fingerprint(file_path)
+            if db.is_file_imported(file_hash):
+                print(f"Archivo ya importado, se omite: {file_path}")
+                return 0, 0, ["El archivo ya fue importado (no tiene cambios)"], time.perf_counter() - started
+            
+            # Cargar el archivo Excel en modo solo lectura (streaming)
+            wb = load_workbook(filename=file_path, read_only=True, data_only=True)
             try:
-                # Crear diccionario con los datos de la fila
-                row_data = {column_mapping[header]: value 
-                           for header, value in zip(headers, row) 
-                           if header in column_mapping}
-                
-                # Convertir fecha de string a formato SQLite (YYYY-MM-DD)
-                if 'task_date' in row_data and row_data['task_date']:
-                    if isinstance(row_data['task_date'], str):
-                        # Si es string, convertir a datetime
-                        date_obj = datetime.strptime(row_data['task_date'], '%d/%m/%Y')
-                    else:
-                        # Si ya es un objeto date
-                        date_obj = row_data['task_date']
-                    row_data['task_date'] = date_obj.strftime('%Y-%m-%d')
+                sheet = wb.active
+                rows = sheet.iter_rows(values_only=True)
                 
-                # Reemplazar comas por puntos en los números
-                for key, value in row_data.items():
-                    if isinstance(value, str):
-                        # Si es un número con coma decimal
-                        if ',' in value and value.replace(',', '').replace('.', '').isdigit():
-                            # Reemplazar comas por puntos y convertir a float
-                            row_data[key] = float(value.replace('.', '').replace(',', '.'))
+                # Obtener los encabezados
+                headers = [str(value).strip().upper() if value is not None else '' for value in next(rows, ())]
                 
-                # Insertar en la base de datos
-                columns = ', '.join(row_data.keys())
-                placeholders = ', '.join(['?'] * len(row_data))
-                values = tuple(row_data.values())
+                # Verificar que todas las columnas necesarias estén presentes
+                missing_columns = [col for col in COLUMN_MAPPING if col not in headers]
+                if missing_columns:
+                    raise ValueError(f"Faltan columnas requeridas en el Excel: {', '.join(missing_columns)}")
                 
-                # Asegurarse de que la tabla existe
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS tasks (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        task_date TEXT,
-                        client_name TEXT,
-                        order_number TEXT,
-                        task_description TEXT,
-                        budget_total REAL,
-                        labor_cost REAL,
-                        material_cost REAL,
-                        insurance_payment REAL,
-                        cash_payment REAL,
-                        material_expense REAL,
-                        iva REAL,
-                        profit REAL,
-                        pablo_share REAL,
-                        facu_share REAL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
+                technicians = {tech['name'].lower().strip(): tech['id'] for tech in import_technicians(db)}
                 
-                # Insertar el registro
-                cursor.execute(
-                    f"INSERT INTO tasks ({columns}) VALUES ({placeholders})",
-                    values
-                )
+                total = 0
+                success = 0
+                errors = []
+                self.date_format = None
+                occurrences = Counter()  # Filas idénticas, contadas en todo el archivo
                 
-                success += 1
-            except Exception as e:
-                errors.append(f"Fila {row_idx}: {str(e)}")
+                with db.transaction(label='import_excel'):
+                    chunk = []
+                    row_numbers = []  # Fila real de la hoja de cada fila del bloque
+                    for row_number, row in enumerate(rows, start=2):
+                        if not any(value is not None and str(value).strip() for value in row):
+                            continue  # Fila vacía
+                        chunk.append(row)
+                        row_numbers.append(row_number)
+                        if len(chunk) >= self.chunk_size:
+                            success += self._import_chunk(db, headers, chunk, row_numbers, technicians, errors,
+                                                          file_hash, occurrences)
+                            total += len(chunk)
+                            chunk = []
+                            row_numbers = []
+                    if chunk:
+                        success += self._import_chunk(db, headers, chunk, row_numbers, technicians, errors,
+                                                      file_hash, occurrences)
+                        total += len(chunk)
+                    db.record_imported_file(file_hash, os.path.basename(file_path), total, success, self.skipped)
             finally:
-                total += 1
+                wb.close()
+        finally:
+            db.close()
+        
+        elapsed = time.perf_counter() - started
+        print(f"Importación: {success} de {total} filas en {elapsed:.2f} s "
+              f"({total / elapsed if elapsed else 0:,.0f} filas/s), {self.skipped} ya importadas")
+        
+        return total, success, errors, elapsed
+    
+    def _import_chunk(self, db, headers, chunk, row_numbers, technicians, errors, file_hash=None, occurrences=None):
+        """
+        Convierte, valida e inserta un bloque de filas. row_numbers tiene la
+        fila de la hoja de cada una (para los errores). Devuelve las insertadas.
+        """
+        raw = pd.DataFrame([list(row) + [None] * (len(headers) - len(row)) for row in chunk])
+        raw = raw.iloc[:, :len(headers)]
+        raw.columns = headers
+        raw.index = row_numbers
+        
+        df = pd.DataFrame(index=raw.index)
+        invalid = pd.Series('', index=raw.index)
+        
+        # Fechas: formato detectado una vez por archivo (en el primer bloque)
+        if self.date_format is None:
+            self.date_format = detect_format(raw['FECHA'].dropna().astype(str).unique()) or ''
+        df['task_date'] = normalize_column(raw['FECHA'], self.date_format or None)
+        bad_date = df['task_date'].isna() & raw['FECHA'].notna() & (raw['FECHA'].astype(str).str.strip() != '')
+        invalid[bad_date] = 'Formato de fecha no reconocido: ' + raw.loc[bad_date, 'FECHA'].astype(str)
+        
+        # Textos
+        for header in ['CLIENTE', 'PEDIDO', 'TAREA']:
+            df[COLUMN_MAPPING[header]] = raw[header].astype(object).where(raw[header].notna(), '').astype(str).str.strip()
+        no_client = (df['client_name'] == '') & (invalid == '')
+        invalid[no_client] = 'El campo CLIENTE está vacío'
         
-        # Guardar cambios y cerrar conexión
-        conn.commit()
-        conn.close()
+        # Montos
+        for header, field in COLUMN_MAPPING.items():
+            if field not in AMOUNT_FIELDS:
+                continue
+            amounts = parse_amounts(raw[header])
+            has_value = raw[header].notna() & (raw[header].astype(str).str.strip() != '')
+            bad_amount = amounts.isna() & has_value & (invalid == '')
+            invalid[bad_amount] = f'Monto inválido en {header}: ' + raw.loc[bad_amount, header].astype(str)
+            df[field] = amounts.fillna(0.0)
         
-        return total, success, errors
+        # Técnico (opcional)
+        tech_header = next((h for h in TECHNICIAN_HEADERS if h in headers), None)
+        if tech_header:
+            names = raw[tech_header].astype(object).where(raw[tech_header].notna(), '').astype(str)
+            names = names.str.replace(r'\s*\(.*?\)', '', regex=True).str.strip().str.lower()
+            df['technician_id'] = names.map(technicians)
+            unknown = df['technician_id'].isna() & (names != '') & (invalid == '')
+            invalid[unknown] = 'Técnico no encontrado: ' + raw.loc[unknown, tech_header].astype(str)
+        
+        for row_number, message in invalid[invalid != ''].items():
+            errors.append(f"Fila {row_number}: {message}")
+        
+        valid = df[invalid == '']
+        inserted, skipped = db.import_tasks(valid, file_hash, occurrences)
+        self.skipped += skipped
+        return inserted
+
+
+# Columnas de la plantilla de importación (hoja "Tareas")
+TEMPLATE_COLUMNS = {
+    'Técnico': 'technician_name',
+    'Cliente': 'client_name',
+    'Tarea': 'task_description',
+    'Presupuesto Total': 'budget_total',
+    'Mano de Obra': 'labor_cost',
+    'Presupuesto Materiales': 'material_cost',
+    'Pago Seguro': 'insurance_payment',
+    'Efectivo': 'cash_payment',
+    'Número Pedido': 'order_number',
+    'Gasto Material': 'material_expense',
+    'Tipo de Pago': 'payment_type',
+    'Estado': 'status',
+    'Fecha (AAAA-MM-DD)': 'task_date'
+}
+
+TEMPLATE_REQUIRED_COLUMNS = [
+    'Técnico', 'Cliente', 'Tarea',
+    'Presupuesto Total', 'Efectivo', 'Pago Seguro'
+]
+
+
+def import_technicians(db):
+    """
+    Técnicos contra los que se validan todas las importaciones: también los
+    dados de baja, para poder volver a cargar sus tareas antiguas.
+    """
+    return db.get_technicians(include_inactive=True)
+
+
+def _resolve_technician(name, technicians, tech_name_to_id):
+    """Devuelve (technician_id, error) para un nombre de técnico de la plantilla"""
+    # Limpiar el nombre (eliminar cualquier texto entre paréntesis como IDs)
+    name_clean = re.sub(r'\s*\(.*?\)', '', name).strip()
+    name_lower = name_clean.lower()
+    
+    if not name_lower:
+        return None, "El campo 'Técnico' está vacío"
+    
+    # Buscar el técnico por nombre (insensible a mayúsculas)
+    if name_lower in tech_name_to_id:
+        return tech_name_to_id[name_lower], None
+    
+    # Si no se encuentra, intentar buscar coincidencias parciales
+    matching_techs = [tech for tech in technicians if name_lower in tech['name'].lower()]
+    if len(matching_techs) == 1:
+        return matching_techs[0]['id'], None
+    if len(matching_techs) > 1:
+        return None, f"Múltiples técnicos coinciden con '{name_clean}'. Por favor, sea más específico."
+    return None, f"Técnico no encontrado: '{name_clean}'. Técnicos disponibles: {', '.join(tech_name_to_id.keys())}"
+
+
+def normalize_task_frame(df, technicians, today=None, first_row=2):
+    """
+    Normaliza un DataFrame con las columnas de la plantilla (todo texto) y lo
+    convierte en tareas listas para Database.add_tasks. Todo el trabajo se
+    hace por columna; los técnicos se resuelven una vez por nombre distinto.
+    El índice de df es la posición de cada fila en el archivo contando desde
+    la primera fila de datos, que es la fila first_row (para los errores).
+    
+    Returns:
+        tuple: (DataFrame de tareas válidas, lista de errores)
+    """
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    df = df.fillna('')
+    row_numbers = pd.Series(df.index + first_row, index=df.index)
+    errors = []
+    invalid = pd.Series(False, index=df.index)
+    
+    def column(name, default=''):
+        return df[name].astype(str).str.strip() if name in df.columns else pd.Series(default, index=df.index)
+    
+    def add_errors(mask, messages):
+        for row_number, message in zip(row_numbers[mask], messages[mask]):
+            errors.append(f"Fila {row_number}: {message}")
+    
+    tasks = pd.DataFrame(index=df.index)
+    
+    # Técnicos: una búsqueda por nombre distinto
+    tech_name_to_id = {tech['name'].lower().strip(): tech['id'] for tech in technicians}
+    names = column('Técnico')
+    resolved = {name: _resolve_technician(name, technicians, tech_name_to_id) for name in names.unique()}
+    tasks['technician_id'] = names.map(lambda name: resolved[name][0])
+    tech_errors = names.map(lambda name: resolved[name][1])
+    bad_tech = tech_errors.notna()
+    add_errors(bad_tech, tech_errors)
+    invalid |= bad_tech
+    
+    tasks['client_name'] = column('Cliente')
+    tasks['task_description'] = column('Tarea')
+    tasks['order_number'] = column('Número Pedido')
+    
+    # Montos (celdas vacías cuentan como 0)
+    for header, field in TEMPLATE_COLUMNS.items():
+        if field not in AMOUNT_FIELDS:
+            continue
+        raw = column(header)
+        amounts = parse_amounts(raw)
+        bad_amount = amounts.isna() & (raw != '') & ~invalid
+        add_errors(bad_amount, f"Monto inválido en '{header}': " + raw)
+        invalid |= bad_amount
+        tasks[field] = amounts.fillna(0.0)
+    
+    # Fechas: formato detectado una vez para toda la columna
+    raw_dates = column('Fecha (AAAA-MM-DD)')
+    tasks['task_date'] = normalize_column(raw_dates)
+    bad_date = tasks['task_date'].isna() & (raw_dates != '') & ~invalid
+    add_errors(bad_date, "Formato de fecha no reconocido: '" + raw_dates + "'. Se usará la fecha actual.")
+    tasks['task_date'] = tasks['task_date'].fillna(today)
+    # El registro de importaciones identifica la fila por el texto original,
+    # no por la fecha del día (ver ledger.compute_row_hashes)
+    tasks['source_date'] = raw_dates.where(bad_date, '')
+    
+    # Validar estado y tipo de pago
+    status = column('Estado').str.upper()
+    tasks['status'] = status.where(status.isin(['PENDIENTE', 'COMPLETADA']), 'PENDIENTE')
+    payment_type = column('Tipo de Pago').str.upper()
+    tasks['payment_type'] = payment_type.where(payment_type.isin(['EFECTIVO', 'TRANSFERENCIA']), 'EFECTIVO')
+    
+    return tasks[~invalid], errors
+
+
+# Filas por bloque al leer o escribir CSV
+CSV_CHUNK_SIZE = 20000
+
+
+def is_csv_file(file_path):
+    """True para archivos .csv o .csv.gz (formato de la plantilla en texto)"""
+    return file_path.lower().endswith(('.csv', '.csv.gz'))
+
+
+def _check_template_columns(columns):
+    missing_columns = [col for col in TEMPLATE_REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        raise ValueError(f"Faltan columnas requeridas en el archivo: {', '.join(missing_columns)}")
+
+
+def read_task_csv(file_path, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Lee un CSV (o CSV comprimido con gzip) con las columnas de la plantilla
+    por bloques, todo como texto. Devuelve un iterador de DataFrames. Las
+    líneas vacías se descartan, pero el índice conserva la posición de cada
+    fila en el archivo (para informar la fila correcta en los errores).
+    """
+    chunks = pd.read_csv(
+        file_path, dtype=str, keep_default_na=False, chunksize=chunk_size,
+        compression='infer', encoding='utf-8-sig', skip_blank_lines=False
+    )
+    for chunk in chunks:
+        _check_template_columns(chunk.columns)
+        yield chunk[(chunk.fillna('').apply(lambda values: values.str.strip()) != '').any(axis=1)]
+
+
+def parse_task_workbook(file_path, technicians):
+    """
+    Lee y normaliza la hoja "Tareas" de un archivo con el formato de la
+    plantilla (o un CSV con las mismas columnas). No toca la base de datos,
+    por lo que puede ejecutarse en otro proceso (ver import_task_workbooks).
+    
+    Returns:
+        dict: file, total, tasks (DataFrame), errors
+    """
+    if is_csv_file(file_path):
+        chunks = list(read_task_csv(file_path))
+        df = pd.concat(chunks) if chunks else pd.DataFrame(columns=list(TEMPLATE_COLUMNS))
+        _check_template_columns(df.columns)
+        tasks, errors = normalize_task_frame(df, technicians)
+        return {'file': file_path, 'total': len(df), 'tasks': tasks, 'errors': errors}
+    
+    xls = pd.ExcelFile(file_path, engine='openpyxl')
+    if 'Tareas' not in xls.sheet_names:
+        raise ValueError("El archivo no contiene una hoja llamada 'Tareas'")
+    
+    # Leer la hoja de Tareas, convirtiendo todo a string para evitar problemas de validación
+    df = pd.read_excel(xls, sheet_name='Tareas', dtype=str)
+    _check_template_columns(df.columns)
+    
+    tasks, errors = normalize_task_frame(df, technicians)
+    return {'file': file_path, 'total': len(df), 'tasks': tasks, 'errors': errors}
+
+
+def import_task_csv(db, file_path, chunk_size=CSV_CHUNK_SIZE, progress_callback=None):
+    """
+    Importa un CSV (o .csv.gz) con las columnas de la plantilla sin cargarlo
+    entero en memoria: cada bloque se normaliza por columna y se inserta con
+    Database.import_tasks, todo en una única transacción. Como en las
+    planillas, un archivo sin cambios se saltea y las filas ya importadas se
+    omiten.
+    
+    Args:
+        db: instancia de Database (conectada)
+        file_path: ruta del archivo
+        chunk_size: filas por bloque
+        progress_callback: función opcional (filas_leídas)
+    
+    Returns:
+        dict: file, total, imported, skipped, errors, elapsed y already_imported
+    """
+    started = time.perf_counter()
+    file_hash = file_fingerprint(file_path)
+    result = {
+        'file': file_path, 'total': 0, 'imported': 0, 'skipped': 0,
+        'errors': [], 'elapsed': 0.0, 'already_imported': False
+    }
+    if db.is_file_imported(file_hash):
+        result['already_imported'] = True
+        return result
+    
+    technicians = import_technicians(db)
+    today = datetime.now().strftime('%Y-%m-%d')
+    occurrences = Counter()  # Filas idénticas, contadas en todo el archivo
+    with db.transaction(label='import_task_csv'):
+        for chunk in read_task_csv(file_path, chunk_size):
+            tasks, errors = normalize_task_frame(chunk, technicians, today)
+            imported, skipped = db.import_tasks(tasks, file_hash, occurrences)
+            result['total'] += len(chunk)
+            result['imported'] += imported
+            result['skipped'] += skipped
+            result['errors'] += errors
+            if progress_callback:
+                progress_callback(result['total'])
+        db.record_imported_file(file_hash, os.path.basename(file_path), result['total'],
+                                result['imported'], result['skipped'])
+    
+    result['elapsed'] = time.perf_counter() - started
+    print(f"Importación CSV: {result['imported']} de {result['total']} filas en {result['elapsed']:.2f} s, "
+          f"{result['skipped']} ya importadas")
+    return result
+
+
+def export_task_csv(db, file_path, technician_id=None, start_date=None, end_date=None,
+                    chunk_size=CSV_CHUNK_SIZE, progress_callback=None):
+    """
+    Exporta tareas con las columnas de la plantilla a un CSV, comprimido con
+    gzip si el nombre termina en .gz. Las filas se leen del cursor por
+    bloques y se escriben a medida que llegan; los montos salen de los
+    centavos, con punto decimal.
+    
+    Returns:
+        int: cantidad de tareas exportadas
+    """
+    conditions = []
+    params = []
+    if technician_id is not None:
+        conditions.append('t.technician_id = ?')
+        params.append(technician_id)
+    if start_date:
+        conditions.append('t.task_day >= ?')
+        params.append(to_day_number(start_date))
+    if end_date:
+        conditions.append('t.task_day <= ?')
+        params.append(to_day_number(end_date))
+    
+    # Una columna de la consulta por columna de la plantilla, en el mismo orden
+    selected = []
+    for field in TEMPLATE_COLUMNS.values():
+        if field == 'technician_name':
+            selected.append("COALESCE(tech.name, '')")
+        elif field in MONEY_COLUMNS:
+            selected.append(f't.{field}_cents')
+        else:
+            selected.append(f"COALESCE(t.{field}, '')")
+    money_positions = [i for i, field in enumerate(TEMPLATE_COLUMNS.values()) if field in MONEY_COLUMNS]
+    
+    cursor = db.conn.execute(f'''
+    SELECT {', '.join(selected)}
+    FROM tasks t
+    LEFT JOIN technicians tech ON tech.id = t.technician_id
+    WHERE {' AND '.join(conditions) or '1'}
+    ORDER BY t.task_day, t.id
+    ''', params)
+    
+    opener = gzip.open if file_path.lower().endswith('.gz') else open
+    exported = 0
+    with opener(file_path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(TEMPLATE_COLUMNS.keys())
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                row = list(row)
+                for i in money_positions:
+                    row[i] = f'{(row[i] or 0) / 100:.2f}'
+                writer.writerow(row)
+            exported += len(rows)
+            if progress_callback:
+                progress_callback(exported)
+    return exported
+
+
+def import_task_workbooks(db, file_paths, max_workers=None, progress_callback=None):
+    """
+    Importa varios archivos con el formato de la plantilla. La lectura y
+    normalización de cada archivo corre en paralelo en un pool de procesos
+    (iniciado con spawn);
+    este proceso es el único que escribe en la base de datos, con una
+    transacción por archivo. Los archivos sin cambios desde la última
+    importación se saltean sin leerlos y las filas ya importadas se omiten.
+    
+    Args:
+        db: instancia de Database (conectada)
+        file_paths: rutas de los archivos a importar
+        max_workers: procesos a usar (por defecto, uno por núcleo)
+        progress_callback: función opcional (archivos_listos, total_archivos, resultado)
+    
+    Returns:
+        list: un dict por archivo con file, total, imported, skipped, errors,
+        elapsed y already_imported
+    """
+    technicians = import_technicians(db)
+    results = []
+    
+    # Huella de cada archivo; los ya importados no se envían al pool
+    file_hashes = {}
+    pending = []
+    for file_path in file_paths:
+        try:
+            file_hashes[file_path] = file_fingerprint(file_path)
+        except OSError:
+            pending.append(file_path)  # El error se informa al leerlo
+            continue
+        if db.is_file_imported(file_hashes[file_path]):
+            results.append({
+                'file': file_path, 'total': 0, 'imported': 0, 'skipped': 0,
+                'errors': [], 'elapsed': 0.0, 'already_imported': True
+            })
+            if progress_callback:
+                progress_callback(len(results), len(file_paths), results[-1])
+        else:
+            pending.append(file_path)
+    
+    def write(parsed):
+        started = time.perf_counter()
+        file_hash = file_hashes.get(parsed['file'])
+        with db.transaction(label='import_task_workbooks'):
+            imported, skipped = db.import_tasks(parsed['tasks'], file_hash)
+            if file_hash:
+                db.record_imported_file(file_hash, os.path.basename(parsed['file']), parsed['total'], imported, skipped)
+        result = {
+            'file': parsed['file'],
+            'total': parsed['total'],
+            'imported': imported,
+            'skipped': skipped,
+            'errors': parsed['errors'],
+            'elapsed': time.perf_counter() - started,
+            'already_imported': False
+        }
+        results.append(result)
+        if progress_callback:
+            progress_callback(len(results), len(file_paths), result)
+    
+    def failed(file_path, error):
+        result = {
+            'file': file_path, 'total': 0, 'imported': 0, 'skipped': 0,
+            'errors': [str(error)], 'elapsed': 0.0, 'already_imported': False
+        }
+        results.append(result)
+        if progress_callback:
+            progress_callback(len(results), len(file_paths), result)
+    
+    if len(pending) <= 1:
+        for file_path in pending:
+            try:
+                write(parse_task_workbook(file_path, technicians))
+            except Exception as e:
+                failed(file_path, e)
+        return results
+    
+    # Procesos nuevos (spawn), no fork: la aplicación ya tiene otros hilos
+    # (escritor, exportaciones) y un hijo creado con fork puede quedar trabado
+    # en un lock que tenía tomado uno de ellos. parse_task_workbook y sus
+    # argumentos (ruta y lista de dicts) se pasan por pickle
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(parse_task_workbook, file_path, technicians): file_path
+            for file_path in pending
+        }
+        for future in as_completed(futures):
+            try:
+                write(future.result())
+            except Exception as e:
+                failed(futures[future], e)
+    
+    return results
 
 
 def import_excel_file():
@@ -151,12 +609,11 @@ def import_excel_file():
         return
     
     try:
-        # Crear instancia del importador
-        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.db')
-        importer = ExcelImporter(db_path)
+        # Crear instancia del importador (base de datos de la aplicación)
+        importer = ExcelImporter()
         
         # Importar datos
-        total, success, errors = importer.import_excel(file_path)
+        total, success, errors, elapsed = importer.import_excel(file_path)
         
         # Mostrar resultados
         msg_parts = [
@@ -164,7 +621,9 @@ def import_excel_file():
             "",
             f"Registros procesados: {total}",
             f"Registros importados: {success}",
-            f"Errores: {len(errors)}"
+            f"Ya importados (omitidos): {importer.skipped}",
+            f"Errores: {len(errors)}",
+            f"Tiempo: {elapsed:.2f} s ({total / elapsed if elapsed else 0:,.0f} registros/s)"
         ]
         
         if errors:
@@ -1,8 +1,9 @@
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 from PySide6.QtWidgets import (QApplication, QMainWindow, QTabWidget, QVBoxLayout, 
-                              QWidget, QStatusBar, QLabel, QHBoxLayout, QFrame)
+                              QWidget, QStatusBar, QLabel, QHBoxLayout, QFrame, QMessageBox)
 from PySide6.QtGui import QIcon, QFont, QPixmap, QPalette, QColor
 from PySide6.QtCore import Qt, QSize
 from database import Database
@@ -25,6 +26,21 @@ class MainWindow(QMainWindow):
         self.db = Database()
         self.db.initialize_database()
         
+        # Las ediciones interactivas se confirman en grupo en un hilo aparte
+        self.db.start_writer()
+        
+        # Modo cliente: los reportes los calcula el servicio de consultas
+        if os.environ.get('REPORT_SERVICE_URL'):
+            self.db.use_report_service(os.environ['REPORT_SERVICE_URL'])
+        
+        # Totales de los meses cerrados con NumPy sobre arreglos en disco
+        if os.environ.get('DB_COLUMN_STORE'):
+            try:
+                self.db.enable_column_store()
+            except Exception as e:
+                print(f"No se pudo activar el almacén de columnas: {e}")
+                self.db.column_store = None
+        
         # Configurar la interfaz de usuario
         self.setup_ui()
         
@@ -278,6 +294,7 @@ class MainWindow(QMainWindow):
         # Conectar señales
         self.technician_view.status_message.connect(self.show_status_message)
         self.report_view.status_message.connect(self.show_status_message)
+        self.technician_view.technicians_updated.connect(self.report_view.load_technicians)
     
     def setup_header(self, parent_layout):
         """Configura el encabezado de la aplicación."""
@@ -394,7 +411,32 @@ class MainWindow(QMainWindow):
                 }
             """)
     
+    def closeEvent(self, event):
+        """Termina las exportaciones y confirma las escrituras pendientes antes de cerrar."""
+        exports = self.report_view.export_jobs
+        if exports.active:
+            reply = QMessageBox.question(
+                self,
+                'Exportaciones en curso',
+                f'Hay {len(exports.active)} exportaciones en curso. ¿Esperar a que terminen?\n'
+                '(No: se cancelan y no se guardan)',
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel,
+                QMessageBox.StandardButton.Yes
+            )
+            if reply == QMessageBox.StandardButton.Cancel:
+                event.ignore()
+                return
+            exports.shutdown(cancel=reply == QMessageBox.StandardButton.No)
+        else:
+            exports.shutdown()
+        self.db.close()
+        super().closeEvent(event)
+    
 def main():
+    # Necesario para el pool de procesos de la importación por lotes en el
+    # ejecutable empaquetado con PyInstaller
+    multiprocessing.freeze_support()
+    
     # Configurar la política de redondeo de DPI antes de crear QApplication
     if hasattr(QApplication, 'setHighDpiScaleFactorRoundingPolicy'):
         QApplication.setHighDpiScaleFactorRoundingPolicy(
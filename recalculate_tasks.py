@@ -0,0 +1,29 @@
+import sys
+
+from database import Database
+
+
+def recalculate_tasks(start_date=None, end_date=None):
+    """
+    Recalcula IVA, ganancia y distribución de las tareas guardadas con las
+    tasas actuales. Uso: python recalculate_tasks.py [desde] [hasta]
+    (fechas en formato AAAA-MM-DD, opcionales).
+    """
+    db = Database()
+    db.initialize_database()
+
+    def show_progress(done, total):
+        print(f"\r{done} de {total} tareas ({done * 100 // total}%)", end='', flush=True)
+
+    try:
+        count = db.recalculate_derived_fields(start_date, end_date, progress_callback=show_progress)
+        print()
+        print(f"Se recalcularon {count} tareas.")
+    except Exception as e:
+        print(f"\nError al recalcular las tareas: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    recalculate_tasks(*sys.argv[1:3])
@@ -0,0 +1,36 @@
+import sys
+
+from database import Database
+from database.reports import format_general_report
+
+
+def print_general_report(start_date=None, end_date=None, output_path=None):
+    """
+    Muestra el reporte general de ganancias por técnico sin abrir la
+    aplicación. Uso: python report_cli.py [desde] [hasta] [archivo.txt]
+    (fechas en formato AAAA-MM-DD, opcionales).
+    """
+    db = Database()
+    db.initialize_database()
+
+    try:
+        report = db.get_general_report(start_date, end_date)
+        if not report['rows']:
+            print("No hay registros en el período seleccionado.")
+            return
+
+        report_text = format_general_report(report)
+        print(report_text)
+
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(report_text)
+            print(f"\nEl reporte se ha guardado en: {output_path}")
+    except Exception as e:
+        print(f"Error al generar el reporte: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print_general_report(*sys.argv[1:4])
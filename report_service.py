@@ -0,0 +1,28 @@
+import sys
+
+from database import Database
+from database.service import QueryService, DEFAULT_HOST, DEFAULT_PORT
+
+
+def run_report_service(port=DEFAULT_PORT, host=DEFAULT_HOST):
+    """
+    Inicia el servicio de consultas sobre technicians.db. Las aplicaciones
+    de las demás PCs lo usan definiendo REPORT_SERVICE_URL (por ejemplo
+    http://servidor:8765). Uso: python report_service.py [puerto] [host]
+    (para atender a otras PCs usar host 0.0.0.0).
+    """
+    db = Database()
+    db.initialize_database()
+    db_name = db.db_name
+    db.close()
+    
+    service = QueryService(db_name, host=host, port=int(port))
+    print(f"Servicio de consultas en {service.url} (Ctrl+C para detener)")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServicio detenido.")
+
+
+if __name__ == "__main__":
+    run_report_service(*sys.argv[1:3])
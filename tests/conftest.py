@@ -0,0 +1,52 @@
+"""
+Fixtures compartidas: cada prueba trabaja sobre una base SQLite nueva en una
+carpeta temporal (nunca sobre technicians.db).
+"""
+import os
+import sys
+
+import pytest
+
+# Las pruebas importan los módulos de la aplicación desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'technicians.db')
+
+
+@pytest.fixture
+def db(db_path):
+    database = Database(db_path, busy_timeout=1000)
+    database.initialize_database()
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def technician_id(db):
+    return db.add_technician('Juan Pérez')
+
+
+def make_task(technician_id, **values):
+    """Datos de una tarea de prueba (los valores dados reemplazan a los de base)"""
+    task = {
+        'technician_id': technician_id,
+        'client_name': 'Cliente',
+        'task_description': 'Instalación',
+        'task_date': '2024-03-15',
+        'budget_total': 1000.0,
+        'labor_cost': 400.0,
+        'material_cost': 200.0,
+        'insurance_payment': 0.0,
+        'cash_payment': 1000.0,
+        'material_expense': 100.0,
+        'payment_type': 'EFECTIVO',
+        'order_number': '',
+        'status': 'PENDIENTE'
+    }
+    task.update(values)
+    return task
@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import make_task
+
+
+def _statuses(db):
+    return [row[0] for row in db.conn.execute('SELECT status FROM tasks ORDER BY id')]
+
+
+@pytest.fixture
+def task_ids(db, technician_id):
+    return [db.add_task(make_task(technician_id, client_name=f'Cliente {i}')) for i in range(4)]
+
+
+def test_status_of_a_single_task(db, task_ids):
+    assert db.update_tasks_status([task_ids[1]], 'COMPLETADA') == 1
+    assert _statuses(db) == ['PENDIENTE', 'COMPLETADA', 'PENDIENTE', 'PENDIENTE']
+
+
+def test_status_of_several_tasks(db, task_ids):
+    assert db.update_tasks_status(task_ids[:3], 'COMPLETADA') == 3
+    assert _statuses(db) == ['COMPLETADA', 'COMPLETADA', 'COMPLETADA', 'PENDIENTE']
+
+    # Las que ya tienen ese estado no cuentan
+    assert db.update_tasks_status(task_ids, 'COMPLETADA') == 1
+    assert _statuses(db) == ['COMPLETADA'] * 4
+
+
+def test_status_in_several_id_chunks(db, task_ids, monkeypatch):
+    monkeypatch.setattr(type(db), '_ID_CHUNK', 2)
+    assert db.update_tasks_status([*task_ids[::-1], 999], 'COMPLETADA') == 4
+    assert _statuses(db) == ['COMPLETADA'] * 4
+    assert db.get_task_statuses([*task_ids, 999]) == {task_id: 'COMPLETADA' for task_id in task_ids}
+
+
+def test_delete_tasks(db, task_ids):
+    assert db.delete_tasks([task_ids[0], task_ids[2], 999]) == 2
+    assert db.get_task_statuses(task_ids) == {task_ids[1]: 'PENDIENTE', task_ids[3]: 'PENDIENTE'}
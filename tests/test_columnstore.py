@@ -0,0 +1,117 @@
+import random
+import shutil
+
+import pytest
+
+from database.columnstore import ColumnStore
+from database.dates import to_day_number
+
+from conftest import make_task
+
+CLOSED_DAY = to_day_number('2024-07-01')
+
+RANGES = [
+    (None, None),
+    ('2024-01-01', '2024-12-31'),
+    ('2024-02-10', '2024-06-20'),
+    ('2024-05-01', '2024-08-15'),
+    ('2024-07-01', '2024-09-30'),
+]
+
+
+@pytest.fixture
+def tasks(db):
+    rng = random.Random(7)
+    technicians = [db.add_technician(name) for name in ('Ana', 'Beto', 'Carla')]
+    db.add_tasks([
+        make_task(
+            rng.choice(technicians + [None]),
+            task_date=f'2024-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}',
+            budget_total=round(rng.uniform(10, 5000), 2),
+            material_expense=round(rng.uniform(0, 200), 2)
+        )
+        for _ in range(400)
+    ])
+    return technicians
+
+
+def _sql_sums(db, start_date, end_date):
+    store = db.column_store
+    db.column_store = None
+    try:
+        return db._task_sums_by_technician(None, start_date, end_date)
+    finally:
+        db.column_store = store
+
+
+def _sql_totals(db, technician_id, start_date, end_date):
+    store = db.column_store
+    db.column_store = None
+    db._invalidate_caches()
+    try:
+        return db._sum_task_totals(technician_id, start_date, end_date)
+    finally:
+        db.column_store = store
+        db._invalidate_caches()
+
+
+def _assert_matches_sql(db, technicians):
+    for start_date, end_date in RANGES:
+        assert db._task_sums_by_technician(None, start_date, end_date) == _sql_sums(db, start_date, end_date)
+        for tech_id in technicians:
+            assert db._sum_task_totals(tech_id, start_date, end_date) == pytest.approx(
+                _sql_totals(db, tech_id, start_date, end_date))
+
+
+def test_store_totals_match_sql(db, tasks, tmp_path):
+    db.column_store = ColumnStore(str(tmp_path / 'columns'))
+    result = db.column_store.refresh(db, CLOSED_DAY)
+    assert result['rows'] == db.conn.execute('SELECT COUNT(*) FROM tasks WHERE task_day < ?', (CLOSED_DAY,)).fetchone()[0]
+    assert db.column_store.valid_until(db) == CLOSED_DAY
+    _assert_matches_sql(db, tasks)
+
+
+def test_edits_in_closed_days_fall_back_to_sql_until_refresh(db, tasks, tmp_path):
+    db.column_store = ColumnStore(str(tmp_path / 'columns'))
+    db.column_store.refresh(db, CLOSED_DAY)
+
+    # Cambios en días ya cubiertos por el almacén
+    task_id = db.conn.execute('SELECT id FROM tasks WHERE task_day < ? ORDER BY task_day DESC', (CLOSED_DAY,)).fetchone()[0]
+    db.update_task(task_id, {**db.get_task(task_id), 'budget_total': 99999})
+    db.add_task(make_task(tasks[0], task_date='2024-03-03'))
+    db.delete_task(db.conn.execute('SELECT MAX(id) FROM tasks WHERE task_day < ?', (CLOSED_DAY,)).fetchone()[0] - 1)
+    assert db.column_store.valid_until(db) < CLOSED_DAY
+    _assert_matches_sql(db, tasks)
+
+    # La actualización conserva los días anteriores al primer cambio
+    result = db.column_store.refresh(db, CLOSED_DAY)
+    assert 0 < result['kept'] < result['rows']
+    _assert_matches_sql(db, tasks)
+
+    # Un cambio que solo toca el estado no invalida nada
+    db.update_tasks_status([task_id], 'COMPLETADA')
+    assert db.column_store.valid_until(db) == CLOSED_DAY
+    _assert_matches_sql(db, tasks)
+
+
+def test_refresh_moves_the_closed_day_forward(db, tasks, tmp_path):
+    directory = tmp_path / 'columns'
+    db.column_store = ColumnStore(str(directory))
+    first = db.column_store.refresh(db, to_day_number('2024-04-01'))
+    second = db.column_store.refresh(db, CLOSED_DAY)
+    assert second['kept'] == first['rows']
+    assert second['rows'] == first['rows'] + second['added']
+    assert [path.name for path in directory.iterdir()] == ['gen-2']
+    _assert_matches_sql(db, tasks)
+
+
+def test_missing_files_are_not_used(db, tasks, tmp_path):
+    directory = tmp_path / 'columns'
+    db.column_store = ColumnStore(str(directory))
+    db.column_store.refresh(db, CLOSED_DAY)
+
+    # Otra instancia que no encuentra los archivos (p. ej. se borró la carpeta)
+    shutil.rmtree(directory)
+    db.column_store = ColumnStore(str(directory))
+    assert db.column_store.valid_until(db) == 0
+    _assert_matches_sql(db, tasks)
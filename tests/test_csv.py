@@ -0,0 +1,150 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from database.ledger import file_fingerprint
+from excel_importer import (
+    TEMPLATE_COLUMNS, export_task_csv, import_task_csv, import_task_workbooks, normalize_task_frame,
+    parse_task_workbook, read_task_csv
+)
+
+from conftest import make_task
+
+
+def _template_row(client, technician='Juan Pérez', budget='1000', date='2024-03-15'):
+    row = {header: '' for header in TEMPLATE_COLUMNS}
+    row.update({'Técnico': technician, 'Cliente': client, 'Tarea': 'Instalación',
+                'Presupuesto Total': budget, 'Efectivo': budget, 'Pago Seguro': '0',
+                'Fecha (AAAA-MM-DD)': date})
+    return row
+
+
+def _write_csv(path, rows):
+    pd.DataFrame(rows, columns=list(TEMPLATE_COLUMNS)).to_csv(path, index=False, compression='infer')
+
+
+def _task_count(db):
+    return db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+
+@pytest.mark.parametrize('name', ['tareas.csv', 'tareas.csv.gz'])
+def test_repeated_rows_across_chunks_are_all_imported(db, technician_id, tmp_path, name):
+    path = str(tmp_path / name)
+    _write_csv(path, [_template_row('Cliente')] * 5 + [_template_row('Otro')])
+
+    result = import_task_csv(db, path, chunk_size=2)
+    assert (result['total'], result['imported'], result['skipped'], result['errors']) == (6, 6, 0, [])
+    assert _task_count(db) == 6
+    assert db.is_file_imported(file_fingerprint(path))
+
+    # Las mismas filas en otro orden (otro archivo) no duplican nada
+    other = str(tmp_path / f'copia-{name}')
+    _write_csv(other, [_template_row('Otro')] + [_template_row('Cliente')] * 5)
+    result = import_task_csv(db, other, chunk_size=4)
+    assert (result['already_imported'], result['imported'], result['skipped']) == (False, 0, 6)
+
+
+def test_chunked_and_whole_file_imports_agree(db, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.csv')
+    _write_csv(path, [_template_row('Cliente')] * 3)
+    assert import_task_csv(db, path, chunk_size=1)['imported'] == 3
+
+    # Leído entero (importación de varios archivos) las filas ya están registradas
+    parsed = parse_task_workbook(path, db.get_technicians())
+    assert db.import_tasks(parsed['tasks']) == (0, 3)
+
+
+def test_failed_rows_keep_the_file_importable(db, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.csv')
+    _write_csv(path, [_template_row('Cliente'), _template_row('Otro', technician='Nadie')])
+
+    result = import_task_csv(db, path, chunk_size=1)
+    assert (result['imported'], len(result['errors'])) == (1, 1)
+    assert result['errors'][0].startswith('Fila 3:')
+    assert not db.is_file_imported(file_fingerprint(path))
+
+    db.add_technician('Nadie')
+    result = import_task_csv(db, path)
+    assert (result['already_imported'], result['imported'], result['skipped']) == (False, 1, 1)
+    assert db.is_file_imported(file_fingerprint(path))
+    assert import_task_csv(db, path)['already_imported']
+
+
+def test_errors_report_the_file_row_after_blank_lines(db, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.csv')
+    _write_csv(path, [_template_row('Cliente'), _template_row('Otro', technician='Nadie')])
+    with open(path, encoding='utf-8') as f:
+        header, first, second = f.read().splitlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join([header, first, '', ',' * (len(TEMPLATE_COLUMNS) - 1), second, '']))
+
+    result = import_task_csv(db, path, chunk_size=2)
+    assert (result['total'], result['imported']) == (2, 1)
+    assert [error.split(':')[0] for error in result['errors']] == ['Fila 5']
+
+
+def test_missing_columns_are_reported(tmp_path):
+    path = str(tmp_path / 'tareas.csv')
+    pd.DataFrame([{'Cliente': 'X'}]).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='Faltan columnas'):
+        list(read_task_csv(path))
+
+
+@pytest.mark.parametrize('name', ['export.csv', 'export.csv.gz'])
+def test_export_then_import_round_trip(db, db_path, technician_id, tmp_path, name):
+    db.add_tasks([make_task(technician_id, client_name=f'Cliente {i}', budget_total=100.5 + i,
+                            cash_payment=100.5 + i, order_number=f'{i:04d}') for i in range(7)])
+    path = str(tmp_path / name)
+    assert export_task_csv(db, path, chunk_size=3) == 7
+    if name.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            assert f.readline().startswith('Técnico,Cliente')
+
+    rows = pd.concat(read_task_csv(path, chunk_size=3))
+    assert rows['Presupuesto Total'].tolist() == [f'{100.5 + i:.2f}' for i in range(7)]
+    assert rows['Número Pedido'].tolist() == [f'{i:04d}' for i in range(7)]
+
+    # En otra base, la importación recrea las mismas tareas
+    from database import Database
+    other = Database(str(tmp_path / 'otra.db'))
+    other.initialize_database()
+    try:
+        other.add_technician('Juan Pérez')
+        assert import_task_csv(other, path, chunk_size=2)['imported'] == 7
+        columns = 'client_name, task_day, budget_total_cents, iva_cents, order_number'
+        query = f'SELECT {columns} FROM tasks ORDER BY id'
+        assert [tuple(row) for row in other.conn.execute(query)] == [tuple(row) for row in db.conn.execute(query)]
+    finally:
+        other.close()
+
+
+def test_several_files_are_parsed_in_a_process_pool(db, technician_id, tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f'tareas-{i}.csv')
+        _write_csv(path, [_template_row(f'Cliente {i}')] * (i + 1))
+        paths.append(path)
+    import_task_csv(db, paths[0])
+    missing = str(tmp_path / 'no-existe.csv')
+
+    results = {result['file']: result for result in import_task_workbooks(db, paths + [missing], max_workers=2)}
+    assert results[paths[0]]['already_imported']
+    assert [results[path]['imported'] for path in paths[1:]] == [2, 3]
+    assert results[missing]['errors'] and not results[missing]['imported']
+    assert _task_count(db) == 6
+
+
+def test_row_with_bad_date_is_recognised_on_another_day(db, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.csv')
+    _write_csv(path, [_template_row('Cliente', date='sin fecha'), _template_row('Cliente', technician='Nadie')])
+
+    first = import_task_csv(db, path)
+    assert (first['imported'], len(first['errors'])) == (1, 2)
+    assert any(error.startswith('Fila 2:') and 'Se usará la fecha actual' in error for error in first['errors'])
+
+    # Se reintenta otro día: la fila con fecha mala ya figura en el registro
+    db.add_technician('Nadie')
+    tasks, _ = normalize_task_frame(next(read_task_csv(path)), db.get_technicians(), today='2030-01-01')
+    assert db.import_tasks(tasks) == (1, 1)
+    assert _task_count(db) == 2
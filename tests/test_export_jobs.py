@@ -0,0 +1,62 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip('PySide6')
+
+from PySide6.QtCore import Qt  # noqa: E402
+
+from views import export_jobs  # noqa: E402
+from views.export_jobs import ExportJobQueue  # noqa: E402
+
+
+def _write(job, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('datos')
+
+
+def _run(tmp_path, file_path, run=_write):
+    queue = ExportJobQueue(max_workers=1)
+    finished, failed = [], []
+    # Sin bucle de eventos: las señales del hilo del pool se reciben directo
+    queue.job_finished.connect(lambda job, message: finished.append(message), Qt.DirectConnection)
+    queue.job_failed.connect(lambda job, message: failed.append(message), Qt.DirectConnection)
+    queue.submit('Prueba', str(file_path), run)
+    queue.shutdown(cancel=False)
+    assert [name for name in os.listdir(tmp_path) if name.startswith('.~')] == []
+    return finished, failed
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='permisos POSIX')
+def test_new_export_gets_default_permissions(tmp_path):
+    finished, failed = _run(tmp_path, tmp_path / 'nuevo.xlsx')
+    assert (finished, failed) == ([str(tmp_path / 'nuevo.xlsx')], [])
+    assert _mode(tmp_path / 'nuevo.xlsx') == 0o666 & ~export_jobs._UMASK
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='permisos POSIX')
+def test_replaced_export_keeps_existing_permissions(tmp_path):
+    path = tmp_path / 'existente.xlsx'
+    path.write_text('viejo', encoding='utf-8')
+    os.chmod(path, 0o664)
+    _run(tmp_path, path)
+    assert path.read_text(encoding='utf-8') == 'datos'
+    assert _mode(path) == 0o664
+
+
+def test_failed_export_keeps_previous_file(tmp_path):
+    path = tmp_path / 'existente.xlsx'
+    path.write_text('viejo', encoding='utf-8')
+
+    def fail(job, temp_path):
+        _write(job, temp_path)
+        raise ValueError('sin datos')
+
+    finished, failed = _run(tmp_path, path, fail)
+    assert (finished, failed) == ([], ['sin datos'])
+    assert path.read_text(encoding='utf-8') == 'viejo'
@@ -0,0 +1,81 @@
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from views import exporters
+from views.exporters import (
+    MONEY_FORMAT, export_technician_statements, technician_report_sheets, write_workbook
+)
+
+from conftest import make_task
+
+
+class FakeJob:
+    def __init__(self):
+        self.calls = []
+
+    def progress(self, done, total, message=None):
+        self.calls.append((done, total))
+
+
+def test_money_cells_are_numbers_with_currency_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporters, 'CHUNK_ROWS', 2)
+    df = pd.DataFrame({'Cliente': ['A', 'B', None, 'D', 'E'], 'Monto': [1.5, 2.0, 3.25, None, 1234.56]})
+    path = str(tmp_path / 'libro.xlsx')
+    job = FakeJob()
+    write_workbook(path, [{'name': 'Hoja', 'df': df, 'money_columns': ['Monto'], 'bold_rows': [6]}], job)
+
+    sheet = load_workbook(path)['Hoja']
+    assert [cell.value for cell in sheet[1]] == ['Cliente', 'Monto']
+    assert [cell.value for cell in sheet['B'][1:]] == [1.5, 2.0, 3.25, None, 1234.56]
+    assert all(cell.number_format == MONEY_FORMAT for cell in sheet['B'][1:] if cell.value is not None)
+    assert sheet['A4'].value is None
+    assert sheet.column_dimensions['B'].number_format == MONEY_FORMAT
+    assert sheet['A6'].font.bold and sheet['B6'].font.bold and not sheet['B5'].font.bold
+    assert sheet['B6'].number_format == MONEY_FORMAT
+    assert sheet.column_dimensions['B'].width == len('$1,234.56') + 2
+    assert job.calls == [(2, 5), (4, 5), (5, 5), (5, 5)]
+
+
+def test_empty_sheet_keeps_its_header(tmp_path):
+    path = str(tmp_path / 'vacio.xlsx')
+    write_workbook(path, [{'name': 'Vacía', 'df': pd.DataFrame(columns=['Cliente', 'Monto'])}])
+    sheet = load_workbook(path)['Vacía']
+    assert [cell.value for cell in sheet[1]] == ['Cliente', 'Monto']
+    assert sheet.max_row == 1
+
+
+def test_technician_report_totals(tmp_path):
+    tasks = [dict(make_task(1), profit=300.0), dict(make_task(2), profit=500.0), dict(make_task(2), profit=100.0)]
+    path = str(tmp_path / 'tecnicos.xlsx')
+    write_workbook(path, technician_report_sheets(tasks, {1: 'Ana', 2: 'Luis'}))
+
+    rows = list(load_workbook(path)['Resumen Técnicos'].values)
+    assert [row[0] for row in rows] == ['Técnico', 'Luis', 'Ana', 'TOTAL']
+    assert rows[-1][4] == 900.0
+
+
+def test_technician_statements_batch(db, technician_id, tmp_path):
+    other_id = db.add_technician('Ana / Gómez')
+    db.add_tasks([make_task(technician_id, client_name=f'Cliente {i}') for i in range(3)]
+                 + [make_task(other_id, budget_total=500.0, cash_payment=500.0),
+                    make_task(technician_id, task_date='2023-01-10')])
+    folder = tmp_path / 'estados'
+    folder.mkdir()
+    job = FakeJob()
+
+    assert export_technician_statements(db, str(folder), '2024-03-01', '2024-03-31', max_workers=2, job=job) == 2
+    assert sorted(os.listdir(folder)) == [
+        f'estado_{technician_id}_Juan_Pérez_2024-03-01_2024-03-31.xlsx',
+        f'estado_{other_id}_Ana_Gómez_2024-03-01_2024-03-31.xlsx',
+        'indice_estados_2024-03-01_2024-03-31.xlsx',
+    ]
+    assert job.calls[-1] == (2, 2)
+
+    rows = list(load_workbook(folder / 'indice_estados_2024-03-01_2024-03-31.xlsx')['Índice'].values)
+    assert [(row[0], row[2], row[3]) for row in rows[1:]] == [
+        ('Juan Pérez', 3, 3000.0), ('Ana / Gómez', 1, 500.0), ('TOTAL', 4, 3500.0)
+    ]
+    detail = list(load_workbook(folder / f'estado_{other_id}_Ana_Gómez_2024-03-01_2024-03-31.xlsx')['Tareas'].values)
+    assert [row[0] for row in detail] == ['Fecha', '2024-03-15', 'TOTAL']
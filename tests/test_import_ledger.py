@@ -0,0 +1,121 @@
+from collections import Counter
+
+import pandas as pd
+from openpyxl import Workbook
+
+from database.ledger import compute_row_hashes, file_fingerprint
+from excel_importer import COLUMN_MAPPING, ExcelImporter
+
+from conftest import make_task
+
+
+def _write_legacy_workbook(path, rows):
+    """Planilla con el formato de ExcelImporter (FECHA, CLIENTE, ...) y columna TÉCNICO"""
+    wb = Workbook()
+    sheet = wb.active
+    sheet.append([*COLUMN_MAPPING, 'TÉCNICO'])
+    for row in rows:
+        sheet.append(row)
+    wb.save(path)
+
+
+def _legacy_row(client, technician, date='15/03/2024', budget=1000):
+    return [date, client, 'P-1', 'Instalación', budget, 400, 200, 0, budget, 100, technician]
+
+
+def _task_count(db):
+    return db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+
+def test_identical_rows_get_distinct_hashes():
+    df = pd.DataFrame([make_task(1)] * 3)
+    assert compute_row_hashes(df).nunique() == 3
+
+
+def test_occurrence_counter_continues_across_chunks():
+    df = pd.DataFrame([make_task(1)] * 3 + [make_task(2)])
+    whole = compute_row_hashes(df)
+
+    occurrences = Counter()
+    chunked = pd.concat([compute_row_hashes(df.iloc[:2], occurrences), compute_row_hashes(df.iloc[2:], occurrences)])
+    assert chunked.tolist() == whole.tolist()
+
+
+def test_hash_ignores_derived_fields_and_client_case():
+    first = pd.DataFrame([make_task(1, client_name='Cliente', cash_payment=1000)])
+    second = pd.DataFrame([make_task(1, client_name=' CLIENTE ', cash_payment=10, task_date='15/03/2024')])
+    assert compute_row_hashes(first).tolist() == compute_row_hashes(second).tolist()
+
+
+def test_unrecognised_dates_hash_their_source_text():
+    today = pd.DataFrame([make_task(1, task_date='2024-03-15', source_date='sin fecha')])
+    tomorrow = pd.DataFrame([make_task(1, task_date='2024-03-16', source_date='sin fecha')])
+    other = pd.DataFrame([make_task(1, task_date='2024-03-15', source_date='pendiente')])
+    valid = pd.DataFrame([make_task(1, task_date='2024-03-15', source_date='')])
+    assert compute_row_hashes(today).tolist() == compute_row_hashes(tomorrow).tolist()
+    assert compute_row_hashes(today).tolist() != compute_row_hashes(other).tolist()
+    assert compute_row_hashes(valid).tolist() == compute_row_hashes(pd.DataFrame([make_task(1)])).tolist()
+
+
+def test_import_tasks_skips_rows_already_imported(db, technician_id):
+    tasks = [make_task(technician_id), make_task(technician_id), make_task(technician_id, client_name='Otro')]
+    assert db.import_tasks(tasks) == (3, 0)
+    assert db.import_tasks(tasks) == (0, 3)
+
+    # Una copia más de una fila repetida sí es nueva
+    assert db.import_tasks(tasks + [make_task(technician_id)]) == (1, 3)
+    assert _task_count(db) == 4
+
+
+def test_deleted_task_can_be_imported_again(db, technician_id):
+    db.import_tasks([make_task(technician_id)])
+    task_id = db.conn.execute('SELECT id FROM tasks').fetchone()[0]
+    db.delete_task(task_id)
+    assert db.import_tasks([make_task(technician_id)]) == (1, 0)
+
+
+def test_chunked_excel_import_keeps_repeated_rows(db, db_path, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.xlsx')
+    _write_legacy_workbook(path, [_legacy_row('Cliente', 'Juan Pérez')] * 3)
+
+    total, success, errors, _ = ExcelImporter(db_path, chunk_size=2).import_excel(path)
+    assert (total, success, errors) == (3, 3, [])
+    assert _task_count(db) == 3
+
+
+def test_errors_report_the_sheet_row_after_blank_rows(db, db_path, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.xlsx')
+    blank = [None] * (len(COLUMN_MAPPING) + 1)
+    _write_legacy_workbook(path, [_legacy_row('Cliente A', 'Juan Pérez'), blank, blank,
+                                  _legacy_row('Cliente B', 'Nadie'), blank, _legacy_row('', 'Juan Pérez')])
+
+    total, success, errors, _ = ExcelImporter(db_path, chunk_size=1).import_excel(path)
+    assert (total, success) == (3, 1)
+    assert errors == ['Fila 5: Técnico no encontrado: Nadie', 'Fila 7: El campo CLIENTE está vacío']
+
+
+def test_file_with_failed_rows_can_be_imported_again(db, db_path, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.xlsx')
+    _write_legacy_workbook(path, [_legacy_row('Cliente A', 'Juan Pérez'), _legacy_row('Cliente B', 'María Gómez')])
+
+    total, success, errors, _ = ExcelImporter(db_path).import_excel(path)
+    assert (total, success, len(errors)) == (2, 1, 1)
+    assert not db.is_file_imported(file_fingerprint(path))
+
+    # Con el técnico creado se cargan solo las filas que faltaban
+    db.add_technician('María Gómez')
+    importer = ExcelImporter(db_path)
+    total, success, errors, _ = importer.import_excel(path)
+    assert (total, success, errors, importer.skipped) == (2, 1, [], 1)
+    assert db.is_file_imported(file_fingerprint(path))
+    assert _task_count(db) == 2
+
+
+def test_unchanged_file_is_skipped(db, db_path, technician_id, tmp_path):
+    path = str(tmp_path / 'tareas.xlsx')
+    _write_legacy_workbook(path, [_legacy_row('Cliente', 'Juan Pérez')])
+    ExcelImporter(db_path).import_excel(path)
+
+    total, success, errors, _ = ExcelImporter(db_path).import_excel(path)
+    assert (total, success) == (0, 0)
+    assert errors == ["El archivo ya fue importado (no tiene cambios)"]
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from database import Database
+
+from conftest import make_task
+
+
+def _tasks(db):
+    return {row['id']: dict(row) for row in db.conn.execute('SELECT * FROM tasks ORDER BY id')}
+
+
+def test_export_and_import_round_trip(db, db_path, technician_id, tmp_path):
+    db.add_task(make_task(technician_id, client_name='Cliente A', order_number='0012'))
+    db.add_task(make_task(technician_id, client_name='Cliente B', status='COMPLETADA'))
+    before = _tasks(db)
+    path = str(tmp_path / 'respaldo.xlsx')
+    assert db.export_to_excel(path)[0]
+
+    # Sin cambios: todo se omite
+    exported = pd.read_excel(path, sheet_name='Tareas', dtype={'order_number': str})
+    assert db.merge_tasks(exported) == {'inserted': 0, 'updated': 0, 'skipped': 2}
+
+    # En una base vacía se recrean las mismas tareas con los mismos ids
+    other = Database(str(tmp_path / 'otra.db'))
+    other.initialize_database()
+    try:
+        ok, message = other.import_from_excel(path)
+        assert ok, message
+        after = _tasks(other)
+        assert after.keys() == before.keys()
+        for task_id, task in before.items():
+            for column in ['technician_id', 'client_name', 'task_date', 'task_day', 'order_number',
+                           'status', 'budget_total_cents', 'insurance_payment_cents', 'profit_cents']:
+                assert after[task_id][column] == task[column], column
+        assert other.conn.execute('SELECT name FROM technicians').fetchone()[0] == 'Juan Pérez'
+    finally:
+        other.close()
+
+
+def test_merge_updates_only_changed_rows(db, technician_id):
+    first = db.add_task(make_task(technician_id, client_name='Cliente A'))
+    second = db.add_task(make_task(technician_id, client_name='Cliente B'))
+    df = pd.DataFrame([dict(row) for row in db.conn.execute('SELECT * FROM tasks ORDER BY id')])
+    df.loc[df['id'] == second, 'client_name'] = 'Cliente B (editado)'
+    df.loc[df['id'] == second, 'budget_total'] = 2000.0
+    df = pd.concat([df, pd.DataFrame([{**make_task(technician_id, client_name='Nueva'), 'id': None}])])
+
+    # Sin update_existing las filas existentes se conservan
+    assert db.merge_tasks(df) == {'inserted': 1, 'updated': 0, 'skipped': 2}
+    assert _tasks(db)[second]['client_name'] == 'Cliente B'
+
+    assert db.merge_tasks(df, update_existing=True) == {'inserted': 1, 'updated': 1, 'skipped': 1}
+    tasks = _tasks(db)
+    assert tasks[first]['client_name'] == 'Cliente A'
+    assert tasks[second]['client_name'] == 'Cliente B (editado)'
+    assert tasks[second]['budget_total_cents'] == 200000
+    # Los campos derivados se recalculan con el monto nuevo
+    assert tasks[second]['iva_cents'] == 21000
+    assert len(tasks) == 4
+
+
+def test_merge_counts_repeated_ids_once(db, technician_id):
+    existing = db.add_task(make_task(technician_id, client_name='Cliente A'))
+    df = pd.DataFrame([
+        {**make_task(technician_id, client_name='A1'), 'id': existing},
+        {**make_task(technician_id, client_name='A2'), 'id': existing},
+        {**make_task(technician_id, client_name='N1'), 'id': 50},
+        {**make_task(technician_id, client_name='N2'), 'id': 50},
+        {**make_task(technician_id, client_name='N3'), 'id': 50},
+    ])
+
+    assert db.merge_tasks(df) == {'inserted': 1, 'updated': 0, 'skipped': 4}
+    assert {task_id: task['client_name'] for task_id, task in _tasks(db).items()} == {existing: 'Cliente A', 50: 'N1'}
+
+    assert db.merge_tasks(df, update_existing=True) == {'inserted': 0, 'updated': 2, 'skipped': 3}
+    assert {task_id: task['client_name'] for task_id, task in _tasks(db).items()} == {existing: 'A2', 50: 'N3'}
+
+
+def test_merge_technicians(db, technician_id):
+    df = pd.DataFrame([
+        {'id': technician_id, 'name': 'Juan P.', 'email': 'juan@example.com', 'phone': None},
+        {'id': None, 'name': 'Nuevo', 'email': None, 'phone': None},
+        {'id': 99, 'name': None, 'email': None, 'phone': None},
+    ])
+    assert db.merge_technicians(df, update_existing=True) == {'inserted': 1, 'updated': 1, 'skipped': 0}
+    names = [row[0] for row in db.conn.execute('SELECT name FROM technicians ORDER BY id')]
+    assert names == ['Juan P.', 'Nuevo']
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from database.dates import to_day_number
+from database.rules import IVA_RATE, PARTNER_SHARE, TECHNICIAN_SHARE, RateRules
+
+from conftest import make_task
+
+ORIGINAL = (IVA_RATE, TECHNICIAN_SHARE, PARTNER_SHARE)
+
+
+def test_rule_applies_from_its_effective_day():
+    rules = RateRules([(to_day_number('2024-07-01'), 0.21, 0.6, 0.4)])
+    assert rules.rates_for('2024-06-30') == ORIGINAL
+    assert rules.rates_for('2024-07-01') == (0.21, 0.6, 0.4)
+    assert rules.rates_for(to_day_number('2030-01-01')) == (0.21, 0.6, 0.4)
+
+
+def test_rate_columns_match_single_lookups():
+    rules = RateRules([
+        (to_day_number('2024-01-01'), 0.21, 0.6, 0.4),
+        (to_day_number('2024-07-01'), 0.15, 0.5, 0.5),
+    ])
+    days = pd.Series([to_day_number(d) for d in ['2023-12-31', '2024-01-01', '2024-06-30', '2024-07-02']])
+    columns = rules.rate_columns(days)
+    assert [tuple(row) for row in columns.itertuples(index=False)] == [rules.rates_for(int(day)) for day in days]
+
+
+def test_new_tasks_use_the_rule_for_their_date(db, technician_id):
+    db.set_rate_rule('2024-07-01', 0.21, 0.6)
+    before = db.add_task(make_task(technician_id, task_date='2024-06-30'))
+    after = db.add_task(make_task(technician_id, task_date='2024-07-01'))
+    db.add_tasks([make_task(technician_id, task_date='2024-07-01')])
+
+    rows = db.conn.execute('SELECT id, iva_cents, pablo_share_cents, facu_share_cents FROM tasks ORDER BY id').fetchall()
+    by_id = {row[0]: tuple(row)[1:] for row in rows}
+    # Presupuesto 1000, gasto de material 100
+    assert by_id[before] == (10500, 55650, 23850)
+    assert by_id[after] == (21000, 41400, 27600)
+    # La inserción vectorizada da lo mismo que la de a una tarea
+    assert tuple(rows[-1])[1:] == by_id[after]
+
+
+def test_recalculate_applies_changed_rules(db, technician_id):
+    db.add_task(make_task(technician_id, task_date='2024-06-30'))
+    db.add_task(make_task(technician_id, task_date='2024-07-15'))
+    db.set_rate_rule('2024-07-01', 0.21, 0.6)
+
+    assert db.recalculate_derived_fields(start_date='2024-07-01') == 1
+    rows = db.conn.execute('SELECT iva_cents, profit_cents FROM tasks ORDER BY id').fetchall()
+    assert [tuple(row) for row in rows] == [(10500, 79500), (21000, 69000)]
+
+    db.delete_rate_rule('2024-07-01')
+    assert db.recalculate_derived_fields() == 2
+    rows = db.conn.execute('SELECT iva_cents FROM tasks ORDER BY id').fetchall()
+    assert [row[0] for row in rows] == [10500, 10500]
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pandas as pd
+
+from database import Database
+from database.dates import to_day_number
+from excel_importer import TEMPLATE_COLUMNS, import_task_workbooks
+
+from conftest import make_task
+
+
+def _add_tasks(db):
+    active = db.add_technician('Ana')
+    retired = db.add_technician('Beto')
+    db.add_task(make_task(active, task_date='2024-03-01', budget_total=1000, cash_payment=1000))
+    db.add_task(make_task(active, task_date='2024-03-20', budget_total=2500.5, cash_payment=2500.5))
+    db.add_task(make_task(retired, task_date='2024-03-10', budget_total=300, cash_payment=300))
+    db.add_task(make_task(None, task_date='2024-03-10', budget_total=999, cash_payment=999))
+    db.add_task(make_task(active, task_date='2024-05-01'))
+    db.delete_technician(retired, soft=True)
+    return active, retired
+
+
+def test_all_technicians_report_matches_per_technician_reports(db):
+    active, retired = _add_tasks(db)
+    report = db.generate_report(None, '2024-03-01', '2024-03-31')
+
+    per_technician = [db.generate_report(tech_id, '2024-03-01', '2024-03-31') for tech_id in (active, retired)]
+    assert sorted(task['id'] for task in report['tasks']) == sorted(
+        task['id'] for single in per_technician for task in single['tasks']
+    )
+    for key in ['total_tasks', 'total_income', 'total_profit', 'total_iva', 'technician_share', 'facu_share']:
+        assert round(report['summary'][key], 2) == round(sum(single['summary'][key] for single in per_technician), 2)
+    assert report['summary']['total_tasks'] == 3
+    assert report['summary']['total_income'] == 3800.5
+
+    # Ordenadas de la más reciente a la más antigua
+    days = [task['task_date'] for task in report['tasks']]
+    assert days == sorted(days, reverse=True)
+
+
+def test_all_technicians_report_without_tasks(db):
+    _add_tasks(db)
+    assert db.generate_report(None, '2023-01-01', '2023-12-31') is None
+
+
+def test_imports_accept_inactive_technicians(db, tmp_path):
+    _, retired = _add_tasks(db)
+    row = {header: '' for header in TEMPLATE_COLUMNS}
+    row.update({'Técnico': 'Beto', 'Cliente': 'Cliente', 'Tarea': 'Revisión',
+                'Presupuesto Total': '100', 'Efectivo': '100', 'Pago Seguro': '0',
+                'Fecha (AAAA-MM-DD)': '2024-03-05'})
+    path = str(tmp_path / 'tareas.csv')
+    pd.DataFrame([row]).to_csv(path, index=False)
+
+    [result] = import_task_workbooks(db, [path])
+    assert (result['imported'], result['errors']) == (1, [])
+    assert db.conn.execute('SELECT COUNT(*) FROM tasks WHERE technician_id = ?', (retired,)).fetchone()[0] == 2
+
+
+def _calendar_covers(db, task_date):
+    return db.conn.execute('SELECT 1 FROM calendar WHERE day = ?', (to_day_number(task_date),)).fetchone() is not None
+
+
+def test_task_writes_extend_the_calendar(db, technician_id):
+    assert not _calendar_covers(db, '1995-06-01')
+    db.add_task(make_task(technician_id, task_date='1995-06-01'))
+    db.add_tasks([make_task(technician_id, task_date='2045-02-10')])
+    task_id = db.add_task(make_task(technician_id))
+    db.update_task(task_id, make_task(technician_id, task_date='1990-01-05'))
+    db.merge_tasks(pd.DataFrame([{**make_task(technician_id, task_date='2050-12-31'), 'id': 500}]))
+    for task_date in ['1990-01-05', '1995-06-01', '2045-02-10', '2050-12-31', '2020-07-15']:
+        assert _calendar_covers(db, task_date)
+
+
+def test_period_series_only_reads(db, db_path, technician_id):
+    db.add_task(make_task(technician_id, task_date='1995-06-01', budget_total=100, cash_payment=100))
+    db.add_task(make_task(technician_id, task_date='2024-03-15', budget_total=200, cash_payment=200))
+
+    # Otra conexión tiene tomada la escritura: la consulta igual responde
+    other = sqlite3.connect(db_path)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        changes = db.conn.total_changes
+        series = db.get_period_series('month', start_date='1980-01-01', end_date='2060-12-31')
+        assert [(row['period'], row['income']) for row in series] == [('1995-06', 100.0), ('2024-03', 200.0)]
+        assert db.conn.total_changes == changes
+    finally:
+        other.rollback()
+        other.close()
+
+
+def test_startup_completes_the_calendar(db, db_path, technician_id):
+    db.add_task(make_task(technician_id, task_date='1995-06-01'))
+    db.conn.execute('DELETE FROM calendar WHERE day < ?', (to_day_number('2000-01-01'),))
+    db.conn.commit()
+
+    reopened = Database(db_path)
+    reopened.initialize_database()
+    try:
+        assert _calendar_covers(reopened, '1995-06-01')
+        assert [row['period'] for row in reopened.get_period_series('month')] == ['1995-06']
+    finally:
+        reopened.close()
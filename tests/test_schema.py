@@ -0,0 +1,156 @@
+import sqlite3
+
+import pytest
+
+from database import Database
+from database.dates import to_day_number
+from database.schema import MIGRATIONS, SCHEMA_VERSION, get_schema_version, migrate
+
+
+def _create_legacy_database(path):
+    """Base con el esquema anterior a las migraciones (user_version 0)"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+    CREATE TABLE technicians (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        technician_id INTEGER,
+        client_name TEXT NOT NULL,
+        task_description TEXT,
+        task_date TEXT,
+        budget_total REAL,
+        labor_cost REAL,
+        material_cost REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    INSERT INTO technicians (name) VALUES ('Ana');
+    INSERT INTO tasks (technician_id, client_name, task_date, budget_total, labor_cost, material_cost)
+    VALUES (1, 'Cliente A', '15/03/2024', 1234.56, 100, 50.25),
+           (1, 'Cliente B', '2024-04-01', 10, 0, 0),
+           (1, 'Cliente C', 'a confirmar', 20, 0, 0);
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_reaches_latest_version(db):
+    assert get_schema_version(db.conn) == SCHEMA_VERSION == MIGRATIONS[-1][0]
+    tables = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'technicians', 'tasks', 'import_ledger', 'import_files', 'rate_rules',
+            'calendar', 'column_store_state', 'task_revision'} <= tables
+
+
+def test_migrations_are_numbered_in_order():
+    assert [number for number, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def test_migrate_is_a_noop_when_up_to_date(db):
+    changes = db.conn.total_changes
+    assert migrate(db.conn) == SCHEMA_VERSION
+    assert db.conn.total_changes == changes
+
+
+def test_legacy_database_is_upgraded(db_path):
+    _create_legacy_database(db_path)
+    db = Database(db_path)
+    db.initialize_database()
+    try:
+        assert get_schema_version(db.conn) == SCHEMA_VERSION
+
+        # Migración 2: fechas ISO, número de día y centavos
+        rows = db.conn.execute(
+            'SELECT task_date, task_day, budget_total_cents, material_cost_cents FROM tasks ORDER BY id'
+        ).fetchall()
+        assert tuple(rows[0]) == ('2024-03-15', to_day_number('2024-03-15'), 123456, 5025)
+        assert tuple(rows[1])[:2] == ('2024-04-01', to_day_number('2024-04-01'))
+        # Una fecha no reconocida se conserva tal cual, sin número de día
+        assert tuple(rows[2])[:3] == ('a confirmar', None, 2000)
+
+        # Migración 3: las tareas existentes quedan en el registro de importaciones
+        assert db.conn.execute('SELECT COUNT(*) FROM import_ledger').fetchone()[0] == 3
+
+        # Migración 4: regla de tasas inicial
+        assert len(db.get_rate_rules()) == 1
+
+        # Migración 5: calendario que cubre las tareas
+        assert db.conn.execute(
+            'SELECT month FROM calendar WHERE day = ?', (to_day_number('2024-03-15'),)
+        ).fetchone()[0] == 3
+
+        # Migración 7: técnicos activos por defecto
+        assert db.conn.execute('SELECT active FROM technicians').fetchone()[0] == 1
+
+        # Migración 8: estado del almacén de columnas sin generar
+        assert tuple(db.conn.execute(
+            'SELECT generation, closed_day, dirty_from_day FROM column_store_state'
+        ).fetchone()) == (0, 0, None)
+    finally:
+        db.close()
+
+
+def test_full_text_search_indexes_existing_tasks(db_path):
+    _create_legacy_database(db_path)
+    db = Database(db_path)
+    db.initialize_database()
+    try:
+        if not db._table_exists('tasks_fts'):
+            return  # SQLite sin FTS5: la búsqueda usa LIKE
+        assert [task['client_name'] for task in db.search_tasks('cliente a')] == ['Cliente A']
+    finally:
+        db.close()
+
+
+def test_failed_migration_is_rolled_back(db_path, monkeypatch):
+    import database.schema as schema
+
+    def broken(cursor):
+        cursor.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('falla')
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', [*MIGRATIONS[:1], (2, 'rota', broken)])
+    monkeypatch.setattr(schema, 'SCHEMA_VERSION', 2)
+    conn = sqlite3.connect(db_path)
+    try:
+        with pytest.raises(RuntimeError):
+            schema.migrate(conn)
+        assert get_schema_version(conn) == 1
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    finally:
+        conn.close()
+
+
+def test_tasks_without_day_stay_out_of_period_series(db_path):
+    _create_legacy_database(db_path)
+    db = Database(db_path)
+    db.initialize_database()
+    try:
+        series = db.get_period_series('month')
+        assert [(row['period'], row['tasks'], row['income']) for row in series] == [
+            ('2024-03', 1, 1234.56), ('2024-04', 1, 10.0)
+        ]
+    finally:
+        db.close()
+
+
+def test_tasks_without_day_are_exported_without_date(db_path, tmp_path):
+    pytest.importorskip('pyarrow')
+    from database.snapshot import export_snapshot, load_snapshot
+
+    _create_legacy_database(db_path)
+    db = Database(db_path)
+    db.initialize_database()
+    try:
+        path = str(tmp_path / 'snapshot')
+        # Un bloque por tarea: el de la tarea sin fecha tiene task_day NULL en todas sus filas
+        assert export_snapshot(db, path, chunk_size=1)['rows'] == 3
+        df, _ = load_snapshot(path)
+        assert [str(day) for day in df['task_date'].tolist()] == ['2024-03-15', '2024-04-01', 'None']
+        assert df['client_name'].tolist() == ['Cliente A', 'Cliente B', 'Cliente C']
+    finally:
+        db.close()
@@ -0,0 +1,60 @@
+import csv
+import http.client
+import urllib.error
+
+import pytest
+
+from database.service import QueryService, ServiceClient
+
+from conftest import make_task
+
+
+@pytest.fixture
+def service(db):
+    service = QueryService(db.db_name, port=0, pool_size=2).start()
+    yield service
+    service.stop()
+
+
+def test_reports_match_the_local_database(db, technician_id, service):
+    db.add_task(make_task(technician_id, task_date='2024-03-01'))
+    db.add_task(make_task(technician_id, task_date='2024-03-02', budget_total=500, cash_payment=500))
+    client = ServiceClient(service.url)
+    assert client.is_available()
+
+    local = db.generate_report(technician_id, '2024-03-01', '2024-03-31')
+    remote = client.generate_report(technician_id, '2024-03-01', '2024-03-31')
+    assert remote['summary']['total_income'] == local['summary']['total_income'] == 1500
+    assert [task['id'] for task in remote['tasks']] == [task['id'] for task in local['tasks']]
+
+    # Sin técnico: reporte de todos
+    assert client.generate_report(None, '2024-03-01', '2024-03-31')['summary']['total_tasks'] == 2
+    assert client.get_general_report('2024-03-01', '2024-03-31') == db.get_general_report('2024-03-01', '2024-03-31')
+
+
+def test_task_csv_is_streamed_in_chunks(db, technician_id, service, monkeypatch):
+    monkeypatch.setattr('database.service.CSV_CHUNK', 3)
+    db.add_tasks([make_task(technician_id, client_name=f'Cliente {i}') for i in range(10)])
+
+    rows = list(csv.reader(ServiceClient(service.url).iter_task_csv(technician_id=technician_id)))
+    assert rows[0][-1] == 'technician_name'
+    assert [row[2] for row in rows[1:]] == [f'Cliente {i}' for i in range(10)]
+
+
+def test_invalid_parameters_get_an_error_status(service):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        list(ServiceClient(service.url).iter_task_csv(technician_id='abc'))
+    assert error.value.code == 400
+
+
+def test_error_while_streaming_cuts_the_response(db, technician_id, service, monkeypatch):
+    def failing_rows(params):
+        yield ['id', 'client_name']
+        for i in range(5):
+            yield [i, f'Cliente {i}']
+        raise RuntimeError('falla a mitad de camino')
+
+    monkeypatch.setattr(service, 'task_rows', failing_rows)
+    monkeypatch.setattr('database.service.CSV_CHUNK', 2)
+    with pytest.raises(http.client.IncompleteRead):
+        list(ServiceClient(service.url).iter_task_csv())
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from database.snapshot import export_snapshot, load_snapshot  # noqa: E402
+
+from conftest import make_task  # noqa: E402
+
+
+@pytest.fixture
+def tasks(db, technician_id):
+    db.add_tasks([make_task(technician_id, client_name=f'Cliente {i}', budget_total=100 + i) for i in range(5)])
+    return technician_id
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+def test_snapshot_round_trip(db, tasks, tmp_path, file_format):
+    path = str(tmp_path / 'snapshot')
+    result = export_snapshot(db, path, file_format)
+    assert (result['full'], result['added'], result['rows']) == (True, 5, 5)
+
+    df, technicians = load_snapshot(path)
+    assert df['client_name'].tolist() == [f'Cliente {i}' for i in range(5)]
+    assert df['budget_total'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert str(df['task_date'].iloc[0]) == '2024-03-15'
+    assert technicians['name'].tolist() == ['Juan Pérez']
+
+
+def test_new_tasks_are_appended(db, tasks, tmp_path):
+    path = str(tmp_path / 'snapshot')
+    export_snapshot(db, path)
+    db.add_task(make_task(tasks, client_name='Nueva'))
+
+    result = export_snapshot(db, path)
+    assert (result['full'], result['added'], result['rows']) == (False, 1, 6)
+    assert load_snapshot(path)[0]['client_name'].iloc[-1] == 'Nueva'
+
+    # Sin cambios no se agrega nada
+    assert export_snapshot(db, path)['added'] == 0
+
+
+@pytest.mark.parametrize('change', ['status', 'description', 'cash', 'delete', 'merge_below_watermark'])
+def test_changes_to_exported_tasks_rebuild_the_snapshot(db, tasks, tmp_path, change):
+    path = str(tmp_path / 'snapshot')
+    export_snapshot(db, path)
+    if change == 'status':
+        db.update_tasks_status([1, 2], 'COMPLETADA')
+    elif change == 'description':
+        db.conn.execute("UPDATE tasks SET task_description = 'Otra' WHERE id = 3")
+        db.conn.commit()
+    elif change == 'cash':
+        db.conn.execute('UPDATE tasks SET cash_payment = 1, cash_payment_cents = 100 WHERE id = 3')
+        db.conn.commit()
+    elif change == 'delete':
+        db.delete_task(2)
+    else:
+        # Una tarea de un respaldo vuelve con su id, por debajo de la marca de agua
+        db.delete_task(2)
+        export_snapshot(db, path)
+        db.merge_tasks(pd.DataFrame([{**make_task(tasks, client_name='Respaldo'), 'id': 2}]))
+
+    result = export_snapshot(db, path)
+    assert result['full']
+    df = load_snapshot(path)[0].set_index('id')
+    expected = pd.DataFrame([dict(row) for row in db.conn.execute('SELECT * FROM tasks')]).set_index('id')
+    assert sorted(df.index) == sorted(expected.index)
+    for column in ['status', 'task_description', 'client_name', 'cash_payment']:
+        assert df[column].astype(str).to_dict() == expected[column].astype(str).to_dict(), column
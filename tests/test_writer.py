@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+import database.database as database_module
+from database.writer import DatabaseWriter
+
+from conftest import make_task
+
+
+@pytest.fixture
+def writer(db):
+    writer = DatabaseWriter(db.db_name, window=0.05, busy_timeout=100)
+    yield writer
+    writer.stop(timeout=10)
+
+
+def test_group_is_committed_and_futures_resolved(db, technician_id, writer):
+    futures = [writer.submit('add_task', make_task(technician_id, client_name=f'Cliente {i}')) for i in range(5)]
+    task_ids = [future.result(timeout=10) for future in futures]
+    assert len(set(task_ids)) == 5
+    assert db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 5
+    assert writer.operations_committed == 5
+    assert writer.groups_committed < 5
+
+
+def test_failed_operation_does_not_undo_the_rest_of_the_group(db, technician_id, writer):
+    good = writer.submit('add_task', make_task(technician_id))
+    bad = writer.submit('method_that_does_not_exist')
+    other = writer.submit('add_task', make_task(technician_id, client_name='Otro'))
+    assert good.result(timeout=10) and other.result(timeout=10)
+    with pytest.raises(AttributeError):
+        bad.result(timeout=10)
+    assert db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 2
+
+
+def test_futures_fail_when_the_database_stays_locked(db, technician_id, writer, monkeypatch):
+    monkeypatch.setattr(database_module, 'LOCK_RETRIES', 1)
+    monkeypatch.setattr(database_module, 'LOCK_BACKOFF', 0.01)
+
+    # Otra conexión retiene el bloqueo de escritura
+    other = sqlite3.connect(db.db_name, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        futures = [writer.submit('add_task', make_task(technician_id)) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(sqlite3.OperationalError):
+                future.result(timeout=10)
+    finally:
+        other.execute('ROLLBACK')
+        other.close()
+
+    # Liberado el bloqueo, el escritor sigue funcionando
+    assert writer.submit('add_task', make_task(technician_id)).result(timeout=10)
+    assert db.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 1
+
+
+def test_submit_write_without_writer_runs_immediately(db, technician_id):
+    future = db.submit_write('add_task', make_task(technician_id))
+    assert future.done() and future.result()
+
+
+def test_lock_stats_are_recorded_per_operation(db, technician_id):
+    db.add_task(make_task(technician_id))
+    db.update_tasks_status([1], 'COMPLETADA')
+    stats = db.get_lock_stats()
+    assert stats['add_task']['transactions'] == 1
+    assert stats['update_tasks_status']['transactions'] == 1
+    assert stats['add_technician']['contended'] == 0
+
+
+def test_lock_contention_is_counted_and_retried(db, technician_id, monkeypatch):
+    monkeypatch.setattr(database_module, 'LOCK_BACKOFF', 0.01)
+    db.conn.execute('PRAGMA busy_timeout = 10')
+
+    # Otra conexión libera el bloqueo después del primer reintento
+    other = sqlite3.connect(db.db_name, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    original_sleep = database_module.time.sleep
+
+    def release_and_sleep(seconds):
+        if other.in_transaction:
+            other.execute('ROLLBACK')
+        original_sleep(seconds)
+
+    monkeypatch.setattr(database_module.time, 'sleep', release_and_sleep)
+    try:
+        db.add_task(make_task(technician_id))
+    finally:
+        other.close()
+    stats = db.get_lock_stats()['add_task']
+    assert (stats['contended'], stats['retries'], stats['failures']) == (1, 1, 0)
+
+
+def test_writer_groups_are_labeled_with_their_operations(db, technician_id, writer):
+    writer.submit('add_task', make_task(technician_id))
+    writer.submit('update_tasks_status', [1], 'COMPLETADA')
+    writer.flush(timeout=10)
+    labels = set(writer.db.get_lock_stats())
+    assert labels
+    assert all(label.startswith('writer: ') for label in labels)
+    assert any('add_task' in label for label in labels)
@@ -0,0 +1,258 @@
+"""
+Cola de trabajos de exportación. Cada exportación corre en un pool de hilos
+mientras el usuario sigue trabajando; se pueden encolar varias a la vez. El
+avance (por filas) se muestra en un panel no modal (ExportJobsPanel) desde
+donde también se pueden cancelar.
+
+Cada trabajo escribe en un archivo temporal en la misma carpeta del destino
+y recién al terminar bien lo renombra al nombre final (os.replace, atómico):
+una exportación cancelada o fallida nunca deja un archivo a medio escribir
+ni pisa el anterior.
+"""
+import itertools
+import os
+import stat
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtWidgets import QFrame, QHBoxLayout, QLabel, QProgressBar, QPushButton, QVBoxLayout
+
+from database import Database
+
+# Exportaciones simultáneas; las demás esperan en la cola
+MAX_WORKERS = 2
+
+# Segundos que se muestra un trabajo terminado antes de quitarlo del panel
+FINISHED_VISIBLE = 15
+
+# Umask del proceso, leída una vez al importar: os.umask solo se puede
+# consultar cambiándola, y eso no es seguro con los hilos del pool andando
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class ExportCancelled(Exception):
+    """La exportación se canceló"""
+
+
+@contextmanager
+def worker_connection(db_name):
+    """
+    Conexión propia para un trabajo que lee de la base: las conexiones de
+    la interfaz no se comparten entre hilos.
+    """
+    db = Database(db_name)
+    db.connect()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ExportJob:
+    """Una exportación: título, destino y la función que escribe el archivo"""
+
+    def __init__(self, job_id, title, file_path, run, atomic, queue):
+        self.id = job_id
+        self.title = title
+        self.file_path = file_path
+        self.run = run
+        self.atomic = atomic
+        self._queue = queue
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self, done, total=0, text=''):
+        """
+        Informa el avance (filas hechas de total; total 0 si no se conoce).
+        Si se pidió cancelar, corta el trabajo con ExportCancelled.
+        """
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        self._queue.job_progress.emit(self, int(done), int(total), text)
+
+
+class ExportJobQueue(QObject):
+    """Pool de hilos para las exportaciones, con señales para la interfaz"""
+    job_added = Signal(object)
+    job_progress = Signal(object, int, int, str)
+    job_finished = Signal(object, str)
+    job_failed = Signal(object, str)
+    job_cancelled = Signal(object)
+
+    def __init__(self, max_workers=MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.active = {}
+
+    def submit(self, title, file_path, run, atomic=True):
+        """
+        Encola una exportación.
+
+        Args:
+            title: texto a mostrar en el panel
+            file_path: destino (archivo, o carpeta si atomic es False)
+            run: función run(job, ruta) que escribe el archivo en ruta (la
+                temporal) y puede devolver un mensaje final
+            atomic: escribir en un temporal y renombrarlo al terminar
+
+        Returns:
+            ExportJob
+        """
+        job = ExportJob(next(self._ids), title, file_path, run, atomic, self)
+        with self._lock:
+            self.active[job.id] = job
+        self.job_added.emit(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def cancel(self, job):
+        job.cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self.active.values():
+                job.cancel()
+
+    def shutdown(self, cancel=True):
+        """Detiene el pool (por defecto cancelando lo pendiente) y espera"""
+        if cancel:
+            self.cancel_all()
+        self._executor.shutdown(wait=True)
+
+    def _temp_path(self, file_path):
+        # En la misma carpeta (el renombrado es atómico) y con la misma extensión
+        folder, name = os.path.split(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(prefix='.~', suffix=f'-{name}', dir=folder)
+        os.close(fd)
+        return temp_path
+
+    def _final_mode(self, file_path):
+        """
+        Permisos del archivo final: mkstemp crea el temporal solo para el
+        dueño (0600) y os.replace conserva ese modo, así que se usan los del
+        archivo que se reemplaza o, si es nuevo, los de open() (0666 menos
+        la umask).
+        """
+        try:
+            return stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            return 0o666 & ~_UMASK
+
+    def _run(self, job):
+        temp_path = None
+        try:
+            if job.cancelled:
+                raise ExportCancelled()
+            if job.atomic:
+                temp_path = self._temp_path(job.file_path)
+                message = job.run(job, temp_path)
+                os.chmod(temp_path, self._final_mode(job.file_path))
+                os.replace(temp_path, job.file_path)
+                temp_path = None
+            else:
+                message = job.run(job, job.file_path)
+        except ExportCancelled:
+            self.job_cancelled.emit(job)
+        except Exception as e:
+            print(f"Error en la exportación '{job.title}': {e}")
+            self.job_failed.emit(job, str(e))
+        else:
+            self.job_finished.emit(job, message or job.file_path)
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError as e:
+                    print(f"No se pudo borrar el archivo temporal {temp_path}: {e}")
+            with self._lock:
+                self.active.pop(job.id, None)
+
+
+class ExportJobsPanel(QFrame):
+    """
+    Panel no modal con una fila por exportación: avance y botón para
+    cancelar (o cerrar, cuando terminó). Se oculta cuando no hay trabajos.
+    """
+
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.rows = {}
+        self.rows_layout = QVBoxLayout(self)
+        self.rows_layout.setContentsMargins(4, 2, 4, 2)
+        self.rows_layout.setSpacing(2)
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.hide()
+
+        queue.job_added.connect(self.add_job)
+        queue.job_progress.connect(self.update_job)
+        queue.job_finished.connect(self.finish_job)
+        queue.job_failed.connect(self.fail_job)
+        queue.job_cancelled.connect(self.cancel_job)
+
+    def add_job(self, job):
+        row = QFrame()
+        layout = QHBoxLayout(row)
+        layout.setContentsMargins(0, 0, 0, 0)
+        label = QLabel(f"⏳ {job.title}: en espera")
+        bar = QProgressBar()
+        bar.setMaximumWidth(250)
+        bar.setRange(0, 0)
+        button = QPushButton("Cancelar")
+        button.clicked.connect(lambda: self.queue.cancel(job) if job.id in self.queue.active else self.remove_job(job))
+        layout.addWidget(label, 1)
+        layout.addWidget(bar)
+        layout.addWidget(button)
+        self.rows[job.id] = (row, label, bar, button)
+        self.rows_layout.addWidget(row)
+        self.show()
+
+    def update_job(self, job, done, total, text):
+        if job.id not in self.rows:
+            return
+        _, label, bar, _ = self.rows[job.id]
+        if total:
+            bar.setRange(0, total)
+            bar.setValue(done)
+        else:
+            bar.setRange(0, 0)
+        label.setText(f"⏳ {job.title}: {text or f'{done:,} filas'}")
+
+    def _end_job(self, job, text, auto_remove):
+        if job.id not in self.rows:
+            return
+        _, label, bar, button = self.rows[job.id]
+        label.setText(text)
+        bar.setRange(0, 1)
+        bar.setValue(1 if auto_remove else 0)
+        button.setText("Cerrar")
+        if auto_remove:
+            QTimer.singleShot(FINISHED_VISIBLE * 1000, lambda: self.remove_job(job))
+
+    def finish_job(self, job, message):
+        self._end_job(job, f"✅ {job.title}: {message}", auto_remove=True)
+
+    def fail_job(self, job, message):
+        self._end_job(job, f"❌ {job.title}: {message}", auto_remove=False)
+
+    def cancel_job(self, job):
+        self._end_job(job, f"⛔ {job.title}: cancelada", auto_remove=True)
+
+    def remove_job(self, job):
+        row = self.rows.pop(job.id, None)
+        if row:
+            row[0].deleteLater()
+        if not self.rows:
+            self.hide()
@@ -0,0 +1,431 @@
+"""
+Armado y escritura de las exportaciones a Excel del reporte. Estas funciones
+no tocan la interfaz: reciben las tareas del reporte (lista de dicts) y
+escriben el archivo informando el avance a un trabajo de exportación (ver
+export_jobs.py), de modo que pueden correr fuera del hilo de la interfaz.
+Los estados de cuenta por técnico se generan en un pool de procesos (ver
+export_technician_statements).
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Formato de moneda de Excel para las columnas de montos
+MONEY_FORMAT = '"$"#,##0.00_);("$"#,##0.00)'
+
+# Filas por bloque al escribir una hoja; entre bloques se informa el avance
+# y se atiende la cancelación
+CHUNK_ROWS = 2000
+
+# Nombres en español de las columnas de datos completos
+COMPLETE_DATA_COLUMNS = {
+    'id': 'ID',
+    'technician_id': 'ID Técnico',
+    'client_name': 'Cliente',
+    'task_description': 'Descripción',
+    'task_date': 'Fecha',
+    'budget_total': 'Presupuesto Total',
+    'labor_cost': 'Costo Mano de Obra',
+    'material_cost': 'Costo Materiales',
+    'insurance_payment': 'Pago Seguro',
+    'cash_payment': 'Pago Efectivo',
+    'material_expense': 'Gasto Material',
+    'profit': 'Ganancia',
+    'pablo_share': 'Participación Técnico',
+    'facu_share': 'Participación Socio',
+    'iva': 'IVA',
+    'payment_type': 'Tipo de Pago',
+    'order_number': 'Número de Pedido',
+    'status': 'Estado',
+    'created_at': 'Fecha de Creación'
+}
+
+COMPLETE_DATA_MONEY_COLUMNS = [
+    'Presupuesto Total', 'Costo Mano de Obra', 'Costo Materiales',
+    'Pago Seguro', 'Pago Efectivo', 'Gasto Material',
+    'Ganancia', 'Participación Técnico', 'Participación Socio', 'IVA'
+]
+
+
+def money_styles(workbook):
+    """
+    Registra en el libro los estilos con nombre de los montos (normal y en
+    negrita). El formato se define una sola vez y cada celda de monto solo
+    guarda la referencia al estilo al escribirse.
+    """
+    styles = {}
+    for name, bold in (('Moneda', False), ('Moneda negrita', True)):
+        style = NamedStyle(name=name, number_format=MONEY_FORMAT, font=Font(bold=bold))
+        workbook.add_named_style(style)
+        styles[bold] = name
+    return styles
+
+
+def fit_column_widths(worksheet, df, max_width=30):
+    """
+    Ajusta el ancho de cada columna al texto más largo. Para las columnas
+    numéricas alcanza con el mínimo y el máximo (con formato de moneda).
+    """
+    for idx, col in enumerate(df.columns, 1):
+        values = df[col].dropna()
+        if values.empty:
+            length = 0
+        elif pd.api.types.is_numeric_dtype(values):
+            length = max(len(f"${values.min():,.2f}"), len(f"${values.max():,.2f}"))
+        else:
+            length = values.astype(str).str.len().max()
+        worksheet.column_dimensions[get_column_letter(idx)].width = min(max(length, len(str(col))) + 2, max_width)
+
+
+def write_workbook(file_path, sheets, job=None):
+    """
+    Escribe un libro de Excel en modo de solo escritura (las filas van
+    directo al archivo temporal de openpyxl, sin armar la hoja en memoria),
+    por bloques de CHUNK_ROWS filas.
+
+    Los montos quedan como números. Excel solo aplica el formato de una
+    columna a las celdas vacías, así que cada celda de monto lleva el estilo
+    con nombre "Moneda" al escribirse (sin una segunda pasada por la hoja);
+    la columna lleva además el formato para las filas que se agreguen
+    después en Excel.
+
+    Args:
+        file_path: ruta del archivo
+        sheets: lista de dicts con name y df, y opcionalmente money_columns,
+            bold_rows (números de fila de Excel) y max_width
+        job: trabajo de exportación opcional (avance y cancelación)
+    """
+    total = sum(len(sheet['df']) for sheet in sheets)
+    done = 0
+    workbook = Workbook(write_only=True)
+    styles = money_styles(workbook)
+    bold = Font(bold=True)
+    for sheet in sheets:
+        df = sheet['df']
+        worksheet = workbook.create_sheet(sheet['name'])
+        money = [col in sheet.get('money_columns', ()) for col in df.columns]
+        bold_rows = set(sheet.get('bold_rows', ()))
+
+        # El ancho y el formato de las columnas van antes de la primera fila
+        fit_column_widths(worksheet, df, sheet.get('max_width', 30))
+        for idx, is_money in enumerate(money, 1):
+            if is_money:
+                worksheet.column_dimensions[get_column_letter(idx)].number_format = MONEY_FORMAT
+
+        header = []
+        for col in df.columns:
+            cell = WriteOnlyCell(worksheet, str(col))
+            cell.font = bold
+            header.append(cell)
+        worksheet.append(header)
+
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            # Los vacíos (NaN) se escriben como celdas vacías, igual que to_excel
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row_number, values in enumerate(chunk.itertuples(index=False, name=None), start + 2):
+                is_bold = row_number in bold_rows
+                row = []
+                for value, is_money in zip(values, money):
+                    if is_money or is_bold:
+                        cell = WriteOnlyCell(worksheet, value)
+                        if is_money:
+                            cell.style = styles[is_bold]
+                        else:
+                            cell.font = bold
+                        value = cell
+                    row.append(value)
+                worksheet.append(row)
+            done += len(chunk)
+            if job:
+                job.progress(done, total)
+
+    if job:
+        job.progress(total, total, "Guardando archivo...")
+    workbook.save(file_path)
+
+
+def template_sheets(tasks, technician_names, technicians):
+    """Hojas de la plantilla con datos (para importar en otro sistema)"""
+    df = pd.DataFrame([
+        {
+            'Técnico': technician_names.get(task['technician_id'], ''),
+            'Cliente': task['client_name'],
+            'Tarea': task['task_description'],
+            'Presupuesto Total': task['budget_total'],
+            'Mano de Obra': task['labor_cost'],
+            'Presupuesto Materiales': task['material_cost'],
+            'Pago Seguro': task['insurance_payment'],
+            'Efectivo': task['cash_payment'],
+            'Número Pedido': task.get('order_number', ''),
+            'Gasto Material': task.get('material_expense', 0),
+            'Tipo de Pago': task.get('payment_type', 'EFECTIVO'),
+            'Estado': task.get('status', 'PENDIENTE'),
+            'Fecha (AAAA-MM-DD)': task['task_date']
+        }
+        for task in tasks
+    ])
+    sheets = [{'name': 'Tareas', 'df': df}]
+
+    # Hoja de técnicos para validación
+    if technicians:
+        tech_data = [{'Técnico': f"{t['name']} (ID: {t['id']})"} for t in technicians]
+        sheets.append({'name': 'Tecnicos', 'df': pd.DataFrame(tech_data)})
+    return sheets
+
+
+def complete_data_sheets(tasks):
+    """Hoja con todos los datos de las tareas, para análisis"""
+    df = pd.DataFrame(tasks).rename(columns=COMPLETE_DATA_COLUMNS)
+
+    # Formatear fechas
+    if 'Fecha' in df.columns:
+        df['Fecha'] = pd.to_datetime(df['Fecha']).dt.strftime('%Y-%m-%d')
+    if 'Fecha de Creación' in df.columns:
+        df['Fecha de Creación'] = pd.to_datetime(df['Fecha de Creación']).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    # Los montos quedan numéricos; el formato de moneda se aplica al escribir
+    money_columns = [col for col in COMPLETE_DATA_MONEY_COLUMNS if col in df.columns]
+    return [{'name': 'Datos Completos', 'df': df, 'money_columns': money_columns}]
+
+
+def technician_report_sheets(tasks, technician_names):
+    """Resumen de ganancias por técnico, de mayor a menor, con fila de totales"""
+    tech_data = {}
+    for task in tasks:
+        tech_id = task['technician_id']
+        if tech_id not in tech_data:
+            tech_data[tech_id] = {
+                'Técnico': technician_names.get(tech_id, ''),
+                'Total Ventas': 0,
+                'Costo Mano de Obra': 0,
+                'Costo Materiales': 0,
+                'Ganancia Neta': 0,
+                'Cantidad de Trabajos': 0
+            }
+
+        # Acumular valores
+        tech_data[tech_id]['Total Ventas'] += task['budget_total']
+        tech_data[tech_id]['Costo Mano de Obra'] += task['labor_cost']
+        tech_data[tech_id]['Costo Materiales'] += task['material_cost']
+        tech_data[tech_id]['Ganancia Neta'] += task['profit']
+        tech_data[tech_id]['Cantidad de Trabajos'] += 1
+
+    # Ordenar por ganancia neta descendente
+    df = pd.DataFrame(tech_data.values()).sort_values('Ganancia Neta', ascending=False)
+
+    # Agregar totales
+    total_row = {
+        'Técnico': 'TOTAL',
+        'Total Ventas': df['Total Ventas'].sum(),
+        'Costo Mano de Obra': df['Costo Mano de Obra'].sum(),
+        'Costo Materiales': df['Costo Materiales'].sum(),
+        'Ganancia Neta': df['Ganancia Neta'].sum(),
+        'Cantidad de Trabajos': df['Cantidad de Trabajos'].sum()
+    }
+    df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+
+    return [{
+        'name': 'Resumen Técnicos',
+        'df': df,
+        'money_columns': ['Total Ventas', 'Costo Mano de Obra', 'Costo Materiales', 'Ganancia Neta'],
+        'bold_rows': [len(df) + 1],
+        'max_width': 50
+    }]
+
+
+def facu_report_sheets(tasks):
+    """Resumen y detalle por tarea de la participación del socio (30%)"""
+    total_ganancia = sum(task['profit'] for task in tasks)
+    total_facu = sum(task.get('facu_share', 0) for task in tasks)
+    total_tecnico = sum(task.get('pablo_share', 0) for task in tasks)
+
+    df = pd.DataFrame([
+        {'Concepto': 'Ganancia Total', 'Monto': total_ganancia, 'Porcentaje': '100%'},
+        {'Concepto': 'Participación de Socio (30%)', 'Monto': total_facu, 'Porcentaje': '30%'},
+        {'Concepto': 'Participación de Técnico (70%)', 'Monto': total_tecnico, 'Porcentaje': '70%'}
+    ])
+    sheets = [{'name': 'Resumen', 'df': df, 'money_columns': ['Monto'], 'bold_rows': [2, 3, 4]}]
+
+    # Detalle por tarea
+    detalle = pd.DataFrame([
+        {
+            'Fecha': task['task_date'],
+            'Cliente': task['client_name'],
+            'Descripción': task['task_description'],
+            'Ganancia Total': task['profit'],
+            'Socio (30%)': task.get('facu_share', 0),
+            'Técnico (70%)': task.get('pablo_share', 0)
+        }
+        for task in tasks if task.get('facu_share', 0) > 0
+    ])
+
+    if not detalle.empty:
+        total_row = {
+            'Fecha': 'TOTAL',
+            'Cliente': '',
+            'Descripción': '',
+            'Ganancia Total': detalle['Ganancia Total'].sum(),
+            'Socio (30%)': detalle['Socio (30%)'].sum(),
+            'Técnico (70%)': detalle['Técnico (70%)'].sum()
+        }
+        detalle = pd.concat([detalle, pd.DataFrame([total_row])], ignore_index=True)
+        sheets.append({
+            'name': 'Detalle',
+            'df': detalle,
+            'money_columns': ['Ganancia Total', 'Socio (30%)', 'Técnico (70%)'],
+            'bold_rows': [len(detalle) + 1]
+        })
+    return sheets
+
+
+def money_sum(tasks, column):
+    """Suma de un monto de las tareas, redondeada a centavos"""
+    return round(sum(task[column] for task in tasks), 2)
+
+
+def technician_statement_sheets(technician_name, tasks, period):
+    """Estado de cuenta de un técnico: resumen del período y detalle por tarea"""
+    summary = pd.DataFrame([{
+        'Técnico': technician_name,
+        'Período': period,
+        'Cantidad de Trabajos': len(tasks),
+        'Total Ventas': money_sum(tasks, 'budget_total'),
+        'Costo Mano de Obra': money_sum(tasks, 'labor_cost'),
+        'Costo Materiales': money_sum(tasks, 'material_cost'),
+        'Ganancia Neta': money_sum(tasks, 'profit'),
+        'Técnico (70%)': money_sum(tasks, 'pablo_share'),
+        'Socio (30%)': money_sum(tasks, 'facu_share')
+    }])
+    summary_money = ['Total Ventas', 'Costo Mano de Obra', 'Costo Materiales',
+                     'Ganancia Neta', 'Técnico (70%)', 'Socio (30%)']
+
+    detail = pd.DataFrame([
+        {
+            'Fecha': task['task_date'],
+            'Cliente': task['client_name'],
+            'Descripción': task['task_description'],
+            'Número Pedido': task['order_number'],
+            'Presupuesto Total': task['budget_total'],
+            'Ganancia Total': task['profit'],
+            'Técnico (70%)': task['pablo_share'],
+            'Socio (30%)': task['facu_share'],
+            'Estado': task['status']
+        }
+        for task in tasks
+    ])
+    detail_money = ['Presupuesto Total', 'Ganancia Total', 'Técnico (70%)', 'Socio (30%)']
+    total_row = {'Fecha': 'TOTAL', **{col: round(detail[col].sum(), 2) for col in detail_money}}
+    detail = pd.concat([detail, pd.DataFrame([total_row])], ignore_index=True)
+
+    return [
+        {'name': 'Resumen', 'df': summary, 'money_columns': summary_money},
+        {'name': 'Tareas', 'df': detail, 'money_columns': detail_money,
+         'bold_rows': [len(detail) + 1], 'max_width': 40}
+    ]
+
+
+def statement_file_name(technician_id, technician_name, start_date, end_date):
+    """Nombre de archivo del estado de cuenta (sin caracteres inválidos; el id evita repetidos)"""
+    name = re.sub(r'[^\w\-]+', '_', technician_name).strip('_')
+    return f"estado_{technician_id}_{name}_{start_date}_{end_date}.xlsx"
+
+
+def write_technician_statement(file_path, technician_name, tasks, period):
+    """
+    Escribe el estado de cuenta de un técnico (corre en un proceso del
+    pool). Se escribe en un temporal y se renombra al terminar.
+
+    Returns:
+        dict: fila del índice
+    """
+    temp_path = os.path.join(os.path.dirname(file_path), f".~{os.path.basename(file_path)}")
+    try:
+        write_workbook(temp_path, technician_statement_sheets(technician_name, tasks, period))
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return {
+        'Técnico': technician_name,
+        'Archivo': os.path.basename(file_path),
+        'Cantidad de Trabajos': len(tasks),
+        'Total Ventas': money_sum(tasks, 'budget_total'),
+        'Ganancia Neta': money_sum(tasks, 'profit'),
+        'Técnico (70%)': money_sum(tasks, 'pablo_share'),
+        'Socio (30%)': money_sum(tasks, 'facu_share')
+    }
+
+
+def export_technician_statements(db, folder, start_date, end_date, max_workers=None, job=None):
+    """
+    Genera un estado de cuenta (.xlsx) por cada técnico con tareas en el
+    período, más un índice con los totales de todos. Las tareas se leen con
+    una sola consulta agrupada por técnico y cada libro se escribe en un
+    proceso del pool (iniciado con spawn).
+
+    Args:
+        db: instancia de Database (conectada)
+        folder: carpeta de destino
+        start_date, end_date: período (AAAA-MM-DD)
+        max_workers: procesos a usar (por defecto, uno por núcleo)
+        job: trabajo de exportación opcional (avance y cancelación)
+
+    Returns:
+        int: cantidad de estados de cuenta generados
+    """
+    tasks_by_technician = db.get_tasks_by_technician(start_date, end_date)
+    names = {tech['id']: tech['name'] for tech in db.get_technicians(include_inactive=True)}
+    period = f"{start_date} a {end_date}"
+    total = len(tasks_by_technician)
+    if job:
+        job.progress(0, total, f"0 de {total} técnicos")
+
+    index = []
+    if total:
+        # Procesos nuevos (spawn), no fork: esto corre en un hilo de
+        # exportación y hacer fork de un proceso Qt con varios hilos puede
+        # dejar al hijo trabado en un lock tomado por otro hilo
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    write_technician_statement,
+                    os.path.join(folder, statement_file_name(
+                        technician_id, names.get(technician_id, ''), start_date, end_date)),
+                    names.get(technician_id, f'Técnico {technician_id}'),
+                    tasks,
+                    period
+                )
+                for technician_id, tasks in tasks_by_technician.items()
+            ]
+            try:
+                for future in as_completed(futures):
+                    index.append(future.result())
+                    if job:
+                        job.progress(len(index), total, f"{len(index)} de {total} técnicos")
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    # Índice: una fila por técnico, de mayor a menor participación, y totales
+    df = pd.DataFrame(index, columns=['Técnico', 'Archivo', 'Cantidad de Trabajos', 'Total Ventas',
+                                      'Ganancia Neta', 'Técnico (70%)', 'Socio (30%)'])
+    df = df.sort_values('Técnico (70%)', ascending=False)
+    money_columns = ['Total Ventas', 'Ganancia Neta', 'Técnico (70%)', 'Socio (30%)']
+    total_row = {'Técnico': 'TOTAL', 'Archivo': '', 'Cantidad de Trabajos': df['Cantidad de Trabajos'].sum(),
+                 **{col: round(df[col].sum(), 2) for col in money_columns}}
+    df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+    write_workbook(
+        os.path.join(folder, f"indice_estados_{start_date}_{end_date}.xlsx"),
+        [{'name': 'Índice', 'df': df, 'money_columns': money_columns, 'bold_rows': [len(df) + 1], 'max_width': 50}]
+    )
+    return len(index)
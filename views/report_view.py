@@ -1,17 +1,29 @@
 import os
-import re
 import pandas as pd
 import json
 from datetime import datetime, timedelta
-from .task_dialog import TaskDialog
+from .task_dialog import TaskDialog, TASK_STATUSES
+from database.dates import to_display
+from database.ledger import file_fingerprint
+from database.reports import format_general_report
+from .exporters import (
+    write_workbook, template_sheets, complete_data_sheets, technician_report_sheets, facu_report_sheets,
+    export_technician_statements
+)
+from .export_jobs import ExportJobQueue, ExportJobsPanel, worker_connection
+from excel_importer import (
+    parse_task_workbook, import_task_workbooks, import_technicians, is_csv_file, import_task_csv,
+    export_task_csv
+)
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, 
     QComboBox, QLabel, QMessageBox, QDateEdit, QFileDialog,
-    QGroupBox, QGridLayout, QTabWidget, QFrame, QSizePolicy
+    QGroupBox, QGridLayout, QTabWidget, QFrame, QSizePolicy,
+    QProgressDialog, QApplication, QLineEdit, QInputDialog
 )
 from PySide6.QtGui import QColor
-from PySide6.QtCore import Qt, QDate, Signal
+from PySide6.QtCore import Qt, QDate, Signal, QTimer
 from openpyxl import Workbook
 from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.styles import Font, PatternFill
@@ -20,12 +32,21 @@ from openpyxl.utils import get_column_letter
 class ReportView(QWidget):
     # Señal personalizada para mensajes de estado
     status_message = Signal(str)
+    # Escritura confirmada por el hilo escritor: (función a llamar, future)
+    write_finished = Signal(object, object)
     
     def __init__(self, db):
         super().__init__()
         self.db = db
+        # Exportaciones en segundo plano (se crean antes de la interfaz: el
+        # panel de avance se conecta a la cola)
+        self.export_jobs = ExportJobQueue(parent=self)
+        self.export_jobs.job_finished.connect(self.on_export_finished)
+        self.export_jobs.job_failed.connect(self.on_export_failed)
         self.setup_styles()
         self.init_ui()
+        self.setup_live_filters()
+        self.write_finished.connect(self.on_write_finished)
         
     def setup_styles(self):
         """Configura los estilos para los widgets de la interfaz con un tema oscuro."""
@@ -167,6 +188,14 @@ class ReportView(QWidget):
         filter_layout.addWidget(QLabel("Hasta:"))
         filter_layout.addWidget(self.end_date_edit)
         
+        # Búsqueda de texto (cliente, descripción o número de pedido)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Buscar cliente, tarea o pedido...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setMinimumWidth(220)
+        self.search_input.returnPressed.connect(self.load_report)
+        filter_layout.addWidget(self.search_input)
+        
         # Botón de búsqueda
         search_btn = QPushButton("🔍 Buscar")
         search_btn.clicked.connect(self.load_report)
@@ -188,15 +217,17 @@ class ReportView(QWidget):
         self.add_button = QPushButton("➕ Agregar Tarea")
         self.edit_button = QPushButton("✏️ Editar Tarea")
         self.delete_button = QPushButton("🗑️ Eliminar Tarea")
+        self.status_button = QPushButton("🔄 Cambiar Estado")
         
         # Aplicar estilos a los botones
-        for btn in [self.add_button, self.edit_button, self.delete_button]:
+        for btn in [self.add_button, self.edit_button, self.delete_button, self.status_button]:
             btn.setStyleSheet(self.button_style)
             btn.setCursor(Qt.PointingHandCursor)
         
         tasks_layout.addWidget(self.add_button)
         tasks_layout.addWidget(self.edit_button)
         tasks_layout.addWidget(self.delete_button)
+        tasks_layout.addWidget(self.status_button)
         tasks_group.setLayout(tasks_layout)
         
         # Grupo de botones de importar/exportar
@@ -315,7 +346,10 @@ class ReportView(QWidget):
         
         # Tabla de tareas
         self.tasks_table = QTableWidget()
-        self.tasks_table.setColumnCount(16)  
+        self.tasks_table.setColumnCount(17)
+        # Selección de filas completas; Ctrl/Shift para elegir varias tareas
+        self.tasks_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tasks_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
         self.tasks_table.setHorizontalHeaderLabels([
             "ID", "Cliente", "Tarea", "Fecha", "Presupuesto Total", 
             "Mano Obra", "Material", "Pago Seguro", "Efectivo",
@@ -327,20 +361,52 @@ class ReportView(QWidget):
         self.tasks_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)  
         self.tasks_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)  
         
+        # Pestaña de tendencias: series semanales/mensuales calculadas en SQL
+        self.trends_tab = QWidget()
+        trends_layout = QVBoxLayout(self.trends_tab)
+        trends_filter_layout = QHBoxLayout()
+        self.trend_period_combo = QComboBox()
+        self.trend_period_combo.addItem("Semanal", 'week')
+        self.trend_period_combo.addItem("Mensual", 'month')
+        self.trend_period_combo.addItem("Trimestral", 'quarter')
+        self.trend_period_combo.currentIndexChanged.connect(self.update_trends)
+        trends_filter_layout.addWidget(QLabel("Período:"))
+        trends_filter_layout.addWidget(self.trend_period_combo)
+        trends_filter_layout.addStretch()
+        trends_layout.addLayout(trends_filter_layout)
+        
+        self.trends_table = QTableWidget()
+        self.trends_table.setColumnCount(9)
+        self.trends_table.setHorizontalHeaderLabels([
+            "Técnico", "Período", "Desde", "Tareas", "Ingresos", "Ganancia",
+            "Técnico", "Promedio Móvil (4)", "Variación"
+        ])
+        self.trends_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        trends_layout.addWidget(self.trends_table)
+        
+        self.content_tabs = QTabWidget()
+        self.content_tabs.addTab(self.tasks_table, "Tareas")
+        self.content_tabs.addTab(self.trends_tab, "Tendencias")
+        
         # Configurar layout del contenido
         content_layout = QVBoxLayout()
         content_layout.addWidget(self.metrics_group)
-        content_layout.addWidget(self.tasks_table)
+        content_layout.addWidget(self.content_tabs)
         
         # Agregar widgets al layout principal
         main_layout.addLayout(content_layout)
         
+        # Panel de exportaciones en curso (oculto si no hay ninguna)
+        self.export_panel = ExportJobsPanel(self.export_jobs)
+        main_layout.addWidget(self.export_panel)
+        
         self.setLayout(main_layout)
         
         # Conectar señales
         self.add_button.clicked.connect(self.add_task)
         self.edit_button.clicked.connect(self.edit_task)
         self.delete_button.clicked.connect(self.delete_task)
+        self.status_button.clicked.connect(self.change_tasks_status)
         self.export_button.clicked.connect(self.export_data)
         self.import_button.clicked.connect(self.import_data)
         self.template_button.clicked.connect(self.download_template)
@@ -348,80 +414,112 @@ class ReportView(QWidget):
         # Cargar técnicos
         self.load_technicians()
     
+    def setup_live_filters(self):
+        """
+        Filtrado en vivo: cada cambio de técnico, fechas o texto reinicia un
+        temporizador y el reporte se recarga recién cuando el usuario deja de
+        tocar los filtros. Un cambio nuevo descarta la recarga pendiente.
+        """
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(350)
+        self.filter_timer.timeout.connect(self.apply_live_filters)
+        self.last_filters = None
+        
+        self.technician_combo.currentIndexChanged.connect(self.schedule_filters)
+        self.start_date_edit.dateChanged.connect(self.schedule_filters)
+        self.end_date_edit.dateChanged.connect(self.schedule_filters)
+        self.search_input.textChanged.connect(self.schedule_filters)
+    
+    def current_filters(self):
+        """Devuelve los filtros actuales como una tupla comparable"""
+        return (
+            self.technician_combo.currentData(),
+            self.start_date_edit.date().toString("yyyy-MM-dd"),
+            self.end_date_edit.date().toString("yyyy-MM-dd"),
+            self.search_input.text().strip()
+        )
+    
+    def schedule_filters(self, *args):
+        """Reinicia el temporizador; solo se ejecuta la última consulta pedida"""
+        self.filter_timer.start()
+    
+    def apply_live_filters(self):
+        """Recarga el reporte si los filtros cambiaron desde la última carga"""
+        if self.current_filters() == self.last_filters:
+            return
+        self.load_report(quiet=True)
+    
     def load_technicians(self):
-        """Carga la lista de técnicos en el combo box"""
+        """
+        Carga la lista de técnicos en el combo box conservando la selección.
+        Incluye los dados de baja para poder consultar sus tareas.
+        """
+        selected_id = self.technician_combo.currentData()
+        self.technician_combo.blockSignals(True)
         self.technician_combo.clear()
         
         # Agregar la opción "Todos los técnicos" al inicio
         self.technician_combo.addItem("Todos los técnicos", None)
         
         # Cargar el resto de los técnicos
-        technicians = self.db.get_technicians()
+        technicians = self.db.get_technicians(include_inactive=True)
         for tech in technicians:
-            self.technician_combo.addItem(tech['name'], tech['id'])
+            name = tech['name'] if tech.get('active', 1) else f"{tech['name']} (inactivo)"
+            self.technician_combo.addItem(name, tech['id'])
+        
+        index = self.technician_combo.findData(selected_id)
+        self.technician_combo.setCurrentIndex(max(index, 0))
+        self.technician_combo.blockSignals(False)
+        
+        # Si el técnico elegido ya no existe, el filtro cambió
+        if hasattr(self, 'filter_timer') and self.technician_combo.currentData() != selected_id:
+            self.schedule_filters()
     
-    def load_report(self):
-        """Carga el reporte según los filtros seleccionados"""
+    def load_report(self, quiet=False):
+        """
+        Carga el reporte según los filtros seleccionados. Con quiet=True
+        (filtrado en vivo) no se muestran avisos cuando no hay datos.
+        """
         print("\n--- Cargando reporte ---")
+        # Una recarga explícita reemplaza a la pendiente del filtrado en vivo
+        self.filter_timer.stop()
+        self.last_filters = self.current_filters()
         technician_id = self.technician_combo.currentData()
         print(f"Técnico ID: {technician_id}")
         
         # Guardar el reporte actual para exportación
         self.current_report = None
         
+        search_text = self.search_input.text().strip()
+        if search_text:
+            self.search_tasks(search_text, technician_id, quiet)
+            return
+        
         start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
         end_date = self.end_date_edit.date().addDays(1).toString("yyyy-MM-dd")
         print(f"Rango de fechas: {start_date} - {end_date}")
         
         # Obtener datos del reporte
         if technician_id is None:  # Si se seleccionó 'Todos los técnicos'
-            # Obtener todos los técnicos
-            technicians = self.db.get_technicians()
-            all_tasks = []
-            summary = {
-                'total_tasks': 0,
-                'total_income': 0,
-                'total_profit': 0,
-                'total_insurance_payment': 0,
-                'total_cash_payment': 0,
-                'total_material_expense': 0,
-                'total_iva': 0,
-                'technician_share': 0,
-                'facu_share': 0
-            }
-            
-            # Obtener tareas para cada técnico
-            print(f"Buscando tareas para {len(technicians)} técnicos...")
-            for tech in technicians:
-                print(f"  - Buscando tareas para técnico {tech['id']}: {tech['name']}")
-                report = self.db.generate_report(tech['id'], start_date, end_date)
-                if report and 'tasks' in report and report['tasks']:
-                    print(f"    - Encontradas {len(report['tasks'])} tareas")
-                    all_tasks.extend(report['tasks'])
-                    # Sumar al resumen general
-                    if 'summary' in report:
-                        s = report['summary']
-                        for key in summary.keys():
-                            if key in s:
-                                summary[key] += s[key]
-                else:
-                    print(f"    - No se encontraron tareas para el técnico {tech['name']}")
-            
-            if not all_tasks:
-                QMessageBox.warning(self, "Advertencia", "No se encontraron datos para el rango seleccionado")
+            # Una consulta para las tareas de todos los técnicos (también los
+            # inactivos, que conservan sus tareas) y una suma agrupada
+            report = self.db.generate_report(None, start_date, end_date)
+            if not report or not report.get('tasks'):
+                self.show_no_results("No se encontraron datos para el rango seleccionado", quiet)
                 return
+            print(f"Encontradas {len(report['tasks'])} tareas de todos los técnicos")
                 
             # Actualizar métricas con el resumen consolidado
-            self.update_metrics(summary)
+            self.update_metrics(report['summary'])
             
             # Actualizar tabla de tareas
-            self.update_tasks_table(all_tasks)
+            self.update_tasks_table(report['tasks'])
             
             # Guardar el reporte actual para exportación
-            self.current_report = {
-                'tasks': all_tasks,
-                'summary': summary
-            }
+            self.current_report = report
+            
+            self.update_trends()
         else:  # Reporte para un técnico específico
             if not technician_id:
                 QMessageBox.warning(self, "Advertencia", "Por favor seleccione un técnico")
@@ -430,7 +528,7 @@ class ReportView(QWidget):
             report = self.db.generate_report(technician_id, start_date, end_date)
             
             if not report or 'tasks' not in report:
-                QMessageBox.warning(self, "Advertencia", "No se encontraron datos para el rango seleccionado")
+                self.show_no_results("No se encontraron datos para el rango seleccionado", quiet)
                 return
             
             # Obtener nombre del técnico para mostrarlo en el reporte
@@ -448,6 +546,8 @@ class ReportView(QWidget):
             
             # Guardar el reporte actual para exportación
             self.current_report = report
+            
+            self.update_trends()
     
     def update_metrics(self, summary):
         """Actualiza las métricas del reporte"""
@@ -485,6 +585,7 @@ class ReportView(QWidget):
                 print(f"  • Técnico (70%): ${week_data['technician_share']:,.2f}")
                 print(f"  • Facu (30%): ${week_data['facu_share']:,.2f}")
                 print(f"  • Gasto Material: ${week_data['material_expense']:,.2f}")
+                print(f"  • Promedio móvil (4 semanas): ${week_data['rolling_income']:,.2f}")
         
         # Mostrar resumen mensual si hay datos
         if 'monthly_totals' in summary and summary['monthly_totals']:
@@ -497,7 +598,73 @@ class ReportView(QWidget):
                 print(f"  • Técnico (70%): ${month_data['technician_share']:,.2f}")
                 print(f"  • Facu (30%): ${month_data['facu_share']:,.2f}")
                 print(f"  • Gasto Material: ${month_data['material_expense']:,.2f}")
+                print(f"  • Variación vs. mes anterior: ${month_data['income_delta']:,.2f}")
+        
+    def update_trends(self):
+        """Muestra la serie semanal, mensual o trimestral del técnico y rango seleccionados"""
+        period = self.trend_period_combo.currentData()
+        technician_id = self.technician_combo.currentData()
+        start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
+        end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
+        
+        series = self.db.get_period_series(period, technician_id, start_date, end_date)
+        
+        self.trends_table.setRowCount(len(series))
+        for row, item in enumerate(series):
+            change = item['income_change']
+            values = [
+                item['technician_name'],
+                item['period'],
+                item['period_start'].strftime('%d/%m/%Y'),
+                str(item['tasks']),
+                f"${item['income']:,.2f}",
+                f"${item['profit']:,.2f}",
+                f"${item['technician_share']:,.2f}",
+                f"${item['rolling_income']:,.2f}",
+                f"{change:+.1%}" if change is not None else "-"
+            ]
+            for col, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                if col >= 3:
+                    cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if col == 8 and change is not None:
+                    cell.setForeground(QColor('#006400') if change >= 0 else QColor('#8B0000'))
+                self.trends_table.setItem(row, col, cell)
+        
+        self.trends_table.resizeColumnsToContents()
+    
+    def show_no_results(self, message, quiet=False):
+        """
+        Avisa que no hay datos. En el filtrado en vivo no se abre un diálogo:
+        se vacía la tabla y el aviso va a la barra de estado.
+        """
+        if not quiet:
+            QMessageBox.warning(self, "Advertencia", message)
+            return
+        self.tasks_table.setRowCount(0)
+        self.update_metrics({'total_tasks': 0})
+        self.status_message.emit(message)
+    
+    def search_tasks(self, text, technician_id=None, quiet=False):
+        """
+        Muestra en la tabla las tareas que coinciden con el texto buscado,
+        ordenadas por relevancia. Busca en todas las fechas; respeta el
+        técnico seleccionado.
+        """
+        print(f"Búsqueda de texto: {text!r}")
+        tasks = self.db.search_tasks(text, technician_id)
+        
+        if not tasks:
+            if quiet:
+                self.show_no_results(f"No se encontraron tareas para \"{text}\"", quiet)
+            else:
+                QMessageBox.information(self, "Búsqueda", f"No se encontraron tareas para \"{text}\"")
+            return
         
+        self.content_tabs.setCurrentIndex(0)
+        self.update_tasks_table(tasks)
+        self.status_message.emit(f"{len(tasks)} tareas encontradas para \"{text}\"")
+    
     def update_tasks_table(self, tasks):
         """Actualiza la tabla de tareas con los datos proporcionados"""
         print(f"\n--- Actualizando tabla con {len(tasks)} tareas ---")
@@ -509,39 +676,19 @@ class ReportView(QWidget):
             if 'technician_name' in task:
                 technician_name = task['technician_name']
             
-            # Formatear fecha
-            task_date = task.get('task_date', '')
-            if task_date:
-                try:
-                    # Si es un string, intentar convertir al formato deseado
-                    if isinstance(task_date, str):
-                        # Si ya está en formato DD/MM/YYYY, dejarlo como está
-                        if re.match(r'\d{2}/\d{2}/\d{4}', task_date):
-                            pass
-                        # Si está en formato YYYY-MM-DD, convertir a DD/MM/YYYY
-                        elif re.match(r'\d{4}-\d{2}-\d{2}', task_date):
-                            task_date = datetime.strptime(task_date, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        # Si es otro formato, intentar parsear con dateutil
-                        else:
-                            from dateutil import parser
-                            task_date = parser.parse(str(task_date)).strftime('%d/%m/%Y')
-                    # Si es un objeto date o datetime, formatearlo
-                    elif hasattr(task_date, 'strftime'):
-                        task_date = task_date.strftime('%d/%m/%Y')
-                except Exception as e:
-                    print(f"Error al formatear fecha '{task_date}': {str(e)}")
-                    # Si hay un error, mostrar la fecha original como texto
-                    task_date = str(task_date)
+            # Formatear fecha (dd/mm/yyyy, memorizado por texto)
+            task_date = to_display(task.get('task_date'))
             
-            # Obtener valores numéricos para los cálculos
+            # Montos guardados (los derivados ya se calcularon con las reglas de
+            # tasas vigentes al guardar la tarea)
             profit = float(task.get('profit', 0) or 0)
             material_expense = float(task.get('material_expense', 0) or 0)
             insurance_payment = float(task.get('insurance_payment', 0) or 0)
+            pablo_share = float(task.get('pablo_share', 0) or 0)
             facu_share = float(task.get('facu_share', 0) or 0)
             iva = float(task.get('iva', 0) or 0)
             
-            # Calcular valores derivados
-            technician_share = (profit * 0.7) + material_expense
+            technician_share = pablo_share + material_expense
             seguro_tecnico = insurance_payment - facu_share - iva
             
             # Datos de la tarea - Ordenados según los encabezados de la tabla
@@ -558,7 +705,7 @@ class ReportView(QWidget):
                 str(task.get('order_number', '')),  # N° Pedido (como texto)
                 material_expense,  # Gasto Material
                 profit,  # Ganancia Total
-                technician_share,  # Técnico (70%) = (GananciaTotal * 0.7) + GastoMaterial
+                technician_share,  # Técnico = Parte del técnico + GastoMaterial
                 max(0, seguro_tecnico),  # Seguro Técnico = PagoSeguro - Socio (30%) - IVA (mínimo 0)
                 facu_share,  # Socio (30%)
                 iva,  # IVA
@@ -613,25 +760,40 @@ class ReportView(QWidget):
         if dialog.exec() == dialog.DialogCode.Accepted:
             task_data = dialog.get_task_data()
             
-            try:
-                task_id = self.db.add_task(task_data)
-                if task_id:
-                    QMessageBox.information(
-                        self, "Éxito", 
-                        f"Tarea agregada exitosamente con ID: {task_id}"
-                    )
-                    # Actualizar el reporte para el técnico seleccionado
-                    self.load_report()
-                else:
-                    QMessageBox.critical(
-                        self, "Error", 
-                        "No se pudo agregar la tarea. Intente nuevamente."
-                    )
-            except Exception as e:
+            self.status_message.emit("Guardando tarea...")
+            self.when_written(self.db.submit_write('add_task', task_data), self.on_task_added)
+    
+    def when_written(self, future, callback):
+        """
+        Llama a callback(future) en el hilo de la interfaz cuando el hilo
+        escritor confirma la escritura (o en el momento, si ya terminó).
+        """
+        future.add_done_callback(lambda done: self.write_finished.emit(callback, done))
+    
+    def on_write_finished(self, callback, future):
+        callback(future)
+    
+    def on_task_added(self, future):
+        """Resultado de add_task (ya confirmado en la base)"""
+        try:
+            task_id = future.result()
+            if task_id:
+                QMessageBox.information(
+                    self, "Éxito", 
+                    f"Tarea agregada exitosamente con ID: {task_id}"
+                )
+                # Actualizar el reporte para el técnico seleccionado
+                self.load_report()
+            else:
                 QMessageBox.critical(
                     self, "Error", 
-                    f"Error al agregar la tarea:\n{str(e)}"
+                    "No se pudo agregar la tarea. Intente nuevamente."
                 )
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Error", 
+                f"Error al agregar la tarea:\n{str(e)}"
+            )
     
     def edit_task(self):
         """Abre el diálogo para editar la tarea seleccionada"""
@@ -676,122 +838,184 @@ class ReportView(QWidget):
             updated_data = dialog.get_task_data()
             print("Datos actualizados del diálogo:", updated_data)
             
-            try:
-                if self.db.update_task(task_id, updated_data):
-                    QMessageBox.information(
-                        self, "Éxito", 
-                        "Tarea actualizada exitosamente"
-                    )
-                    self.load_report()  # Recargar la vista
-                else:
-                    QMessageBox.critical(
-                        self, "Error", 
-                        "No se pudo actualizar la tarea en la base de datos."
-                    )
-            except Exception as e:
-                error_msg = f"Error al actualizar la tarea:\n{str(e)}\n\n"
-                error_msg += f"Tipo de error: {type(e).__name__}"
-                print(error_msg)
+            self.status_message.emit("Guardando cambios...")
+            self.when_written(
+                self.db.submit_write('update_task', task_id, updated_data),
+                self.on_task_updated
+            )
+    
+    def on_task_updated(self, future):
+        """Resultado de update_task (ya confirmado en la base)"""
+        try:
+            if future.result():
+                QMessageBox.information(
+                    self, "Éxito", 
+                    "Tarea actualizada exitosamente"
+                )
+                self.load_report()  # Recargar la vista
+            else:
                 QMessageBox.critical(
                     self, "Error", 
-                    error_msg
+                    "No se pudo actualizar la tarea en la base de datos."
                 )
+        except Exception as e:
+            error_msg = f"Error al actualizar la tarea:\n{str(e)}\n\n"
+            error_msg += f"Tipo de error: {type(e).__name__}"
+            print(error_msg)
+            QMessageBox.critical(
+                self, "Error", 
+                error_msg
+            )
+    
+    def selected_task_ids(self):
+        """Devuelve los IDs de las filas seleccionadas en la tabla de tareas"""
+        task_ids = []
+        for index in self.tasks_table.selectionModel().selectedRows():
+            item = self.tasks_table.item(index.row(), 0)
+            task_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+            if task_id is not None:
+                task_ids.append(int(task_id))
+        return task_ids
+    
+    # Claves del resumen que se descuentan al eliminar tareas de la vista
+    SUMMARY_AMOUNTS = {
+        'total_income': 'budget_total',
+        'total_profit': 'profit',
+        'total_insurance_payment': 'insurance_payment',
+        'total_cash_payment': 'cash_payment',
+        'total_material_expense': 'material_expense',
+        'total_iva': 'iva',
+        'technician_share': 'pablo_share',
+        'facu_share': 'facu_share'
+    }
+    
+    def remove_tasks_from_view(self, task_ids):
+        """
+        Quita de la tabla y del reporte actual las tareas eliminadas y descuenta
+        sus montos de las métricas, sin volver a cargar el reporte completo.
+        """
+        task_ids = set(task_ids)
+        for row in range(self.tasks_table.rowCount() - 1, -1, -1):
+            item = self.tasks_table.item(row, 0)
+            if item and item.data(Qt.ItemDataRole.UserRole) in task_ids:
+                self.tasks_table.removeRow(row)
+        
+        if not self.current_report:
+            return
+        
+        removed = [task for task in self.current_report['tasks'] if task.get('id') in task_ids]
+        self.current_report['tasks'] = [
+            task for task in self.current_report['tasks'] if task.get('id') not in task_ids
+        ]
+        
+        summary = self.current_report.get('summary')
+        if summary:
+            summary['total_tasks'] = summary.get('total_tasks', 0) - len(removed)
+            for key, column in self.SUMMARY_AMOUNTS.items():
+                if key in summary:
+                    summary[key] = round(summary[key] - sum(float(task.get(column) or 0) for task in removed), 2)
+            self.update_metrics(summary)
+        
+        self.update_trends()
     
     def delete_task(self):
-        """Elimina la tarea seleccionada"""
+        """Elimina las tareas seleccionadas (una o varias) en una sola operación"""
         try:
-            selected_rows = self.tasks_table.selectionModel().selectedRows()
-            if not selected_rows:
-                QMessageBox.warning(self, "Error", "Debe seleccionar una tarea para eliminar")
+            task_ids = self.selected_task_ids()
+            if not task_ids:
+                QMessageBox.warning(self, "Error", "Debe seleccionar al menos una tarea para eliminar")
                 return
-                
-            row = selected_rows[0].row()
-            task_id_item = self.tasks_table.item(row, 0)  # Obtener el ítem de la primera columna (ID)
-            client_item = self.tasks_table.item(row, 2)  # Obtener el ítem de la columna de cliente
             
-            if not task_id_item or not client_item:
-                QMessageBox.critical(self, "Error", "No se pudo obtener la información de la tarea")
+            if len(task_ids) == 1:
+                row = self.tasks_table.selectionModel().selectedRows()[0].row()
+                client_item = self.tasks_table.item(row, 1)  # Columna de cliente
+                question = f"¿Está seguro que desea eliminar la tarea de {client_item.text() if client_item else ''}?"
+            else:
+                question = f"¿Está seguro que desea eliminar las {len(task_ids)} tareas seleccionadas?"
+            
+            reply = QMessageBox.question(
+                self, 'Confirmar eliminación',
+                f"{question}\n\nEsta acción no se puede deshacer.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
                 return
-                
-            try:
-                task_id = int(task_id_item.text())
-                client = client_item.text()
-                
-                reply = QMessageBox.question(
-                    self, 'Confirmar eliminación',
-                    f"¿Está seguro que desea eliminar la tarea de {client}?\n\n"
-                    "Esta acción no se puede deshacer.",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-                    QMessageBox.StandardButton.No
-                )
-                
-                if reply == QMessageBox.StandardButton.Yes:
-                    print(f"Intentando eliminar tarea ID: {task_id}")
-                    # Verificar si la tarea existe antes de intentar eliminarla
-                    existing_task = self.db.get_task(task_id)
-                    if not existing_task:
-                        QMessageBox.warning(
-                            self, "Advertencia",
-                            "La tarea seleccionada ya no existe en la base de datos."
-                        )
-                        self.load_report()  # Actualizar la vista
-                        return
-                        
-                    if self.db.delete_task(task_id):
-                        # Guardar el estado actual de los filtros
-                        current_tech_id = self.technician_combo.currentData()
-                        start_date = self.start_date_edit.date().toString('yyyy-MM-dd')
-                        end_date = self.end_date_edit.date().toString('yyyy-MM-dd')
-                        
-                        # Recargar la vista
-                        self.load_report()
-                        
-                        # Restaurar los filtros
-                        if current_tech_id:
-                            index = self.technician_combo.findData(current_tech_id)
-                            if index >= 0:
-                                self.technician_combo.setCurrentIndex(index)
-                        
-                        QMessageBox.information(
-                            self, "Éxito", 
-                            "Tarea eliminada exitosamente"
-                        )
-                    else:
-                        QMessageBox.critical(
-                            self, "Error", 
-                            "No se pudo eliminar la tarea en la base de datos. "
-                            "Verifique que la tarea aún exista y tenga los permisos necesarios."
-                        )
-                        
-            except ValueError as ve:
-                QMessageBox.critical(
-                    self, 
-                    "Error de formato", 
-                    f"El ID de la tarea no es válido: {ve}"
-                )
-            except Exception as e:
-                error_msg = "Ocurrió un error inesperado al intentar eliminar la tarea.\n\n"
-                error_msg += f"Error: {str(e)}\n"
-                error_msg += f"Tipo: {type(e).__name__}"
-                print(error_msg)  # Para depuración
-                
-                QMessageBox.critical(
-                    self, 
-                    "Error al eliminar", 
-                    error_msg
-                )
-        except Exception as outer_e:
-            # Capturar cualquier otro error inesperado
-            error_msg = "Error inesperado al procesar la eliminación.\n"
-            error_msg += f"Detalles: {str(outer_e)}"
+            
+            print(f"Eliminando {len(task_ids)} tareas: {task_ids[:20]}")
+            self.when_written(
+                self.db.submit_write('delete_tasks', task_ids),
+                lambda future: self.on_tasks_deleted(task_ids, future)
+            )
+        except Exception as e:
+            error_msg = "Ocurrió un error inesperado al intentar eliminar las tareas.\n\n"
+            error_msg += f"Error: {str(e)}\n"
+            error_msg += f"Tipo: {type(e).__name__}"
             print(error_msg)  # Para depuración
             
-            QMessageBox.critical(
-                self,
-                "Error del sistema",
-                error_msg
+            QMessageBox.critical(self, "Error al eliminar", error_msg)
+    
+    def on_tasks_deleted(self, task_ids, future):
+        """Resultado de delete_tasks: quita las filas sin recargar el reporte"""
+        deleted = future.result()
+        if not deleted:
+            QMessageBox.warning(
+                self, "Advertencia",
+                "No se eliminó ninguna tarea. Es posible que ya no existan en la base de datos."
+            )
+            self.load_report()
+            return
+        
+        self.remove_tasks_from_view(task_ids)
+        self.status_message.emit(f"{deleted} tareas eliminadas")
+        
+        if deleted < len(task_ids):
+            QMessageBox.information(
+                self, "Éxito",
+                f"Se eliminaron {deleted} de {len(task_ids)} tareas; el resto ya no existía."
             )
     
+    def change_tasks_status(self):
+        """Cambia el estado de todas las tareas seleccionadas en una sola operación"""
+        task_ids = self.selected_task_ids()
+        if not task_ids:
+            QMessageBox.warning(self, "Error", "Debe seleccionar al menos una tarea")
+            return
+        
+        status, ok = QInputDialog.getItem(
+            self, "Cambiar estado",
+            f"Nuevo estado para {len(task_ids)} tareas:",
+            TASK_STATUSES, 0, False
+        )
+        if not ok:
+            return
+        
+        self.when_written(
+            self.db.submit_write('update_tasks_status', task_ids, status),
+            lambda future: self.on_tasks_status_changed(task_ids, status, future)
+        )
+    
+    def on_tasks_status_changed(self, task_ids, status, future):
+        """
+        Resultado de update_tasks_status: vuelve a leer de la base el estado
+        de las tareas seleccionadas y actualiza solo la columna Estado
+        """
+        updated = future.result()
+        
+        # Se muestra lo que quedó guardado, no el estado pedido
+        statuses = self.db.get_task_statuses(task_ids)
+        for row in range(self.tasks_table.rowCount()):
+            item = self.tasks_table.item(row, 0)
+            task_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+            if task_id in statuses:
+                self.tasks_table.setItem(row, 16, QTableWidgetItem(statuses[task_id]))
+        if self.current_report:
+            for task in self.current_report['tasks']:
+                if task.get('id') in statuses:
+                    task['status'] = statuses[task['id']]
+        
+        self.status_message.emit(f"{updated} tareas pasaron a {status}")
+    
     def generate_general_report(self):
         """Genera un reporte general con las ganancias por técnico y el total de Facu"""
         try:
@@ -799,56 +1023,14 @@ class ReportView(QWidget):
             start_date = self.start_date_edit.date().toString('yyyy-MM-dd')
             end_date = self.end_date_edit.date().toString('yyyy-MM-dd')
             
-            # Consulta para obtener las ganancias por técnico
-            query = """
-                SELECT 
-                    t.name as technician_name,
-                    SUM(tr.technician_share) as total_technician,
-                    SUM(tr.facu_share) as total_facu_share
-                FROM tasks tr
-                LEFT JOIN technicians t ON tr.technician_id = t.id
-                WHERE date(tr.task_date) BETWEEN ? AND ?
-                GROUP BY t.name
-                ORDER BY total_technician DESC
-            """
+            # Totales por técnico calculados en la base de datos
+            report = self.db.get_general_report(start_date, end_date)
             
-            self.db.cursor.execute(query, (start_date, end_date))
-            results = self.db.cursor.fetchall()
-            
-            if not results:
+            if not report['rows']:
                 QMessageBox.information(self, "Sin datos", "No hay registros en el período seleccionado.")
                 return
             
-            # Calcular totales
-            total_technician = sum(row[1] for row in results)
-            total_facu = sum(row[2] for row in results)
-            
-            # Crear mensaje con los resultados
-            report_lines = [
-                f"Reporte General del {start_date} al {end_date}\n",
-                "=" * 50,
-                "{:<20} {:<20} {:<20}".format("TÉCNICO", "GANANCIA TÉCNICO", "GANANCIA FACU"),
-                "-" * 60
-            ]
-            
-            for row in results:
-                technician, tech_earning, facu_earning = row
-                report_lines.append(
-                    "{:<20} ${:<19.2f} ${:<19.2f}".format(
-                        technician or 'Sin técnico',
-                        float(tech_earning or 0),
-                        float(facu_earning or 0)
-                    )
-                )
-            
-            report_lines.extend([
-                "-" * 60,
-                "{:<20} ${:<19.2f} ${:<19.2f}".format(
-                    "TOTALES:",
-                    total_technician,
-                    total_facu
-                )
-            ])
+            report_text = format_general_report(report)
             
             # Mostrar reporte en un diálogo
             from PySide6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QDialogButtonBox
@@ -862,7 +1044,7 @@ class ReportView(QWidget):
             text_edit = QTextEdit()
             text_edit.setReadOnly(True)
             text_edit.setFontFamily("Courier New")
-            text_edit.setPlainText("\n".join(report_lines))
+            text_edit.setPlainText(report_text)
             
             buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok)
             buttons.accepted.connect(dialog.accept)
@@ -872,7 +1054,7 @@ class ReportView(QWidget):
             
             # Opción para exportar a archivo de texto
             export_btn = QPushButton("Exportar a TXT")
-            export_btn.clicked.connect(lambda: self.export_report_to_txt("\n".join(report_lines)))
+            export_btn.clicked.connect(lambda: self.export_report_to_txt(report_text))
             layout.addWidget(export_btn)
             
             dialog.exec()
@@ -911,7 +1093,7 @@ class ReportView(QWidget):
     
     def import_excel(self):
         """Importa datos desde un archivo Excel"""
-        from ...excel_importer import import_excel_file
+        from excel_importer import import_excel_file
         if import_excel_file():
             self.load_report()  # Recargar datos después de importar
     
@@ -983,8 +1165,33 @@ class ReportView(QWidget):
         btn_facu_report.setStyleSheet(button_style)
         btn_facu_report.clicked.connect(lambda: [dialog.accept(), self.export_facu_report()])
         
+        # Opción 5: Reporte general (ganancias del técnico y de Facu)
+        btn_general_report = QPushButton("5. Reporte general de ganancias (TXT)")
+        btn_general_report.setToolTip("Muestra las ganancias de cada técnico y de Facu en el período seleccionado")
+        btn_general_report.setStyleSheet(button_style)
+        btn_general_report.clicked.connect(lambda: [dialog.accept(), self.generate_general_report()])
+        
+        # Opción 6: Snapshot columnar para análisis (Parquet)
+        btn_snapshot = QPushButton("6. Snapshot para análisis (Parquet, actualizable)")
+        btn_snapshot.setToolTip("Exporta todas las tareas en formato Parquet; se carga en pandas en milisegundos")
+        btn_snapshot.setStyleSheet(button_style)
+        btn_snapshot.clicked.connect(lambda: [dialog.accept(), self.export_snapshot()])
+        
+        # Opción 7: Plantilla en CSV comprimido (transferencias entre sistemas)
+        btn_csv = QPushButton("7. Plantilla con datos en CSV comprimido (rápido)")
+        btn_csv.setToolTip("Exporta las tareas filtradas con las columnas de la plantilla en un .csv.gz")
+        btn_csv.setStyleSheet(button_style)
+        btn_csv.clicked.connect(lambda: [dialog.accept(), self.export_template_csv()])
+        
+        # Opción 8: Estados de cuenta de todos los técnicos (cierre de mes)
+        btn_statements = QPushButton("8. Estados de cuenta de todos los técnicos (lote)")
+        btn_statements.setToolTip("Genera un Excel por técnico para el período seleccionado, más un índice")
+        btn_statements.setStyleSheet(button_style)
+        btn_statements.clicked.connect(lambda: [dialog.accept(), self.export_technician_statements()])
+        
         # Agregar botones al layout
-        for btn in [btn_template, btn_full_data, btn_tech_report, btn_facu_report]:
+        for btn in [btn_template, btn_full_data, btn_tech_report, btn_facu_report, btn_general_report,
+                    btn_snapshot, btn_csv, btn_statements]:
             btn.setMinimumHeight(50)
             layout.addWidget(btn)
         
@@ -1015,201 +1222,76 @@ class ReportView(QWidget):
         dialog.exec()
     
     def import_data(self):
-        """Importa tareas desde un archivo Excel"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        """Importa tareas desde uno o varios archivos Excel o CSV"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
             "Importar Tareas",
             "",
-            "Archivos Excel (*.xlsx);;Todos los archivos (*)"
+            "Archivos de tareas (*.xlsx *.csv *.csv.gz);;Archivos Excel (*.xlsx);;"
+            "Archivos CSV (*.csv *.csv.gz);;Todos los archivos (*)"
         )
         
-        if not file_path:
+        if not file_paths:
             return
-            
+        
+        if len(file_paths) > 1:
+            self.import_batch(file_paths)
+            return
+        
+        file_path = file_paths[0]
+        if is_csv_file(file_path):
+            self.import_csv(file_path)
+            return
+        
         try:
-            # Leer el archivo Excel ignorando validaciones
-            xls = pd.ExcelFile(file_path, engine='openpyxl')
-            
-            # Verificar que exista la hoja de Tareas
-            if 'Tareas' not in xls.sheet_names:
-                QMessageBox.critical(
-                    self,
-                    "Error",
-                    "El archivo no contiene una hoja llamada 'Tareas'"
-                )
-                return
-                
-            # Leer la hoja de Tareas, convirtiendo todo a string para evitar problemas de validación
-            df = pd.read_excel(xls, sheet_name='Tareas', dtype=str)
-            
-            # Reemplazar valores NaN con cadenas vacías
-            df = df.fillna('')
-            
-            # Verificar columnas requeridas
-            required_columns = [
-                'Técnico', 'Cliente', 'Tarea',
-                'Presupuesto Total', 'Efectivo', 'Pago Seguro'
-            ]
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                QMessageBox.critical(
+            # Un archivo sin cambios desde la última importación no se vuelve a leer
+            file_hash = file_fingerprint(file_path)
+            if self.db.is_file_imported(file_hash):
+                QMessageBox.information(
                     self,
-                    "Error",
-                    f"Faltan columnas requeridas en el archivo: {', '.join(missing_columns)}"
+                    "Importación",
+                    "Este archivo ya fue importado y no tiene cambios."
                 )
                 return
             
-            # Mostrar resumen de importación
-            total_tasks = len(df)
-            reply = QMessageBox.question(
+            # Leer y normalizar la hoja de Tareas (fechas, montos y técnicos por columna)
+            parsed = parse_task_workbook(file_path, import_technicians(self.db))
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(
                 self,
-                "Confirmar Importación",
-                f"Se van a importar {total_tasks} tareas.\n"
-                "¿Desea continuar?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                "Error",
+                f"Error al importar el archivo: {str(e)}"
             )
-            
-            if reply != QMessageBox.StandardButton.Yes:
-                return
-            
-            # Obtener lista de técnicos para validación (usando nombres en minúsculas para comparación insensible a mayúsculas)
-            technicians = self.db.get_technicians()
-            tech_name_to_id = {tech['name'].lower().strip(): tech['id'] for tech in technicians}
-            
-            # Procesar cada tarea
-            success_count = 0
-            errors = []
-            
-            for idx, row in df.iterrows():
-                try:
-                    # Obtener el nombre del técnico
-                    tech_name = str(row['Técnico']).strip() if pd.notna(row['Técnico']) else ''
-                    
-                    if not tech_name:
-                        errors.append(f"Fila {idx+2}: El campo 'Técnico' está vacío")
-                        continue
-                    
-                    # Limpiar el nombre (eliminar cualquier texto entre paréntesis como IDs)
-                    tech_name_clean = re.sub(r'\s*\(.*?\)', '', tech_name).strip()
-                    tech_name_lower = tech_name_clean.lower()
-                    
-                    # Buscar el técnico por nombre (insensible a mayúsculas)
-                    if tech_name_lower in tech_name_to_id:
-                        technician_id = tech_name_to_id[tech_name_lower]
-                    else:
-                        # Si no se encuentra, intentar buscar coincidencias parciales
-                        matching_techs = [tech for tech in technicians if tech_name_lower in tech['name'].lower()]
-                        
-                        if len(matching_techs) == 1:
-                            # Si hay exactamente una coincidencia, usarla
-                            technician_id = matching_techs[0]['id']
-                        elif len(matching_techs) > 1:
-                            # Si hay múltiples coincidencias, mostrar un error
-                            error_msg = f"Fila {idx+2}: Múltiples técnicos coinciden con '{tech_name_clean}'. Por favor, sea más específico."
-                            errors.append(error_msg)
-                            continue
-                        else:
-                            # Si no hay coincidencias, mostrar un error
-                            errors.append(f"Fila {idx+2}: Técnico no encontrado: '{tech_name_clean}'. Técnicos disponibles: {', '.join(tech_name_to_id.keys())}")
-                            continue
-                    
-                    # Crear diccionario con los datos de la tarea
-                    task_data = {
-                        'technician_id': technician_id,
-                        'client_name': str(row['Cliente']).strip(),
-                        'task_description': str(row.get('Tarea', '')).strip(),
-                        'task_date': row.get('Fecha (AAAA-MM-DD)', datetime.now().strftime('%Y-%m-%d')),
-                        'budget_total': float(row.get('Presupuesto Total', 0)),
-                        'labor_cost': float(row.get('Mano de Obra', 0)),
-                        'material_cost': float(row.get('Presupuesto Materiales', 0)),
-                        'insurance_payment': float(row.get('Pago Seguro', 0)),
-                        'cash_payment': float(row.get('Efectivo', 0)),
-                        'material_expense': float(row.get('Gasto Material', 0)),
-                        'payment_type': str(row.get('Tipo de Pago', 'EFECTIVO')).strip().upper(),
-                        'order_number': str(row.get('Número Pedido', '')).strip(),
-                        'status': str(row.get('Estado', 'PENDIENTE')).strip().upper()
-                    }
-                    
-                    # Validar fechas
-                    try:
-                        date_str = str(task_data['task_date']).strip()
-                        
-                        if not date_str or date_str.lower() in ['nan', 'nat', 'none', '']:
-                            # Si la fecha está vacía, usar la fecha actual
-                            task_data['task_date'] = datetime.now().strftime('%Y-%m-%d')
-                            continue
-                            
-                        # Primero intentar con el formato de Excel (mm/dd/yyyy)
-                        try:
-                            # Intentar parsear como fecha de Excel (mm/dd/yyyy)
-                            date_parsed = datetime.strptime(date_str, '%m/%d/%Y')
-                            # Convertir al formato deseado (yyyy-mm-dd para la base de datos)
-                            task_data['task_date'] = date_parsed.strftime('%Y-%m-%d')
-                            continue  # Si tuvo éxito, pasar a la siguiente tarea
-                        except (ValueError, TypeError):
-                            # Si falla, continuar con otros formatos
-                            pass
-                        
-                        # Si no es formato de Excel, intentar otros formatos comunes
-                        date_formats = [
-                            '%d/%m/%Y',  # Formato dd/mm/yyyy
-                            '%d-%m-%Y',  # Formato dd-mm-yyyy
-                            '%Y-%m-%d',  # Formato ISO yyyy-mm-dd
-                            '%d.%m.%Y',  # Formato dd.mm.yyyy
-                            '%d/%m/%y',  # Formato dd/mm/yy (año de 2 dígitos)
-                            '%d-%m-%y'   # Formato dd-mm-yy (año de 2 dígitos)
-                        ]
-                        
-                        date_parsed = None
-                        
-                        # Intentar con los demás formatos
-                        for date_format in date_formats:
-                            try:
-                                date_parsed = datetime.strptime(date_str, date_format)
-                                # Si llegamos aquí, el formato es correcto
-                                break
-                            except (ValueError, TypeError):
-                                continue
-                        
-                        # Si no se pudo parsear, intentar con pandas
-                        if date_parsed is None:
-                            try:
-                                date_parsed = pd.to_datetime(date_str, dayfirst=True)
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Si aún no se pudo parsear, usar la fecha actual
-                        if date_parsed is None:
-                            errors.append(f"Fila {idx+2}: Formato de fecha no reconocido: '{date_str}'. Se usará la fecha actual.")
-                            date_parsed = datetime.now()
-                        
-                        # Convertir al formato estándar de la aplicación (yyyy-mm-dd)
-                        task_data['task_date'] = date_parsed.strftime('%Y-%m-%d')
-                        
-                    except Exception as e:
-                        errors.append(f"Fila {idx+2}: Error al procesar la fecha '{task_data['task_date']}': {str(e)}. Se usará la fecha actual.")
-                        task_data['task_date'] = datetime.now().strftime('%Y-%m-%d')
-                    
-                    # Validar estado
-                    if task_data['status'] not in ['PENDIENTE', 'COMPLETADA']:
-                        task_data['status'] = 'PENDIENTE'
-                    
-                    # Validar tipo de pago
-                    if task_data['payment_type'] not in ['EFECTIVO', 'TRANSFERENCIA']:
-                        task_data['payment_type'] = 'EFECTIVO'
-                    
-                    # Insertar la tarea
-                    if self.db.add_task(task_data):
-                        success_count += 1
-                    else:
-                        errors.append(f"Fila {idx+2}: Error al guardar la tarea")
-                        
-                except Exception as e:
-                    errors.append(f"Fila {idx+2}: Error - {str(e)}")
+            return
+        
+        # Mostrar resumen de importación
+        total_tasks = parsed['total']
+        reply = QMessageBox.question(
+            self,
+            "Confirmar Importación",
+            f"Se van a importar {total_tasks} tareas.\n"
+            "¿Desea continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        try:
+            # Insertar las tareas válidas nuevas en una sola transacción
+            with self.db.transaction(label='import_data'):
+                success_count, skipped_count = self.db.import_tasks(parsed['tasks'], file_hash)
+                self.db.record_imported_file(file_hash, os.path.basename(file_path), total_tasks,
+                                             success_count, skipped_count)
+            errors = parsed['errors']
             
             # Mostrar resumen
             msg = f"Se importaron {success_count} de {total_tasks} tareas correctamente."
+            if skipped_count:
+                msg += f"\n{skipped_count} tareas ya estaban importadas y se omitieron."
             
             if errors:
                 msg += "\n\nErrores:\n" + "\n".join(errors[:10])  # Mostrar solo los primeros 10 errores
@@ -1232,6 +1314,132 @@ class ReportView(QWidget):
                 f"Error al importar el archivo: {str(e)}"
             )
     
+    def import_csv(self, file_path):
+        """
+        Importa un CSV (o .csv.gz) con las columnas de la plantilla. El
+        archivo se lee por bloques y se inserta a medida que se lee, sin
+        pasar por openpyxl (pensado para archivos grandes entre sistemas).
+        """
+        reply = QMessageBox.question(
+            self,
+            "Confirmar Importación",
+            f"Se van a importar las tareas de {os.path.basename(file_path)}.\n"
+            "¿Desea continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        def on_progress(rows):
+            self.status_message.emit(f"Importando CSV: {rows} filas leídas...")
+            QApplication.processEvents()
+        
+        try:
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                result = import_task_csv(self.db, file_path, progress_callback=on_progress)
+            finally:
+                QApplication.restoreOverrideCursor()
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(
+                self,
+                "Error",
+                f"Error al importar el archivo: {str(e)}"
+            )
+            return
+        
+        if result['already_imported']:
+            QMessageBox.information(
+                self,
+                "Importación",
+                "Este archivo ya fue importado y no tiene cambios."
+            )
+            return
+        
+        # Mostrar resumen
+        msg = (f"Se importaron {result['imported']} de {result['total']} tareas correctamente "
+               f"en {result['elapsed']:.2f} s.")
+        if result['skipped']:
+            msg += f"\n{result['skipped']} tareas ya estaban importadas y se omitieron."
+        
+        errors = result['errors']
+        if errors:
+            msg += "\n\nErrores:\n" + "\n".join(errors[:10])  # Mostrar solo los primeros 10 errores
+            if len(errors) > 10:
+                msg += f"\n... y {len(errors) - 10} errores más."
+        
+        QMessageBox.information(self, "Importación completada", msg)
+        self.load_report()
+    
+    def import_batch(self, file_paths):
+        """
+        Importa varios archivos a la vez: se leen en paralelo en un pool de
+        procesos y se escriben de a uno, con una transacción por archivo.
+        """
+        reply = QMessageBox.question(
+            self,
+            "Confirmar Importación",
+            f"Se van a importar {len(file_paths)} archivos.\n"
+            "¿Desea continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        progress = QProgressDialog("Importando archivos...", None, 0, len(file_paths), self)
+        progress.setWindowTitle("Importación por lotes")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        
+        def on_progress(done, total, result):
+            progress.setValue(done)
+            progress.setLabelText(f"Importado: {os.path.basename(result['file'])} ({done} de {total})")
+            QApplication.processEvents()
+        
+        try:
+            results = import_task_workbooks(self.db, file_paths, progress_callback=on_progress)
+        except Exception as e:
+            QMessageBox.critical(
+                self,
+                "Error",
+                f"Error al importar los archivos: {str(e)}"
+            )
+            return
+        finally:
+            progress.close()
+        
+        # Mostrar resumen por archivo
+        imported = sum(result['imported'] for result in results)
+        total = sum(result['total'] for result in results)
+        lines = [f"Se importaron {imported} de {total} tareas en {len(results)} archivos.", ""]
+        for result in sorted(results, key=lambda r: r['file']):
+            if result['already_imported']:
+                lines.append(f"{os.path.basename(result['file'])}: ya importado, sin cambios")
+                continue
+            lines.append(
+                f"{os.path.basename(result['file'])}: {result['imported']} de {result['total']} tareas"
+                + (f", {result['skipped']} ya importadas" if result['skipped'] else "")
+                + (f", {len(result['errors'])} errores" if result['errors'] else "")
+            )
+        
+        errors = [
+            f"{os.path.basename(result['file'])} - {error}"
+            for result in results for error in result['errors']
+        ]
+        if errors:
+            lines += ["", "Errores:"] + errors[:10]
+            if len(errors) > 10:
+                lines.append(f"... y {len(errors) - 10} errores más.")
+        
+        QMessageBox.information(self, "Importación completada", "\n".join(lines))
+        self.load_report()
+    
     def download_template(self):
         """Versión simplificada de la función de descarga de plantilla"""
         try:
@@ -1313,382 +1521,180 @@ class ReportView(QWidget):
                 f"Error al crear la plantilla: {str(e)}"
             )
     
+    def technician_names(self):
+        """Nombres de los técnicos tal como aparecen en el combo, por id"""
+        return {
+            self.technician_combo.itemData(i): self.technician_combo.itemText(i)
+            for i in range(self.technician_combo.count())
+            if self.technician_combo.itemData(i) is not None
+        }
+    
+    def report_tasks(self):
+        """
+        Copia de las tareas del reporte actual para una exportación en segundo
+        plano (o None, con aviso, si no hay datos).
+        """
+        report = getattr(self, 'current_report', None)
+        if not report or not report.get('tasks'):
+            QMessageBox.warning(self, "Error", "No hay datos para exportar")
+            return None
+        return [dict(task) for task in report['tasks']]
+    
+    def start_export(self, title, file_path, run, atomic=True):
+        """
+        Encola una exportación en segundo plano (ver export_jobs.py): el
+        avance se ve en el panel de exportaciones y el usuario puede seguir
+        trabajando mientras tanto.
+        """
+        self.export_jobs.submit(title, file_path, run, atomic)
+        self.status_message.emit(f"Exportación en curso: {title}")
+    
+    def on_export_finished(self, job, message):
+        self.status_message.emit(f"{job.title} exportado: {message}")
+    
+    def on_export_failed(self, job, message):
+        self.status_message.emit(f"Error al exportar {job.title}: {message}")
+    
+    def ask_xlsx_path(self, title, default_name):
+        """Diálogo para guardar un .xlsx; devuelve la ruta (con extensión) o None"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            title,
+            f"{default_name}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            "Archivos Excel (*.xlsx)"
+        )
+        if not file_path:
+            return None
+        if not file_path.endswith('.xlsx'):
+            file_path += '.xlsx'
+        return file_path
+    
     def export_template_with_data(self):
         """Exporta los datos en formato de plantilla para importar en otro sistema"""
-        try:
-            if not hasattr(self, 'current_report') or not self.current_report.get('tasks'):
-                QMessageBox.warning(self, "Error", "No hay datos para exportar")
-                return
-                
-            # Obtener los datos actuales
-            tasks = self.current_report['tasks']
-            
-            # Crear el DataFrame con las columnas de la plantilla
-            data = []
-            for task in tasks:
-                # Obtener el nombre del técnico
-                tech_name = ""
-                for i in range(self.technician_combo.count()):
-                    if self.technician_combo.itemData(i) == task['technician_id']:
-                        tech_name = self.technician_combo.itemText(i)
-                        break
-                
-                data.append({
-                    'Técnico': tech_name,
-                    'Cliente': task['client_name'],
-                    'Tarea': task['task_description'],
-                    'Presupuesto Total': task['budget_total'],
-                    'Mano de Obra': task['labor_cost'],
-                    'Presupuesto Materiales': task['material_cost'],
-                    'Pago Seguro': task['insurance_payment'],
-                    'Efectivo': task['cash_payment'],
-                    'Número Pedido': task.get('order_number', ''),
-                    'Gasto Material': task.get('material_expense', 0),
-                    'Tipo de Pago': task.get('payment_type', 'EFECTIVO'),
-                    'Estado': task.get('status', 'PENDIENTE'),
-                    'Fecha (AAAA-MM-DD)': task['task_date']
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Pedir ubicación para guardar
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Guardar Plantilla con Datos",
-                f"tareas_exportadas_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                "Archivos Excel (*.xlsx)"
-            )
-            
-            if file_path:
-                if not file_path.endswith('.xlsx'):
-                    file_path += '.xlsx'
-                
-                # Guardar en Excel
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, sheet_name='Tareas', index=False)
-                    
-                    # Agregar hoja de técnicos para validación
-                    technicians = self.db.get_technicians()
-                    if technicians:
-                        tech_data = [{'Técnico': f"{t['name']} (ID: {t['id']})"} for t in technicians]
-                        pd.DataFrame(tech_data).to_excel(writer, sheet_name='Tecnicos', index=False)
-                
-                QMessageBox.information(
-                    self, "Éxito", 
-                    f"Datos exportados en formato de plantilla:\n{file_path}"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error al exportar", 
-                f"Ocurrió un error al exportar los datos:\n{str(e)}"
-            )
+        tasks = self.report_tasks()
+        if tasks is None:
+            return
+        file_path = self.ask_xlsx_path("Guardar Plantilla con Datos", "tareas_exportadas")
+        if not file_path:
+            return
+        
+        names = self.technician_names()
+        technicians = self.db.get_technicians()
+        self.start_export(
+            "Plantilla con datos", file_path,
+            lambda job, path: write_workbook(path, template_sheets(tasks, names, technicians), job)
+        )
+    
+    def export_template_csv(self):
+        """
+        Exporta las tareas del técnico y el rango de fechas seleccionados con
+        las columnas de la plantilla en CSV (comprimido con gzip si el nombre
+        termina en .gz). Se escribe directo desde la base, por bloques; el
+        archivo se puede volver a importar con "Importar".
+        """
+        technician_id, start_date, end_date, _ = self.current_filters()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Guardar Plantilla con Datos (CSV)",
+            f"tareas_exportadas_{datetime.now().strftime('%Y%m%d')}.csv.gz",
+            "CSV comprimido (*.csv.gz);;CSV (*.csv)"
+        )
+        
+        if not file_path:
+            return
+        if not is_csv_file(file_path):
+            file_path += '.csv.gz'
+        
+        db_name = self.db.db_name
+    
+        def run(job, path):
+            with worker_connection(db_name) as db:
+                exported = export_task_csv(db, path, technician_id, start_date, end_date,
+                                           progress_callback=job.progress)
+            return f"{exported} tareas en {file_path}"
+        
+        self.start_export("Plantilla CSV", file_path, run)
+    
+    def export_snapshot(self):
+        """
+        Exporta (o actualiza) el snapshot Parquet de todas las tareas en una
+        carpeta. Si la carpeta ya tiene un snapshot solo se agregan las tareas
+        nuevas (por eso se escribe en la carpeta y no en un temporal).
+        """
+        folder = QFileDialog.getExistingDirectory(self, "Carpeta del snapshot para análisis")
+        if not folder:
+            return
+        
+        db_name = self.db.db_name
+    
+        def run(job, path):
+            with worker_connection(db_name) as db:
+                result = db.export_snapshot(path, progress_callback=job.progress)
+            mode = "completo" if result['full'] else "incremental"
+            return f"snapshot {mode}, {result['added']} tareas agregadas, {result['rows']} en total"
+        
+        self.start_export("Snapshot para análisis", folder, run, atomic=False)
     
     def export_complete_data(self):
         """Exporta todos los datos de las tareas para análisis"""
-        try:
-            if not hasattr(self, 'current_report') or not self.current_report.get('tasks'):
-                QMessageBox.warning(self, "Error", "No hay datos para exportar")
-                return
-                
-            # Obtener los datos actuales
-            tasks = self.current_report['tasks']
-            df = pd.DataFrame(tasks)
-            
-            # Mapeo de nombres de columnas a español
-            columnas_espanol = {
-                'id': 'ID',
-                'technician_id': 'ID Técnico',
-                'client_name': 'Cliente',
-                'task_description': 'Descripción',
-                'task_date': 'Fecha',
-                'budget_total': 'Presupuesto Total',
-                'labor_cost': 'Costo Mano de Obra',
-                'material_cost': 'Costo Materiales',
-                'insurance_payment': 'Pago Seguro',
-                'cash_payment': 'Pago Efectivo',
-                'material_expense': 'Gasto Material',
-                'profit': 'Ganancia',
-                'pablo_share': 'Participación Técnico',
-                'facu_share': 'Participación Socio',
-                'iva': 'IVA',
-                'payment_type': 'Tipo de Pago',
-                'order_number': 'Número de Pedido',
-                'status': 'Estado',
-                'created_at': 'Fecha de Creación'
-            }
-            
-            # Renombrar columnas
-            df = df.rename(columns=columnas_espanol)
-            
-            # Formatear fechas
-            if 'Fecha' in df.columns:
-                df['Fecha'] = pd.to_datetime(df['Fecha']).dt.strftime('%Y-%m-%d')
-            if 'Fecha de Creación' in df.columns:
-                df['Fecha de Creación'] = pd.to_datetime(df['Fecha de Creación']).dt.strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Formatear montos monetarios
-            for col in ['Presupuesto Total', 'Costo Mano de Obra', 'Costo Materiales', 
-                       'Pago Seguro', 'Pago Efectivo', 'Gasto Material', 
-                       'Ganancia', 'Participación Técnico', 'Participación Socio', 'IVA']:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: f"${x:,.2f}" if pd.notnull(x) else "")
-            
-            # Pedir ubicación para guardar
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Guardar Datos Completos",
-                f"datos_completos_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                "Archivos Excel (*.xlsx)"
-            )
-            
-            if file_path:
-                if not file_path.endswith('.xlsx'):
-                    file_path += '.xlsx'
-                
-                # Guardar en Excel con formato
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Datos Completos')
-                    
-                    # Ajustar ancho de columnas
-                    worksheet = writer.sheets['Datos Completos']
-                    for idx, col in enumerate(df.columns, 1):
-                        max_length = max(df[col].astype(str).apply(len).max(), len(col)) + 2
-                        worksheet.column_dimensions[get_column_letter(idx)].width = min(max_length, 30)
-                
-                QMessageBox.information(
-                    self, "Éxito", 
-                    f"Datos completos exportados:\n{file_path}"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error al exportar", 
-                f"Ocurrió un error al exportar los datos completos:\n{str(e)}"
-            )
+        tasks = self.report_tasks()
+        if tasks is None:
+            return
+        file_path = self.ask_xlsx_path("Guardar Datos Completos", "datos_completos")
+        if not file_path:
+            return
+        
+        self.start_export(
+            "Datos completos", file_path,
+            lambda job, path: write_workbook(path, complete_data_sheets(tasks), job)
+        )
     
     def export_technician_report(self):
         """Exporta un reporte de ganancias por técnico"""
-        try:
-            if not hasattr(self, 'current_report') or not self.current_report.get('tasks'):
-                QMessageBox.warning(self, "Error", "No hay datos para generar el reporte")
-                return
-                
-            # Obtener los datos actuales
-            tasks = self.current_report['tasks']
-            
-            # Crear un diccionario para agrupar por técnico
-            tech_data = {}
-            
-            for task in tasks:
-                tech_id = task['technician_id']
-                tech_name = ""
-                
-                # Buscar el nombre del técnico
-                for i in range(self.technician_combo.count()):
-                    if self.technician_combo.itemData(i) == tech_id:
-                        tech_name = self.technician_combo.itemText(i)
-                        break
-                
-                if tech_id not in tech_data:
-                    tech_data[tech_id] = {
-                        'Técnico': tech_name,
-                        'Total Ventas': 0,
-                        'Costo Mano de Obra': 0,
-                        'Costo Materiales': 0,
-                        'Ganancia Neta': 0,
-                        'Cantidad de Trabajos': 0
-                    }
-                
-                # Acumular valores
-                tech_data[tech_id]['Total Ventas'] += task['budget_total']
-                tech_data[tech_id]['Costo Mano de Obra'] += task['labor_cost']
-                tech_data[tech_id]['Costo Materiales'] += task['material_cost']
-                tech_data[tech_id]['Ganancia Neta'] += task['profit']
-                tech_data[tech_id]['Cantidad de Trabajos'] += 1
-            
-            # Convertir a DataFrame
-            df = pd.DataFrame(tech_data.values())
-            
-            # Ordenar por ganancia neta descendente
-            df = df.sort_values('Ganancia Neta', ascending=False)
-            
-            # Agregar totales
-            total_row = {
-                'Técnico': 'TOTAL',
-                'Total Ventas': df['Total Ventas'].sum(),
-                'Costo Mano de Obra': df['Costo Mano de Obra'].sum(),
-                'Costo Materiales': df['Costo Materiales'].sum(),
-                'Ganancia Neta': df['Ganancia Neta'].sum(),
-                'Cantidad de Trabajos': df['Cantidad de Trabajos'].sum()
-            }
-            df = df._append(total_row, ignore_index=True)
-            
-            # Pedir ubicación para guardar
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Guardar Reporte por Técnico",
-                f"reporte_tecnicos_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                "Archivos Excel (*.xlsx)"
-            )
-            
-            if file_path:
-                if not file_path.endswith('.xlsx'):
-                    file_path += '.xlsx'
-                
-                # Guardar en Excel
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, sheet_name='Resumen Técnicos', index=False)
-                    
-                    # Formatear la hoja
-                    worksheet = writer.sheets['Resumen Técnicos']
-                    for idx, col in enumerate(df.columns):
-                        max_length = max(df[col].astype(str).apply(len).max(), len(col)) + 2
-                        worksheet.column_dimensions[chr(65 + idx)].width = max_length
-                    
-                    # Resaltar la fila de totales
-                    for col in range(1, len(df.columns) + 1):
-                        cell = worksheet.cell(row=len(df) + 1, column=col)
-                        cell.font = Font(bold=True)
-                
-                QMessageBox.information(
-                    self, "Éxito", 
-                    f"Reporte por técnico exportado:\n{file_path}"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error al exportar", 
-                f"Ocurrió un error al generar el reporte por técnico:\n{str(e)}"
-            )
+        tasks = self.report_tasks()
+        if tasks is None:
+            return
+        file_path = self.ask_xlsx_path("Guardar Reporte por Técnico", "reporte_tecnicos")
+        if not file_path:
+            return
+        
+        names = self.technician_names()
+        self.start_export(
+            "Reporte por técnico", file_path,
+            lambda job, path: write_workbook(path, technician_report_sheets(tasks, names), job)
+        )
     
     def export_facu_report(self):
         """Exporta el reporte de la participación de Facu (30%)"""
-        try:
-            if not hasattr(self, 'current_report') or not self.current_report.get('tasks'):
-                QMessageBox.warning(self, "Error", "No hay datos para generar el reporte")
-                return
-                
-            # Obtener los datos actuales
-            tasks = self.current_report['tasks']
-            
-            # Calcular totales
-            total_ganancia = sum(task['profit'] for task in tasks)
-            total_facu = sum(task.get('facu_share', 0) for task in tasks)
-            total_tecnico = sum(task.get('pablo_share', 0) for task in tasks)
-            
-            # Crear DataFrame con el resumen
-            data = [
-                {
-                    'Concepto': 'Ganancia Total',
-                    'Monto': total_ganancia,
-                    'Porcentaje': '100%'
-                },
-                {
-                    'Concepto': 'Participación de Socio (30%)',
-                    'Monto': total_facu,
-                    'Porcentaje': '30%'
-                },
-                {
-                    'Concepto': 'Participación de Técnico (70%)',
-                    'Monto': total_tecnico,
-                    'Porcentaje': '70%'
-                }
-            ]
-            
-            df = pd.DataFrame(data)
-            
-            # Agregar detalle por tarea
-            detalle = []
-            for task in tasks:
-                if task.get('facu_share', 0) > 0:
-                    detalle.append({
-                        'Fecha': task['task_date'],
-                        'Cliente': task['client_name'],
-                        'Descripción': task['task_description'],
-                        'Ganancia Total': task['profit'],
-                        'Socio (30%)': task.get('facu_share', 0),
-                        'Técnico (70%)': task.get('pablo_share', 0)
-                    })
-            
-            df_detalle = pd.DataFrame(detalle)
-            
-            # Agregar fila de totales al detalle
-            if not df_detalle.empty:
-                total_row = {
-                    'Fecha': 'TOTAL',
-                    'Cliente': '',
-                    'Descripción': '',
-                    'Ganancia Total': df_detalle['Ganancia Total'].sum(),
-                    'Socio (30%)': df_detalle['Socio (30%)'].sum(),
-                    'Técnico (70%)': df_detalle['Técnico (70%)'].sum()
-                }
-                df_detalle = df_detalle._append(total_row, ignore_index=True)
-            
-            # Pedir ubicación para guardar
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Guardar Reporte de Socio",
-                f"reporte_socio_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                "Archivos Excel (*.xlsx)"
-            )
-            
-            if file_path:
-                if not file_path.endswith('.xlsx'):
-                    file_path += '.xlsx'
-                
-                # Guardar en Excel
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    # Hoja de resumen
-                    df.to_excel(writer, sheet_name='Resumen', index=False)
-                    
-                    # Formatear hoja de resumen
-                    worksheet = writer.sheets['Resumen']
-                    for idx, col in enumerate(df.columns, 1):
-                        max_length = max(
-                            df[col].astype(str).apply(len).max(),
-                            len(str(col))
-                        ) + 2
-                        worksheet.column_dimensions[get_column_letter(idx)].width = min(max_length, 30)
-                    
-                    # Resaltar totales en negrita
-                    for row in range(2, 5):  # Filas 2 a 4 (los totales)
-                        for col in range(1, 4):  # Columnas A a C
-                            cell = worksheet.cell(row=row, column=col)
-                            cell.font = Font(bold=True)
-                    
-                    # Hoja de detalle si hay datos
-                    if not df_detalle.empty:
-                        df_detalle.to_excel(writer, sheet_name='Detalle', index=False)
-                        
-                        # Formatear hoja de detalle
-                        worksheet = writer.sheets['Detalle']
-                        for idx, col in enumerate(df_detalle.columns, 1):
-                            max_length = max(
-                                df_detalle[col].astype(str).apply(len).max(),
-                                len(str(col))
-                            ) + 2
-                            worksheet.column_dimensions[get_column_letter(idx)].width = min(max_length, 30)
-                        
-                        # Formato de moneda para las columnas numéricas
-                        money_columns = ['Ganancia Total', 'Socio (30%)', 'Técnico (70%)']
-                        for col_num, col_name in enumerate(df_detalle.columns, 1):
-                            if col_name in money_columns:
-                                for row in range(2, len(df_detalle) + 2):  # +2 porque Excel es 1-based y tiene encabezado
-                                    cell = worksheet.cell(row=row, column=col_num)
-                                    if row == len(df_detalle) + 1:  # Fila de totales
-                                        cell.number_format = '"$"#,##0.00_);("$"#,##0.00)'
-                                        cell.font = Font(bold=True)
-                                    else:
-                                        cell.number_format = '"$"#,##0.00_);("$"#,##0.00)'
-                
-                QMessageBox.information(
-                    self, "Éxito", 
-                    f"Reporte de Facu exportado:\n{file_path}"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error al exportar", 
-                f"Ocurrió un error al generar el reporte de Facu:\n{str(e)}"
-            )
+        tasks = self.report_tasks()
+        if tasks is None:
+            return
+        file_path = self.ask_xlsx_path("Guardar Reporte de Socio", "reporte_socio")
+        if not file_path:
+            return
+        
+        self.start_export(
+            "Reporte de Facu", file_path,
+            lambda job, path: write_workbook(path, facu_report_sheets(tasks), job)
+        )
+    
+    def export_technician_statements(self):
+        """
+        Cierre de mes: un estado de cuenta por técnico para el período
+        seleccionado, más un índice con los totales, en la carpeta elegida.
+        Las tareas se leen con una sola consulta y los libros se escriben en
+        paralelo (un proceso por núcleo).
+        """
+        _, start_date, end_date, _ = self.current_filters()
+        folder = QFileDialog.getExistingDirectory(self, "Carpeta para los estados de cuenta")
+        if not folder:
+            return
+        
+        db_name = self.db.db_name
+        
+        def run(job, path):
+            with worker_connection(db_name) as db:
+                generated = export_technician_statements(db, path, start_date, end_date, job=job)
+            return f"{generated} estados de cuenta en {path}"
+        
+        self.start_export(f"Estados de cuenta {start_date} a {end_date}", folder, run, atomic=False)
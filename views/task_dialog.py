@@ -5,6 +5,11 @@ from PySide6.QtWidgets import (
     QTextEdit, QMessageBox
 )
 from PySide6.QtCore import Qt, QDate
+from database.dates import parse_date
+from database.rules import RateRules
+
+# Estados posibles de una tarea
+TASK_STATUSES = ["PENDIENTE", "EN PROCESO", "COMPLETADA", "CANCELADA"]
 
 class TaskDialog(QDialog):
     def __init__(self, parent=None, task_data=None):
@@ -13,6 +18,13 @@ class TaskDialog(QDialog):
         self.setMinimumWidth(500)
         
         self.task_data = task_data or {}
+        
+        # Reglas de tasas compiladas (las mismas que usa la base de datos)
+        if parent is not None and hasattr(parent, 'db'):
+            self.rate_rules = parent.db.get_rate_rules()
+        else:
+            self.rate_rules = RateRules()
+        
         self.init_ui()
         
     def init_ui(self):
@@ -50,7 +62,7 @@ class TaskDialog(QDialog):
         
         # Estado
         self.status_combo = QComboBox()
-        self.status_combo.addItems(["PENDIENTE", "EN PROCESO", "COMPLETADA", "CANCELADA"])
+        self.status_combo.addItems(TASK_STATUSES)
         
         # Agregar campos al formulario
         form_layout.addRow("Técnico*:", self.technician_combo)
@@ -111,6 +123,9 @@ class TaskDialog(QDialog):
         ]:
             field.textChanged.connect(self.calculate_derived_fields)
         
+        # Las tasas dependen de la fecha de la tarea
+        self.task_date_edit.dateChanged.connect(self.calculate_derived_fields)
+        
         # Forzar el cálculo inicial
         self.calculate_derived_fields()
         
@@ -174,15 +189,19 @@ class TaskDialog(QDialog):
                 # No mostramos el error, solo no actualizamos los cálculos
                 return
             
-            # 1. Calcular IVA (10.5% sobre el presupuesto total)
-            iva = budget_total * 0.105
+            # Tasas vigentes en la fecha de la tarea
+            task_date = self.task_date_edit.date().toString('yyyy-MM-dd')
+            iva_rate, technician_rate, partner_rate = self.rate_rules.rates_for(task_date)
+            
+            # 1. Calcular IVA sobre el presupuesto total
+            iva = budget_total * iva_rate
             
             # 2. Calcular ganancia total (presupuesto - gasto material - IVA)
             profit = budget_total - material_expense - iva
             
-            # 3. Distribución (70% Técnico, 30% Socio) sobre la ganancia
-            technician_share = profit * 0.7
-            facu_share = profit * 0.3
+            # 3. Distribución técnico/socio sobre la ganancia
+            technician_share = profit * technician_rate
+            facu_share = profit * partner_rate
             
             # 4. Ganancia neta es igual a la ganancia total en este cálculo
             net_profit = profit
@@ -221,14 +240,9 @@ class TaskDialog(QDialog):
         self.order_number_input.setText(self.task_data.get('order_number', ''))
         
         # Establecer fecha
-        task_date = self.task_data.get('task_date')
+        task_date = parse_date(self.task_data.get('task_date'))
         if task_date:
-            try:
-                if isinstance(task_date, str):
-                    task_date = datetime.datetime.strptime(task_date, '%Y-%m-%d').date()
-                self.task_date_edit.setDate(QDate(task_date.year, task_date.month, task_date.day))
-            except:
-                pass
+            self.task_date_edit.setDate(QDate(task_date.year, task_date.month, task_date.day))
         
         # Establecer valores monetarios
         self.set_currency_value(self.budget_total_input, float(self.task_data.get('budget_total', 0)))
@@ -2,7 +2,7 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QLineEdit,
                                QPushButton, QTableWidget, QTableWidgetItem, 
                                QHeaderView, QMessageBox, QHBoxLayout, 
                                QAbstractItemView, QLabel, QFrame, QToolButton, 
-                               QSpacerItem, QStyledItemDelegate)
+                               QSpacerItem, QStyledItemDelegate, QInputDialog)
 from PySide6.QtCore import Qt, Signal, QSize, QObject
 from PySide6.QtGui import QDoubleValidator, QIcon, QFont, QPalette, QColor, QPixmap
 
@@ -648,7 +648,7 @@ class TechnicianView(QWidget):
             
         try:
             self.db.add_technician(name, email or None, phone or None)
-            self.load_technicians()
+            self.technicians_updated.emit()
             self.clear_form()
             self.status_message.emit("Técnico agregado correctamente")
             QMessageBox.information(self, "Éxito", "Técnico agregado correctamente")
@@ -704,7 +704,7 @@ class TechnicianView(QWidget):
             self.db.update_technician(self.current_tech_id, name, email or None, phone or None)
             
             # Recargar la lista
-            self.load_technicians()
+            self.technicians_updated.emit()
             
             # Limpiar el formulario
             self.clear_form()
@@ -724,28 +724,58 @@ class TechnicianView(QWidget):
             QMessageBox.critical(self, "Error", error_msg)
     
     def delete_technician(self, tech_id):
-        """Elimina un técnico después de confirmación."""
+        """
+        Elimina un técnico después de confirmación. Si tiene tareas se ofrece
+        reasignarlas a otro técnico o desactivarlo conservando sus tareas.
+        """
         try:
-            # Confirmar eliminación
-            reply = QMessageBox.question(
-                self, 
-                'Confirmar eliminación',
-                '¿Está seguro de que desea eliminar este técnico?',
-                QMessageBox.Yes | QMessageBox.No,
-                QMessageBox.No
-            )
+            task_count = self.db.count_technician_tasks(tech_id)
+            reassign_to = None
+            soft = False
             
-            if reply == QMessageBox.Yes:
-                # Eliminar el técnico
-                self.db.delete_technician(tech_id)
-                
-                # Recargar la lista
-                self.load_technicians()
-                
-                # Mostrar mensaje de éxito
-                self.status_message.emit("Técnico eliminado correctamente")
-                QMessageBox.information(self, "Éxito", "Técnico eliminado correctamente")
-                
+            if not task_count:
+                reply = QMessageBox.question(
+                    self,
+                    'Confirmar eliminación',
+                    '¿Está seguro de que desea eliminar este técnico?',
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            else:
+                others = [tech for tech in self.db.get_technicians() if tech['id'] != tech_id]
+                options = ["Desactivar (conserva sus tareas)"]
+                options += [f"Reasignar tareas a {tech['name']}" for tech in others]
+                choice, ok = QInputDialog.getItem(
+                    self,
+                    'Eliminar técnico',
+                    f"El técnico tiene {task_count} tareas. ¿Qué desea hacer?",
+                    options, 0, False
+                )
+                if not ok:
+                    return
+                index = options.index(choice)
+                if index == 0:
+                    soft = True
+                else:
+                    reassign_to = others[index - 1]['id']
+            
+            reassigned = self.db.delete_technician(tech_id, reassign_to=reassign_to, soft=soft)
+            
+            # Recargar la lista (y los combos de técnicos de los reportes)
+            self.technicians_updated.emit()
+            
+            # Mostrar mensaje de éxito
+            if soft:
+                message = "Técnico desactivado correctamente"
+            elif reassigned:
+                message = f"Técnico eliminado correctamente; {reassigned} tareas reasignadas"
+            else:
+                message = "Técnico eliminado correctamente"
+            self.status_message.emit(message)
+            QMessageBox.information(self, "Éxito", message)
+        
         except Exception as e:
             error_msg = f"Error al eliminar el técnico: {str(e)}"
             self.status_message.emit(error_msg)